@@ -0,0 +1,36 @@
+# Index failed login lookups migration
+"""Add composite index for recent failed login attempts
+
+Revision ID: 002_login_attempts_failed_index
+Revises: 001_initial_tables
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers
+revision = '002_login_attempts_failed_index'
+down_revision = '001_initial_tables'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # login_attempts grows quickly under attack; build without locking writes
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_login_attempts_email_success_created_at',
+            'login_attempts',
+            ['email', 'success', 'created_at'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_login_attempts_email_success_created_at',
+            table_name='login_attempts',
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,44 @@
+# Follows covering indexes migration
+"""Add covering indexes for relationship status lookups
+
+Revision ID: 003_follows_covering_indexes
+Revises: 002_login_attempts_failed_index
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers
+revision = '003_follows_covering_indexes'
+down_revision = '002_login_attempts_failed_index'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = {
+    'ix_follows_follower_following_approved': ['follower_id', 'following_id', 'is_approved'],
+    'ix_follows_following_follower_approved': ['following_id', 'follower_id', 'is_approved'],
+}
+
+
+def upgrade() -> None:
+    # Index-only scans for both directions of a relationship lookup
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES.items():
+            op.create_index(
+                name,
+                'follows',
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.drop_index(
+                name,
+                table_name='follows',
+                postgresql_concurrently=True,
+            )
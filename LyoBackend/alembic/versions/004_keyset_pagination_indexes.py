@@ -0,0 +1,44 @@
+# Keyset pagination indexes migration
+"""Add composite indexes for keyset pagination of follow lists
+
+Revision ID: 004_keyset_pagination_indexes
+Revises: 003_follows_covering_indexes
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers
+revision = '004_keyset_pagination_indexes'
+down_revision = '003_follows_covering_indexes'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = {
+    'ix_follows_following_approved_created_at': ('follows', ['following_id', 'is_approved', 'created_at', 'id']),
+    'ix_follows_follower_approved_created_at': ('follows', ['follower_id', 'is_approved', 'created_at', 'id']),
+}
+
+
+def upgrade() -> None:
+    # Lists seek on (created_at, id) instead of scanning skipped rows
+    with op.get_context().autocommit_block():
+        for name, (table, columns) in INDEXES.items():
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, (table, _) in INDEXES.items():
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+            )
@@ -0,0 +1,46 @@
+# Profile search indexes migration
+"""Add pg_trgm and prefix indexes for profile search
+
+Revision ID: 005_profile_search_indexes
+Revises: 004_keyset_pagination_indexes
+Create Date: 2026-10-16 16:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers
+revision = '005_profile_search_indexes'
+down_revision = '004_keyset_pagination_indexes'
+branch_labels = None
+depends_on = None
+
+
+# Must match the search keys in src/profiles/models.py
+SEARCH_KEYS = {
+    'username': ('user_profiles', "lower(username)"),
+    'display_name': ('users', "lower(display_name)"),
+    'full_name': ('users', "lower(coalesce(first_name, '') || ' ' || coalesce(last_name, ''))"),
+}
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    
+    # Large tables; build without locking writes
+    with op.get_context().autocommit_block():
+        for name, (table, key) in SEARCH_KEYS.items():
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_profile_search_{name}_trgm "
+                f"ON {table} USING gin ({key} gin_trgm_ops)"
+            )
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_profile_search_{name}_prefix "
+                f"ON {table} ({key} text_pattern_ops)"
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in SEARCH_KEYS:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS ix_profile_search_{name}_trgm")
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS ix_profile_search_{name}_prefix")
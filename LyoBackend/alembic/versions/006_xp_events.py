@@ -0,0 +1,36 @@
+# XP event ledger migration
+"""Add append-only xp_events ledger
+
+Revision ID: 006_xp_events
+Revises: 005_profile_search_indexes
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers
+revision = '006_xp_events'
+down_revision = '005_profile_search_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('xp_events',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('user_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('amount', sa.Integer(), nullable=False),
+        sa.Column('reason', sa.String(length=50), nullable=False),
+        sa.Column('grants', sa.Integer(), nullable=False, server_default='1'),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_xp_events_user_id_created_at', 'xp_events', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_xp_events_user_id_created_at', table_name='xp_events')
+    op.drop_table('xp_events')
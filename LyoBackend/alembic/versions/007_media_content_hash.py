@@ -0,0 +1,24 @@
+# Media content hash migration
+"""Add content_hash to media_uploads
+
+Revision ID: 007_media_content_hash
+Revises: 006_xp_events
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '007_media_content_hash'
+down_revision = '006_xp_events'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('media_uploads', sa.Column('content_hash', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('media_uploads', 'content_hash')
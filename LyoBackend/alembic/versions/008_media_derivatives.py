@@ -0,0 +1,24 @@
+# Media derivatives migration
+"""Add derivatives to media_uploads
+
+Revision ID: 008_media_derivatives
+Revises: 007_media_content_hash
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '008_media_derivatives'
+down_revision = '007_media_content_hash'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('media_uploads', sa.Column('derivatives', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('media_uploads', 'derivatives')
@@ -0,0 +1,35 @@
+# Content-addressed media blobs migration
+"""Add reference-counted media_blobs and index media_uploads by content hash
+
+Revision ID: 009_media_blobs
+Revises: 008_media_derivatives
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '009_media_blobs'
+down_revision = '008_media_derivatives'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('media_blobs',
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('storage_path', sa.String(length=500), nullable=False),
+        sa.Column('content_type', sa.String(length=100), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('public_ref_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint('content_hash')
+    )
+    op.create_index('ix_media_uploads_content_hash', 'media_uploads', ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_media_uploads_content_hash', table_name='media_uploads')
+    op.drop_table('media_blobs')
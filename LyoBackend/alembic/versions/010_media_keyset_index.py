@@ -0,0 +1,36 @@
+# Media keyset pagination index migration
+"""Add composite index for keyset pagination of a user's media
+
+Revision ID: 010_media_keyset_index
+Revises: 009_media_blobs
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers
+revision = '010_media_keyset_index'
+down_revision = '009_media_blobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Galleries seek on (created_at, id) within one user's uploads
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_media_uploads_user_id_created_at_id',
+            'media_uploads',
+            ['user_id', 'created_at', 'id'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_media_uploads_user_id_created_at_id',
+            table_name='media_uploads',
+            postgresql_concurrently=True,
+        )
@@ -18,7 +18,17 @@ import os
 # Import routers
 from src.auth.router import router as auth_router
 from src.profiles.router import router as profiles_router
+from src.media.derivatives import derivative_worker
 from src.media.router import router as media_router
+from src.media.service import media_service
+from src.auth.audit import login_attempt_sink
+from src.auth.hashing import password_hasher
+from src.auth.service import auth_service
+from src.profiles.autocomplete import profile_autocomplete
+from src.profiles.catalog import interest_catalog
+from src.profiles.counters import follow_counters
+from src.profiles.leaderboards import leaderboards
+from src.profiles.xp import xp_engine
 from src.core.config import get_settings
 from src.core.database import check_db_health, close_db, init_db
 from src.core.logging import (
@@ -28,7 +38,15 @@ from src.core.logging import (
     set_request_context,
     setup_logging,
 )
-from src.core.redis import check_redis_health, close_redis, init_redis
+from src.core.redis import (
+    RedisCache,
+    check_redis_health,
+    close_redis,
+    get_cache_stats,
+    init_redis,
+    start_cache_invalidation_listener,
+    stop_cache_invalidation_listener,
+)
 
 # Setup logging first
 setup_logging()
@@ -44,6 +62,14 @@ async def lifespan(app: FastAPI):
     try:
         await init_db()
         await init_redis()
+        await start_cache_invalidation_listener()
+        await login_attempt_sink.start()
+        await follow_counters.start()
+        await xp_engine.start()
+        await profile_autocomplete.start()
+        await interest_catalog.start()
+        await leaderboards.start()
+        await derivative_worker.start()
         logger.info("All services initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize services: {e}")
@@ -53,8 +79,18 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down LyoApp Backend...")
+    await login_attempt_sink.stop()
+    await follow_counters.stop()
+    await xp_engine.stop()
+    await profile_autocomplete.stop()
+    await interest_catalog.stop()
+    await leaderboards.stop()
+    await derivative_worker.stop()
+    await media_service.storage.close()
     await close_db()
+    await stop_cache_invalidation_listener()
     await close_redis()
+    password_hasher.shutdown()
     logger.info("Shutdown complete")
 
 
@@ -172,6 +208,26 @@ async def readiness_check():
     return JSONResponse(content=response, status_code=status_code)
 
 
+@app.get("/health/metrics")
+async def metrics_check():
+    """In-process cache and worker metrics"""
+    return {
+        "timestamp": time.time(),
+        "token_cache": auth_service.token_cache.stats(),
+        "caches": get_cache_stats(),
+        "cache_recompute": RedisCache.compute_stats,
+        "password_hasher": password_hasher.stats(),
+        "login_audit": login_attempt_sink.stats(),
+        "follow_counters": follow_counters.stats(),
+        "xp": xp_engine.stats(),
+        "profile_autocomplete": profile_autocomplete.stats(),
+        "interests_catalog": interest_catalog.stats(),
+        "leaderboards": leaderboards.stats(),
+        "media_storage": media_service.storage.stats(),
+        "media_derivatives": derivative_worker.stats(),
+    }
+
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Profile autocomplete index benchmark.
+
+Builds a PrefixIndex over synthetic usernames and display names and reports
+memory per million profiles, build time, lookup latency by prefix length,
+update throughput and the cost of compacting the update overlay.
+
+Usage:
+    python scripts/bench_autocomplete.py --profiles 1000000
+"""
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from uuid import uuid4
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.profiles.autocomplete import PrefixIndex
+
+FIRST_NAMES = [
+    "Ana", "Maria", "John", "Li", "Wei", "Fatima", "Omar", "Sofia", "Lucas", "Emma",
+    "Noah", "Olivia", "Liam", "Mia", "Ethan", "Aisha", "Yuki", "Hiro", "Priya", "Arjun",
+]
+LAST_NAMES = [
+    "Smith", "Garcia", "Chen", "Khan", "Silva", "Muller", "Rossi", "Kim", "Nguyen", "Patel",
+    "Johnson", "Lopez", "Wang", "Ali", "Costa", "Schmidt", "Tanaka", "Sato", "Singh", "Brown",
+]
+
+
+def make_rows(count: int, rng: random.Random):
+    for i in range(count):
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        yield uuid4(), f"{first.lower()}{last.lower()}{i}", f"{first} {last}"
+
+
+def percentile(samples, fraction: float) -> float:
+    return samples[min(int(len(samples) * fraction), len(samples) - 1)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--profiles", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--updates", type=int, default=50_000)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    rows = list(make_rows(args.profiles, rng))
+
+    tracemalloc.start()
+    index = PrefixIndex()
+    index.load(rows)
+    index.seal()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Time a second build; tracing slows allocation down several times
+    del index
+    started = time.perf_counter()
+    index = PrefixIndex()
+    index.load(rows)
+    index.seal()
+    build_seconds = time.perf_counter() - started
+
+    # Name strings are shared with the input rows, so count them separately
+    names = sum(
+        sys.getsizeof(username) + sys.getsizeof(display_name)
+        for _, username, display_name in rows
+    )
+    total = retained + names
+    per_million = total / args.profiles * 1_000_000
+
+    print(f"profiles           {args.profiles:>12,}")
+    print(f"build              {build_seconds:>12.2f} s")
+    print(f"memory (index)     {retained / 2**20:>12.1f} MiB  (peak {peak / 2**20:.1f} MiB)")
+    print(f"memory (names)     {names / 2**20:>12.1f} MiB")
+    print(f"bytes per profile  {total / args.profiles:>12.1f}")
+    print(f"per million        {per_million / 2**20:>12.1f} MiB")
+
+    print(f"\n{'prefix len':<12} {'p50':>9} {'p99':>9} {'avg hits':>9}")
+    for length in (1, 2, 3, 5, 8):
+        prefixes = [
+            rng.choice(rows)[rng.randrange(1, 3)][:length]
+            for _ in range(args.lookups)
+        ]
+        latencies = []
+        hits = 0
+        for prefix in prefixes:
+            lookup_started = time.perf_counter()
+            hits += len(index.search(prefix, args.limit))
+            latencies.append(time.perf_counter() - lookup_started)
+        latencies.sort()
+        print(
+            f"{length:<12} {percentile(latencies, 0.5) * 1e6:>6.1f} us "
+            f"{percentile(latencies, 0.99) * 1e6:>6.1f} us {hits / len(prefixes):>9.1f}"
+        )
+
+    started = time.perf_counter()
+    for i in range(args.updates):
+        user_id, _, display_name = rng.choice(rows)
+        index.upsert(user_id, f"renamed{i}", display_name)
+    update_seconds = time.perf_counter() - started
+    print(f"\nupdates            {args.updates / update_seconds:>12,.0f} /s")
+
+    started = time.perf_counter()
+    index.compact()
+    print(f"compaction         {(time.perf_counter() - started) * 1000:>12.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Cache codec benchmark: stdlib JSON vs. orjson vs. msgpack, with and without compression.
+
+Reports encoded size and mean encode/decode time for profile-shaped
+payloads of increasing size (a single profile, then follower lists).
+
+Usage:
+    python scripts/bench_codecs.py --iterations 2000
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from uuid import uuid4
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.core.codecs import Codec, Compression, Serializer, is_available
+
+
+def make_profile() -> dict:
+    return {
+        "id": str(uuid4()),
+        "user_id": str(uuid4()),
+        "username": "learner_42",
+        "display_name": "Curious Learner",
+        "bio": "Learning Swift, Python and everything in between. " * 3,
+        "avatar_url": "https://storage.googleapis.com/lyoapp-media/avatars/abc.jpg",
+        "followers_count": 1234,
+        "following_count": 321,
+        "is_private": False,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+PAYLOADS = {
+    "profile": make_profile(),
+    "followers_20": {"items": [make_profile() for _ in range(20)], "next_cursor": "abc"},
+    "followers_100": {"items": [make_profile() for _ in range(100)], "next_cursor": "abc"},
+    "followers_1000": {"items": [make_profile() for _ in range(1000)], "next_cursor": "abc"},
+}
+
+
+def legacy_encode(value) -> str:
+    """Pre-codec RedisCache.set"""
+    return json.dumps(value, default=str)
+
+
+def bench(encode, decode, payload, iterations: int):
+    encoded = encode(payload)
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        encode(payload)
+    encode_us = (time.perf_counter() - started) / iterations * 1e6
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        decode(encoded)
+    decode_us = (time.perf_counter() - started) / iterations * 1e6
+
+    return len(encoded), encode_us, decode_us
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--compress-threshold", type=int, default=1024)
+    args = parser.parse_args()
+
+    codecs = [("legacy json", legacy_encode, json.loads)]
+    for serializer in Serializer:
+        for compression in Compression:
+            if not (is_available(serializer) and is_available(compression)):
+                continue
+            codec = Codec(serializer, compression, args.compress_threshold)
+            name = serializer.name.lower()
+            if compression != Compression.NONE:
+                name += f"+{compression.name.lower()}"
+            codecs.append((name, codec.encode, codec.decode))
+
+    for payload_name, payload in PAYLOADS.items():
+        iterations = max(args.iterations // max(len(payload.get("items", [])), 1), 20)
+        print(f"\n{payload_name} ({iterations} iterations)")
+        for name, encode, decode in codecs:
+            size, encode_us, decode_us = bench(encode, decode, payload, iterations)
+            print(
+                f"  {name:<16} {size:>9} bytes   "
+                f"encode {encode_us:9.1f} us   decode {decode_us:9.1f} us"
+            )
+
+
+if __name__ == "__main__":
+    main()
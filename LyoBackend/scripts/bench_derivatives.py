@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Image derivative throughput benchmark.
+
+Renders synthetic photos through render_derivatives and reports per-image
+cost by output format, then images per second on one core and across a
+process pool, so MEDIA_DERIVATIVE_WORKERS can be sized per instance.
+
+Usage:
+    python scripts/bench_derivatives.py --images 40 --workers 4
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from PIL import Image, ImageFilter
+
+from src.media.derivatives import render_derivatives
+
+WIDTHS = (160, 320, 640, 1280)
+
+
+def make_photo(width: int, height: int, rng: random.Random) -> bytes:
+    """Smooth gradient plus blurred noise; compresses roughly like a photo"""
+    gradient = Image.linear_gradient("L").resize((width, height))
+    noise = Image.frombytes("L", (width // 4, height // 4), rng.randbytes(width * height // 16))
+    noise = noise.resize((width, height)).filter(ImageFilter.GaussianBlur(2))
+    image = Image.merge("RGB", (gradient, noise, gradient.rotate(180)))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def render(args):
+    content, formats = args
+    return render_derivatives(content, WIDTHS, formats)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--images", type=int, default=40)
+    parser.add_argument("--width", type=int, default=4032)
+    parser.add_argument("--height", type=int, default=3024)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--formats", default="webp,avif")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    formats = tuple(args.formats.split(","))
+    photos = [make_photo(args.width, args.height, rng) for _ in range(min(args.images, 8))]
+    jobs = [(photos[i % len(photos)], formats) for i in range(args.images)]
+    print(f"source             {args.width}x{args.height} JPEG, {sum(map(len, photos)) / len(photos) / 1024:.0f} KiB avg")
+
+    print(f"\n{'formats':<18} {'ms/image':>9} {'output KiB':>11}")
+    for subset in [()] + [(fmt,) for fmt in formats] + ([formats] if len(formats) > 1 else []):
+        started = time.perf_counter()
+        for photo in photos:
+            rendered = render_derivatives(photo, WIDTHS, subset)
+        elapsed = (time.perf_counter() - started) / len(photos)
+        label = "+".join(("jpeg",) + subset)
+        print(f"{label:<18} {elapsed * 1000:>9.1f} {sum(len(data) for *_, data in rendered) / 1024:>11.1f}")
+
+    started = time.perf_counter()
+    for job in jobs:
+        render(job)
+    single = args.images / (time.perf_counter() - started)
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        list(pool.map(render, jobs[:args.workers]))  # warm up worker processes
+        started = time.perf_counter()
+        list(pool.map(render, jobs))
+        pooled = args.images / (time.perf_counter() - started)
+
+    print(f"\n1 core             {single:>9.2f} images/s")
+    cores = min(args.workers, os.cpu_count())
+    print(f"{args.workers} workers{'':<9} {pooled:>9.2f} images/s  ({pooled / cores:.2f} per core, {cores} cores)")
+
+
+if __name__ == "__main__":
+    main()
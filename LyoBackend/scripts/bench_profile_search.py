@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Profile search benchmark on a seeded Postgres dataset.
+
+Seeds users/user_profiles with synthetic names (once), then times
+ProfileService.search_profiles for short prefix terms and longer substring
+terms, with indexes enabled and with index scans disabled (the sequential
+scan every search used to do).
+
+Requires the pg_trgm extension. Use a throwaway database: tables are created
+from the models if missing.
+
+Usage:
+    python scripts/bench_profile_search.py \\
+        --database-url postgresql+asyncpg://localhost/lyoapp_bench --profiles 1000000
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.auth.models import User
+from src.core.database import Base
+from src.profiles.models import UserProfile
+from src.profiles.service import ProfileService
+
+FIRST_NAMES = [
+    "ana", "maria", "john", "li", "wei", "fatima", "omar", "sofia", "lucas", "emma",
+    "noah", "olivia", "liam", "mia", "ethan", "aisha", "yuki", "hiro", "priya", "arjun",
+]
+LAST_NAMES = [
+    "smith", "garcia", "chen", "khan", "silva", "muller", "rossi", "kim", "nguyen", "patel",
+    "johnson", "lopez", "wang", "ali", "costa", "schmidt", "tanaka", "sato", "singh", "brown",
+]
+
+TERMS = ["an", "so", "ana", "garc", "mariagarcia", "chen12", "zzzq"]
+
+SEED_SQL = """
+INSERT INTO users (
+    id, email, hashed_password, first_name, last_name, display_name, role,
+    is_active, is_verified, is_private, created_at, updated_at
+)
+SELECT
+    gen_random_uuid(),
+    'bench' || i || '@example.com',
+    'x',
+    first_name,
+    last_name,
+    initcap(first_name) || ' ' || initcap(last_name),
+    'student',
+    true, true, false, now(), now()
+FROM (
+    SELECT
+        i,
+        (CAST(:first_names AS text[]))[1 + abs(hashtext(i::text)) % :first_count] AS first_name,
+        (CAST(:last_names AS text[]))[1 + abs(hashtext(i::text || 'l')) % :last_count] AS last_name
+    FROM generate_series(:start, :stop - 1) AS i
+) names
+"""
+
+SEED_PROFILES_SQL = """
+INSERT INTO user_profiles (
+    id, user_id, username, followers_count, following_count, posts_count,
+    is_private, allow_messages, show_activity, difficulty_preference,
+    level, xp_points, streak_days, created_at, updated_at
+)
+SELECT
+    gen_random_uuid(), u.id,
+    lower(u.first_name || u.last_name) || substr(u.email, 6, strpos(u.email, '@') - 6),
+    0, 0, 0, false, true, true, 'intermediate', 1, 0, 0, now(), now()
+FROM users u
+LEFT JOIN user_profiles p ON p.user_id = u.id
+WHERE p.id IS NULL AND u.email LIKE 'bench%'
+"""
+
+
+async def seed(session_factory, profiles: int, batch: int) -> None:
+    async with session_factory() as session:
+        existing = (await session.execute(text("SELECT count(*) FROM user_profiles"))).scalar()
+
+    if existing >= profiles:
+        print(f"Using existing {existing} profiles")
+        return
+
+    print(f"Seeding {profiles - existing} profiles...")
+    started = time.perf_counter()
+    for start in range(existing, profiles, batch):
+        async with session_factory() as session:
+            await session.execute(
+                text(SEED_SQL),
+                {
+                    "first_names": FIRST_NAMES,
+                    "first_count": len(FIRST_NAMES),
+                    "last_names": LAST_NAMES,
+                    "last_count": len(LAST_NAMES),
+                    "start": start,
+                    "stop": min(start + batch, profiles),
+                },
+            )
+            await session.execute(text(SEED_PROFILES_SQL))
+            await session.commit()
+
+    async with session_factory() as session:
+        await session.execute(text("ANALYZE users"))
+        await session.execute(text("ANALYZE user_profiles"))
+        await session.commit()
+    print(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+
+async def time_search(session: AsyncSession, term: str, repeats: int) -> float:
+    """Median latency in milliseconds"""
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        await ProfileService.search_profiles(term, None, None, 20, session)
+        latencies.append(time.perf_counter() - started)
+        session.expunge_all()
+    latencies.sort()
+    return latencies[len(latencies) // 2] * 1000
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--profiles", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=100_000)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--seq-repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    engine = create_async_engine(args.database_url)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        await conn.run_sync(
+            Base.metadata.create_all,
+            tables=[User.__table__, UserProfile.__table__],
+        )
+
+    await seed(session_factory, args.profiles, args.batch)
+
+    print(f"\n{'term':<14} {'indexed p50':>12} {'seq scan p50':>13}")
+    for term in TERMS:
+        async with session_factory() as session:
+            indexed = await time_search(session, term, args.repeats)
+
+        async with session_factory() as session:
+            await session.execute(text("SET enable_indexscan = off"))
+            await session.execute(text("SET enable_bitmapscan = off"))
+            seq_scan = await time_search(session, term, args.seq_repeats)
+
+        print(f"{term:<14} {indexed:>9.2f} ms {seq_scan:>10.2f} ms")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
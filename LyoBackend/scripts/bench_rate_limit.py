@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Rate limiter benchmark: legacy INCR+EXPIRE pipeline vs. Lua engine algorithms.
+
+Reports Redis commands per check (client-sent and server-executed, from
+INFO commandstats) and p50/p99 latency per check.
+
+Usage:
+    python scripts/bench_rate_limit.py --redis-url redis://localhost:6379/15 --checks 5000
+"""
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import redis.asyncio as redis
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.core.rate_limit import RateLimitAlgorithm, RateLimitEngine
+
+
+async def legacy_check(client: redis.Redis, key: str, limit: int, window: int) -> None:
+    """Pre-engine RateLimiter.is_rate_limited"""
+    pipe = client.pipeline()
+    pipe.incr(key, 1)
+    pipe.expire(key, window)
+    await pipe.execute()
+
+
+async def server_command_count(client: redis.Redis) -> int:
+    """Total commands executed by the server so far"""
+    stats = await client.info("commandstats")
+    return sum(
+        value["calls"] for name, value in stats.items()
+        if name not in ("cmdstat_info", "cmdstat_config")
+    )
+
+
+async def run(name: str, client: redis.Redis, check, checks: int, keys: int) -> None:
+    await client.flushdb()
+    await client.config_resetstat()
+    # Warm up (loads scripts)
+    await check("bench:warmup")
+
+    before = await server_command_count(client)
+    latencies = []
+    for i in range(checks):
+        started = time.perf_counter()
+        await check(f"bench:{i % keys}")
+        latencies.append(time.perf_counter() - started)
+    executed = await server_command_count(client) - before
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000
+    print(
+        f"{name:<14} server cmds/check {executed / checks:5.2f}   "
+        f"p50 {p50:6.3f} ms   p99 {p99:6.3f} ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    parser.add_argument("--checks", type=int, default=5000)
+    parser.add_argument("--keys", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=60)
+    parser.add_argument("--window", type=int, default=60)
+    args = parser.parse_args()
+
+    client = redis.from_url(args.redis_url, decode_responses=True)
+
+    print(f"{args.checks} checks over {args.keys} keys, limit {args.limit}/{args.window}s")
+    print("client cmds/check: legacy 2 (INCR + EXPIRE), engine 1 (EVALSHA)\n")
+
+    await run(
+        "legacy",
+        client,
+        lambda key: legacy_check(client, key, args.limit, args.window),
+        args.checks,
+        args.keys,
+    )
+
+    for algorithm in RateLimitAlgorithm:
+        engine = RateLimitEngine(client, algorithm)
+        await run(
+            algorithm.value,
+            client,
+            lambda key, engine=engine: engine.hit(key, args.limit, args.window),
+            args.checks,
+            args.keys,
+        )
+
+    await client.flushdb()
+    await client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Rebuild XP leaderboards in Redis from Postgres
+
+Usage:
+    python scripts/rebuild_leaderboards.py
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.core.database import close_db, get_db_session, init_db
+from src.core.logging import get_structured_logger, setup_logging
+from src.core.redis import close_redis, init_redis
+from src.profiles.leaderboards import leaderboards
+from src.profiles.xp import xp_engine
+
+setup_logging()
+logger = get_structured_logger(__name__)
+
+
+async def main():
+    """Flush buffered XP, then rebuild every board"""
+    try:
+        await init_db()
+        await init_redis()
+        
+        await xp_engine.flush()
+        async with get_db_session() as session:
+            entries = await leaderboards.rebuild(session)
+        
+        logger.info(f"Leaderboards rebuilt with {entries} entries")
+    except Exception as e:
+        logger.error(f"Leaderboard rebuild failed: {e}")
+        sys.exit(1)
+    finally:
+        await close_redis()
+        await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
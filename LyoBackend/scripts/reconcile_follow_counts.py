@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Repair drift in denormalized follower/following counters
+
+Usage:
+    python scripts/reconcile_follow_counts.py
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.core.database import close_db, get_db_session, init_db
+from src.core.logging import get_structured_logger, setup_logging
+from src.core.redis import close_redis, init_redis
+from src.profiles.counters import follow_counters
+
+setup_logging()
+logger = get_structured_logger(__name__)
+
+
+async def main():
+    """Flush buffered deltas, then recount every profile"""
+    try:
+        await init_db()
+        await init_redis()
+        
+        async with get_db_session() as session:
+            repaired = await follow_counters.reconcile(session)
+        
+        logger.info(f"Follow counters reconciled, {repaired} repaired")
+    except Exception as e:
+        logger.error(f"Follow counter reconciliation failed: {e}")
+        sys.exit(1)
+    finally:
+        await close_redis()
+        await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -5,6 +5,8 @@ from uuid import uuid4
 from sqlalchemy import text
 
 from src.core.database import async_engine, get_db_session
+from src.core.redis import close_redis, init_redis
+from src.profiles.catalog import interest_catalog
 from src.profiles.models import Interest
 
 
@@ -92,6 +94,16 @@ async def seed_interests():
             )
         
         print(f"Successfully seeded {len(interests_data)} interests")
+    
+    # Running workers reload their interests catalog snapshot
+    try:
+        await init_redis()
+        version = await interest_catalog.bump_version()
+        print(f"Interests catalog version bumped to {version}")
+    except Exception as e:
+        print(f"Could not bump interests catalog version: {e}")
+    finally:
+        await close_redis()
 
 
 async def main():
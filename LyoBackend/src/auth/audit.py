@@ -0,0 +1,129 @@
+# Login Attempt Audit Sink
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from ..core.config import get_settings
+from ..core.database import get_db_session
+from ..core.logging import get_structured_logger
+from .models import LoginAttempt
+
+logger = get_structured_logger(__name__)
+
+
+class LoginAttemptSink:
+    """Buffered sink that bulk-inserts login attempts off the request path"""
+
+    def __init__(self, batch_size: int = 100, flush_interval_ms: int = 250, max_buffer: int = 10000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_buffer = max_buffer
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        # Metrics
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        """Start background flusher"""
+        if self.running:
+            return
+
+        self._queue = asyncio.Queue(maxsize=self.max_buffer)
+        self._task = asyncio.create_task(self._run())
+        logger.info("Login attempt sink started")
+
+    async def stop(self) -> None:
+        """Stop background flusher after writing whatever is still buffered"""
+        if not self.running:
+            return
+
+        self._stopping = True
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        self._stopping = False
+
+        logger.info("Login attempt sink stopped")
+
+    def submit(self, attempt: Dict[str, Any]) -> bool:
+        """Buffer attempt row; returns False if the caller must write it itself"""
+        if not self.running or self._stopping:
+            return False
+
+        try:
+            self._queue.put_nowait(attempt)
+            return True
+        except asyncio.QueueFull:
+            logger.warning("Login attempt sink full, writing inline")
+            return False
+
+    async def _run(self) -> None:
+        """Flush every `batch_size` rows or `flush_interval`, whichever comes first"""
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    # Stop sentinel: write this batch, then exit
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        """Bulk insert batch in one statement"""
+        if not batch:
+            return
+
+        try:
+            async with get_db_session() as session:
+                await session.execute(insert(LoginAttempt), batch)
+            self.written += len(batch)
+            self.flushes += 1
+        except Exception as e:
+            self.dropped += len(batch)
+            logger.error(f"Failed to write {len(batch)} login attempts: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Get sink metrics"""
+        return {
+            "running": self.running,
+            "buffered": self._queue.qsize() if self._queue else 0,
+            "written": self.written,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+        }
+
+
+# Global login attempt sink instance
+settings = get_settings()
+login_attempt_sink = LoginAttemptSink(
+    batch_size=settings.login_audit_batch_size,
+    flush_interval_ms=settings.login_audit_flush_ms,
+    max_buffer=settings.login_audit_max_buffer,
+)
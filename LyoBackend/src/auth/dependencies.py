@@ -1,5 +1,6 @@
 # Authentication Dependencies and Security
 from typing import Optional
+from uuid import UUID
 
 from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -9,6 +10,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from ..core.database import get_db
 from ..core.logging import get_structured_logger, set_request_context
 from .models import User
+from .principal import Principal, principal_cache
 from .service import AuthenticationError, auth_service
 
 logger = get_structured_logger(__name__)
@@ -90,9 +92,82 @@ async def get_current_user_optional(
         return None
 
 
+async def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    session: AsyncSession = Depends(get_db)
+) -> Principal:
+    """Get current authenticated principal without loading the full user row"""
+    try:
+        payload = auth_service.verify_token(credentials.credentials)
+        user_id = _parse_subject(payload)
+        
+        if not user_id:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid token payload"
+            )
+        
+        principal = await principal_cache.get(user_id, session)
+        
+        if not principal or not principal.is_active:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found or inactive"
+            )
+        
+        # Set user context for logging
+        set_request_context(payload.get("jti", ""), str(principal.id))
+        
+        return principal
+        
+    except AuthenticationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e)
+        )
+
+
+async def get_current_principal_optional(
+    request: Request,
+    session: AsyncSession = Depends(get_db)
+) -> Optional[Principal]:
+    """Get current principal if authenticated, otherwise None"""
+    try:
+        authorization = request.headers.get("Authorization")
+        if not authorization or not authorization.startswith("Bearer "):
+            return None
+        
+        token = authorization.split(" ")[1]
+        payload = auth_service.verify_token(token)
+        user_id = _parse_subject(payload)
+        
+        if not user_id:
+            return None
+        
+        principal = await principal_cache.get(user_id, session)
+        
+        if principal and principal.is_active:
+            set_request_context(payload.get("jti", ""), str(principal.id))
+            return principal
+        
+        return None
+        
+    except Exception:
+        # Fail silently for optional authentication
+        return None
+
+
+def _parse_subject(payload: dict) -> Optional[UUID]:
+    """Get user ID from token payload"""
+    try:
+        return UUID(payload.get("sub") or "")
+    except ValueError:
+        return None
+
+
 def require_role(required_role: str):
     """Require specific user role"""
-    def role_checker(current_user: User = Depends(get_current_user)) -> User:
+    def role_checker(current_user: Principal = Depends(get_current_principal)) -> Principal:
         if current_user.role != required_role:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -104,7 +179,7 @@ def require_role(required_role: str):
 
 def require_roles(*required_roles: str):
     """Require one of the specified user roles"""
-    def role_checker(current_user: User = Depends(get_current_user)) -> User:
+    def role_checker(current_user: Principal = Depends(get_current_principal)) -> Principal:
         if current_user.role not in required_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
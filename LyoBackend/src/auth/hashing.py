@@ -0,0 +1,138 @@
+# Password Hashing Worker Pool
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from passlib.context import CryptContext
+
+from ..core.config import get_settings
+from ..core.exceptions import ServiceUnavailableError
+from ..core.logging import get_structured_logger
+
+logger = get_structured_logger(__name__)
+
+# Password hashing
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _hash_password(password: str) -> str:
+    """Hash password (runs in worker)"""
+    return pwd_context.hash(password)
+
+
+def _verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify password (runs in worker)"""
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """Bounded worker pool that keeps bcrypt off the event loop"""
+
+    def __init__(self, workers: int = 4, max_queue: int = 64, executor_type: str = "thread"):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.executor_type = executor_type
+        self._executor: Optional[Executor] = None
+
+        # Metrics
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.rejected = 0
+        self._latencies: deque = deque(maxlen=1000)
+
+    @property
+    def queue_depth(self) -> int:
+        """Jobs waiting for a free worker"""
+        return max(self.in_flight - self.workers, 0)
+
+    def _get_executor(self) -> Executor:
+        """Get executor, creating it on first use"""
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="password-hash",
+                )
+        return self._executor
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run hashing job, rejecting it when the pool is saturated"""
+        if self.in_flight >= self.workers + self.max_queue:
+            self.rejected += 1
+            logger.warning(
+                "Password hashing pool saturated",
+                in_flight=self.in_flight,
+                queue_depth=self.queue_depth,
+            )
+            raise ServiceUnavailableError("Authentication is busy, please retry shortly")
+
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), func, *args)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+        self.completed += 1
+        self._latencies.append(time.perf_counter() - started)
+        return result
+
+    async def hash(self, password: str) -> str:
+        """Hash password using bcrypt"""
+        return await self._run(_hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify password against hash"""
+        return await self._run(_verify_password, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        """Stop worker pool"""
+        if self._executor:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Get queue depth and latency metrics"""
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            index = min(int(len(latencies) * p), len(latencies) - 1)
+            return round(latencies[index] * 1000, 2)
+
+        return {
+            "executor": self.executor_type,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "rejected": self.rejected,
+            "latency_p50_ms": percentile(0.50),
+            "latency_p99_ms": percentile(0.99),
+        }
+
+
+# Global password hasher instance
+settings = get_settings()
+password_hasher = PasswordHasher(
+    workers=settings.password_hash_workers,
+    max_queue=settings.password_hash_max_queue,
+    executor_type=settings.password_hash_executor,
+)
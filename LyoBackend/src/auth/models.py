@@ -11,6 +11,36 @@ from sqlalchemy.orm import relationship
 from ..core.database import Base
 
 
+def search_key_indexes(name: str, key) -> tuple:
+    """
+    Indexes on a lowercased profile search key: trigram for substring
+    matches (3+ characters), pattern_ops for short prefix matches
+    """
+    label = f'{name}_key'
+    return (
+        sa.Index(
+            f'ix_profile_search_{name}_trgm',
+            key.label(label),
+            postgresql_using='gin',
+            postgresql_ops={label: 'gin_trgm_ops'},
+        ),
+        sa.Index(
+            f'ix_profile_search_{name}_prefix',
+            key.label(label),
+            postgresql_ops={label: 'text_pattern_ops'},
+        ),
+    )
+
+
+def full_name_key(first_name, last_name):
+    """Lowercased "first last" search key"""
+    return sa.func.lower(
+        sa.func.coalesce(first_name, sa.literal_column("''"))
+        + sa.literal_column("' '")
+        + sa.func.coalesce(last_name, sa.literal_column("''"))
+    )
+
+
 class User(Base):
     """User model with RBAC support"""
     __tablename__ = "users"
@@ -49,6 +79,12 @@ class User(Base):
     refresh_tokens = relationship("RefreshToken", back_populates="user", cascade="all, delete-orphan")
     media_uploads = relationship("MediaUpload", back_populates="user", cascade="all, delete-orphan")
     
+    # Profile search by name; see the search keys in src/profiles/models.py
+    __table_args__ = (
+        *search_key_indexes('display_name', sa.func.lower(display_name)),
+        *search_key_indexes('full_name', full_name_key(first_name, last_name)),
+    )
+    
     def __repr__(self):
         return f"<User {self.email}>"
 
@@ -83,5 +119,10 @@ class LoginAttempt(Base):
     failure_reason = Column(String(100), nullable=True)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     
+    # Recent failed-attempt counts (lockout checks)
+    __table_args__ = (
+        sa.Index("ix_login_attempts_email_success_created_at", "email", "success", "created_at"),
+    )
+    
     def __repr__(self):
         return f"<LoginAttempt {self.email} {'success' if self.success else 'failed'}>"
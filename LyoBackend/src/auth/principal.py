@@ -0,0 +1,98 @@
+# Authenticated Principal Cache
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import get_settings
+from ..core.logging import get_structured_logger
+from ..core.redis import TieredCache
+from .models import User
+
+logger = get_structured_logger(__name__)
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Compact, immutable snapshot of an authenticated user"""
+    id: UUID
+    role: str
+    is_active: bool
+    is_verified: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        """Build principal from a user row"""
+        return cls(
+            id=user.id,
+            role=user.role,
+            is_active=user.is_active,
+            is_verified=user.is_verified,
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Principal":
+        """Build principal from its cached representation"""
+        return cls(
+            id=UUID(data["id"]),
+            role=data["role"],
+            is_active=data["is_active"],
+            is_verified=data["is_verified"],
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get cacheable representation"""
+        return {
+            "id": str(self.id),
+            "role": self.role,
+            "is_active": self.is_active,
+            "is_verified": self.is_verified,
+        }
+
+
+class PrincipalCache:
+    """Principal cache backed by the shared two-tier cache"""
+
+    def __init__(self):
+        settings = get_settings()
+        self.cache = TieredCache(
+            namespace="principal",
+            l1_maxsize=settings.principal_cache_size,
+            l1_ttl=settings.principal_cache_local_ttl,
+            ttl=settings.principal_cache_ttl,
+        )
+
+    async def get(self, user_id: UUID, session: AsyncSession) -> Optional[Principal]:
+        """Resolve principal from cache, loading it from the database on a miss"""
+
+        async def load() -> Optional[Dict[str, Any]]:
+            row_query = await session.execute(
+                select(User.id, User.role, User.is_active, User.is_verified)
+                .where(User.id == user_id)
+            )
+            row = row_query.one_or_none()
+            if not row:
+                return None
+
+            return Principal(
+                id=row.id,
+                role=row.role,
+                is_active=row.is_active,
+                is_verified=row.is_verified,
+            ).to_dict()
+
+        cached = await self.cache.get_or_load(str(user_id), load)
+        if not cached:
+            return None
+        return Principal.from_dict(cached)
+
+    async def invalidate(self, user_id: UUID) -> None:
+        """Drop cached principal after the user row changes"""
+        await self.cache.invalidate(str(user_id))
+        logger.debug(f"Principal invalidated: {user_id}")
+
+
+# Global principal cache instance
+principal_cache = PrincipalCache()
@@ -5,9 +5,13 @@ from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..core.database import get_db
+from ..core.exceptions import ServiceUnavailableError
 from ..core.logging import get_structured_logger
+from ..profiles.autocomplete import profile_autocomplete
 from .dependencies import get_client_ip, get_current_user, get_user_agent
+from .hashing import password_hasher
 from .models import User
+from .principal import principal_cache
 from .schemas import (
     AppleSignInRequest,
     LoginRequest,
@@ -54,6 +58,12 @@ async def login(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail=str(e)
         )
+    except ServiceUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=e.message,
+            headers={"Retry-After": "1"}
+        )
     except AuthenticationError as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -78,6 +88,12 @@ async def register(
             status_code=status.HTTP_429_TOO_MANY_REQUESTS,
             detail=str(e)
         )
+    except ServiceUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=e.message,
+            headers={"Retry-After": "1"}
+        )
     except AuthenticationError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -178,12 +194,29 @@ async def update_current_user(
     
     await session.commit()
     await session.refresh(current_user)
+    await principal_cache.invalidate(current_user.id)
+    if "display_name" in update_data:
+        # Display names are matched by profile typeahead
+        await profile_autocomplete.publish(current_user.id, session)
     
     logger.info(f"User profile updated: {current_user.email}")
     
     return UserResponse.model_validate(current_user)
 
 
+@router.delete("/me")
+async def deactivate_current_user(
+    session: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Deactivate current user account and sign out everywhere"""
+    await auth_service.deactivate_user(session, current_user.id)
+    
+    logger.info(f"User deactivated: {current_user.email}")
+    
+    return {"message": "Account deactivated"}
+
+
 @router.post("/change-password")
 async def change_password(
     password_change: PasswordChange,
@@ -191,16 +224,26 @@ async def change_password(
     current_user: User = Depends(get_current_user)
 ):
     """Change user password"""
-    # Verify current password
-    if not auth_service.verify_password(password_change.current_password, current_user.hashed_password):
+    try:
+        # Verify current password
+        if not await password_hasher.verify(password_change.current_password, current_user.hashed_password):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Current password is incorrect"
+            )
+        
+        # Update password
+        current_user.hashed_password = await password_hasher.hash(password_change.new_password)
+        
+    except ServiceUnavailableError as e:
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Current password is incorrect"
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=e.message,
+            headers={"Retry-After": "1"}
         )
     
-    # Update password
-    current_user.hashed_password = auth_service.hash_password(password_change.new_password)
     await session.commit()
+    await principal_cache.invalidate(current_user.id)
     
     logger.info(f"Password changed for user: {current_user.email}")
     
@@ -2,24 +2,25 @@
 import hashlib
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Tuple
+from uuid import UUID
 
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy import and_, desc, select
+from sqlalchemy import and_, func, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..core.cache import LRUCache
 from ..core.config import get_settings
 from ..core.logging import get_structured_logger, log_security_event
-from ..core.redis import get_rate_limiter
+from ..core.redis import get_rate_limiter, get_redis
 from ..core.utils import generate_secure_token, utc_now
+from .audit import login_attempt_sink
+from .hashing import password_hasher, pwd_context
 from .models import LoginAttempt, RefreshToken, User
+from .principal import principal_cache
 from .schemas import AppleSignInRequest, LoginRequest, RegisterRequest, UserResponse
 
 logger = get_structured_logger(__name__)
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 
 class AuthenticationError(Exception):
     """Authentication error"""
@@ -41,13 +42,15 @@ class AuthService:
     
     def __init__(self):
         self.settings = get_settings()
+        # Verified access-token payloads keyed by token digest, held until `exp`
+        self.token_cache = LRUCache(maxsize=self.settings.token_cache_size)
     
     def hash_password(self, password: str) -> str:
-        """Hash password using bcrypt"""
+        """Hash password using bcrypt (blocking; use password_hasher in handlers)"""
         return pwd_context.hash(password)
     
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        """Verify password against hash"""
+        """Verify password against hash (blocking; use password_hasher in handlers)"""
         return pwd_context.verify(plain_password, hashed_password)
     
     def create_access_token(self, user_id: str, role: str) -> str:
@@ -75,21 +78,29 @@ class AuthService:
     
     def verify_token(self, token: str) -> dict:
         """Verify JWT token and return payload"""
+        token_digest = hashlib.sha256(token.encode()).digest()
+        cached_payload = self.token_cache.get(token_digest)
+        if cached_payload is not None:
+            return dict(cached_payload)
+        
         try:
             payload = jwt.decode(
                 token,
                 self.settings.jwt_secret_key,
                 algorithms=[self.settings.jwt_algorithm]
             )
-            
-            # Check expiration
-            if payload.get("exp", 0) < utc_now().timestamp():
-                raise AuthenticationError("Token expired")
-            
-            return payload
-            
         except JWTError as e:
             raise AuthenticationError(f"Invalid token: {str(e)}")
+        
+        # Check expiration
+        remaining = payload.get("exp", 0) - utc_now().timestamp()
+        if remaining < 0:
+            raise AuthenticationError("Token expired")
+        
+        # Cache until the token expires
+        self.token_cache.set(token_digest, payload, ttl=remaining)
+        
+        return dict(payload)
     
     async def check_rate_limit(self, key: str, limit: int) -> None:
         """Check rate limit and raise error if exceeded"""
@@ -108,20 +119,28 @@ class AuthService:
         ip_address: Optional[str] = None,
         user_agent: Optional[str] = None,
         failure_reason: Optional[str] = None
-    ) -> None:
-        """Log login attempt"""
-        attempt = LoginAttempt(
-            email=email.lower(),
-            ip_address=ip_address,
-            user_agent=user_agent,
-            success=success,
-            failure_reason=failure_reason
-        )
+    ) -> bool:
+        """Log login attempt.
+        
+        Attempts go to the buffered audit sink. If the sink is not running
+        or is full, the row is added to `session` instead and is written by
+        the caller's next commit. Returns True if the attempt was buffered.
+        """
+        attempt = {
+            "email": email.lower(),
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "success": success,
+            "failure_reason": failure_reason,
+            "created_at": utc_now(),
+        }
         
-        session.add(attempt)
-        await session.commit()
+        buffered = login_attempt_sink.submit(attempt)
+        if not buffered:
+            session.add(LoginAttempt(**attempt))
         
         if not success:
+            await self.record_failed_attempt(email)
             log_security_event(
                 "login_failed",
                 {
@@ -130,6 +149,8 @@ class AuthService:
                     "reason": failure_reason
                 }
             )
+        
+        return buffered
     
     async def register_user(
         self,
@@ -154,7 +175,7 @@ class AuthService:
         # Create user
         user = User(
             email=request.email.lower(),
-            hashed_password=self.hash_password(request.password),
+            hashed_password=await password_hasher.hash(request.password),
             first_name=request.first_name,
             last_name=request.last_name,
             display_name=request.display_name or f"{request.first_name} {request.last_name}",
@@ -162,8 +183,16 @@ class AuthService:
         )
         
         session.add(user)
+        await session.flush()
+        
+        # Imported here: the profiles package imports auth
+        from ..profiles.autocomplete import profile_autocomplete
+        from ..profiles.service import ProfileService
+        
+        await ProfileService.create_default_profile(user.id, session)
         await session.commit()
         await session.refresh(user)
+        await profile_autocomplete.publish(user.id, session)
         
         logger.info(f"User registered: {user.email}")
         
@@ -195,10 +224,12 @@ class AuthService:
         user = user_query.scalar_one_or_none()
         
         # Verify password
-        if not user or not self.verify_password(request.password, user.hashed_password):
-            await self.log_login_attempt(
+        if not user or not await password_hasher.verify(request.password, user.hashed_password):
+            buffered = await self.log_login_attempt(
                 session, request.email, False, ip_address, user_agent, "invalid_credentials"
             )
+            if not buffered:
+                await session.commit()
             raise AuthenticationError("Invalid email or password")
         
         # Create tokens
@@ -218,13 +249,14 @@ class AuthService:
         # Update last login
         user.last_login = utc_now()
         
-        await session.commit()
-        
         # Log successful login
         await self.log_login_attempt(
             session, request.email, True, ip_address, user_agent
         )
         
+        # Refresh token, last_login and (unbuffered) attempt in one flush
+        await session.commit()
+        
         logger.info(f"User authenticated: {user.email}")
         
         return UserResponse.model_validate(user), access_token, refresh_token
@@ -300,6 +332,25 @@ class AuthService:
         
         return False
     
+    async def deactivate_user(
+        self,
+        session: AsyncSession,
+        user_id: UUID
+    ) -> None:
+        """Deactivate user and revoke all refresh tokens"""
+        await session.execute(
+            update(User).where(User.id == user_id).values(is_active=False)
+        )
+        await session.execute(
+            update(RefreshToken)
+            .where(RefreshToken.user_id == user_id)
+            .values(is_blacklisted=True)
+        )
+        await session.commit()
+        await principal_cache.invalidate(user_id)
+        
+        log_security_event("user_deactivated", {"user_id": str(user_id)})
+    
     async def authenticate_apple_signin(
         self,
         session: AsyncSession,
@@ -316,7 +367,12 @@ class AuthService:
             self.settings.rate_limit_auth
         )
         
+        # Imported here: the profiles package imports auth
+        from ..profiles.autocomplete import profile_autocomplete
+        from ..profiles.service import ProfileService
+        
         # Check if user exists by Apple user ID
+        created = False
         user_query = await session.execute(
             select(User).where(User.apple_user_id == request.user_identifier)
         )
@@ -345,6 +401,9 @@ class AuthService:
                     is_verified=True  # Apple Sign-In users are considered verified
                 )
                 session.add(user)
+                await session.flush()
+                await ProfileService.create_default_profile(user.id, session)
+                created = True
         
         if not user:
             raise AuthenticationError("Unable to authenticate with Apple Sign-In")
@@ -368,11 +427,30 @@ class AuthService:
         
         await session.commit()
         await session.refresh(user)
+        if created:
+            await profile_autocomplete.publish(user.id, session)
         
         logger.info(f"Apple Sign-In authentication: {user.email}")
         
         return UserResponse.model_validate(user), access_token, refresh_token
     
+    def _failed_attempts_key(self, email: str, bucket: int) -> str:
+        return f"auth:failed:{email.lower()}:{bucket}"
+    
+    async def record_failed_attempt(self, email: str) -> None:
+        """Count failed attempt in its time bucket; buckets expire after the tracking window"""
+        bucket_seconds = self.settings.failed_login_bucket_seconds
+        bucket = int(utc_now().timestamp()) // bucket_seconds
+        key = self._failed_attempts_key(email, bucket)
+        
+        try:
+            pipe = get_redis().pipeline()
+            pipe.incr(key)
+            pipe.expire(key, self.settings.failed_login_tracking_hours * 3600 + bucket_seconds)
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed attempt counter error: {e}")
+    
     async def get_recent_failed_attempts(
         self,
         session: AsyncSession,
@@ -382,17 +460,34 @@ class AuthService:
         """Get count of recent failed login attempts"""
         since = utc_now() - timedelta(hours=hours)
         
+        # Bucketed counters cover up to `failed_login_tracking_hours`, to the
+        # nearest bucket; the oldest bucket may predate `since` slightly
+        if hours <= self.settings.failed_login_tracking_hours:
+            bucket_seconds = self.settings.failed_login_bucket_seconds
+            first = int(since.timestamp()) // bucket_seconds
+            last = int(utc_now().timestamp()) // bucket_seconds
+            try:
+                counts = await get_redis().mget(
+                    [self._failed_attempts_key(email, bucket) for bucket in range(first, last + 1)]
+                )
+                return sum(int(count) for count in counts if count)
+            except Exception as e:
+                logger.error(f"Failed attempt counter error, falling back to SQL: {e}")
+        
+        # Served by ix_login_attempts_email_success_created_at
         count_query = await session.execute(
-            select(LoginAttempt).where(
+            select(func.count())
+            .select_from(LoginAttempt)
+            .where(
                 and_(
                     LoginAttempt.email == email.lower(),
                     LoginAttempt.success == False,
                     LoginAttempt.created_at > since
                 )
-            ).order_by(desc(LoginAttempt.created_at))
+            )
         )
         
-        return len(count_query.scalars().all())
+        return count_query.scalar_one()
 
 
 # Global auth service instance
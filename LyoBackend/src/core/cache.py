@@ -0,0 +1,77 @@
+# In-Process Caching Utilities
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class LRUCache:
+    """Bounded, TTL-aware LRU cache for process-local hot data"""
+
+    def __init__(self, maxsize: int = 1024, default_ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self._data: "OrderedDict[Hashable, Tuple[Optional[float], Any]]" = OrderedDict()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get value if present and not expired"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Set value, evicting the least recently used entries when full"""
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl is not None and ttl <= 0:
+            self._data.pop(key, None)
+            return
+
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        """Delete value from cache"""
+        return self._data.pop(key, None) is not None
+
+    def clear(self) -> None:
+        """Remove all entries (counters are kept)"""
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and (entry[0] is None or entry[0] > time.monotonic())
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache counters"""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,211 @@
+# Cache and Pub/Sub Payload Codecs
+import json
+from datetime import date, datetime
+from enum import IntEnum
+from functools import lru_cache
+from typing import Any, Union
+from uuid import UUID
+
+from .config import get_settings
+from .logging import get_structured_logger
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+logger = get_structured_logger(__name__)
+
+
+# Header byte layout: 1VVSSSCC
+#   1   marker; JSON text always starts with an ASCII byte, so legacy
+#       payloads written before codecs existed never have this bit set
+#   VV  format version
+#   SSS serializer
+#   CC  compression
+HEADER_MARKER = 0x80
+FORMAT_VERSION = 1
+
+
+class Serializer(IntEnum):
+    """Payload serializer"""
+    JSON = 0
+    ORJSON = 1
+    MSGPACK = 2
+
+
+class Compression(IntEnum):
+    """Payload compression"""
+    NONE = 0
+    ZSTD = 1
+    LZ4 = 2
+
+
+# msgpack extension types, so UUIDs and datetimes round-trip intact
+_EXT_UUID = 1
+_EXT_DATETIME = 2
+_EXT_DATE = 3
+
+
+def _msgpack_default(value: Any) -> Any:
+    if isinstance(value, UUID):
+        return msgpack.ExtType(_EXT_UUID, value.bytes)
+    if isinstance(value, datetime):
+        return msgpack.ExtType(_EXT_DATETIME, value.isoformat().encode())
+    if isinstance(value, date):
+        return msgpack.ExtType(_EXT_DATE, value.isoformat().encode())
+    return str(value)
+
+
+def _msgpack_ext_hook(code: int, data: bytes) -> Any:
+    if code == _EXT_UUID:
+        return UUID(bytes=data)
+    if code == _EXT_DATETIME:
+        return datetime.fromisoformat(data.decode())
+    if code == _EXT_DATE:
+        return date.fromisoformat(data.decode())
+    return msgpack.ExtType(code, data)
+
+
+def _serialize(serializer: Serializer, value: Any) -> bytes:
+    if serializer == Serializer.MSGPACK:
+        return msgpack.packb(value, use_bin_type=True, default=_msgpack_default)
+    if serializer == Serializer.ORJSON:
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=str).encode()
+
+
+def _deserialize(serializer: Serializer, data: bytes) -> Any:
+    if serializer == Serializer.MSGPACK:
+        return msgpack.unpackb(
+            data, raw=False, ext_hook=_msgpack_ext_hook, strict_map_key=False
+        )
+    if serializer == Serializer.ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _compress(compression: Compression, data: bytes) -> bytes:
+    if compression == Compression.ZSTD:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    if compression == Compression.LZ4:
+        return lz4_frame.compress(data)
+    return data
+
+
+def _decompress(compression: Compression, data: bytes) -> bytes:
+    if compression == Compression.ZSTD:
+        return zstandard.ZstdDecompressor().decompress(data)
+    if compression == Compression.LZ4:
+        return lz4_frame.decompress(data)
+    return data
+
+
+_SERIALIZER_LIBS = {
+    Serializer.JSON: json,
+    Serializer.ORJSON: orjson,
+    Serializer.MSGPACK: msgpack,
+}
+
+_COMPRESSION_LIBS = {
+    Compression.ZSTD: zstandard,
+    Compression.LZ4: lz4_frame,
+}
+
+
+def is_available(backend: Union[Serializer, Compression]) -> bool:
+    """Check optional library for a serializer or compression is installed"""
+    if isinstance(backend, Serializer):
+        return _SERIALIZER_LIBS[backend] is not None
+    if backend is Compression.NONE:
+        return True
+    return _COMPRESSION_LIBS[backend] is not None
+
+
+class Codec:
+    """Encode values for Redis with a versioned header byte.
+
+    Decoding follows the header of each payload rather than the codec's own
+    settings, so the configured format can change without flushing Redis.
+    Only msgpack preserves UUID and datetime types; the JSON backends turn
+    them into strings.
+    """
+
+    def __init__(
+        self,
+        serializer: Serializer = Serializer.MSGPACK,
+        compression: Compression = Compression.NONE,
+        compress_threshold: int = 1024
+    ):
+        self.serializer = Serializer(serializer)
+        self.compression = Compression(compression)
+        self.compress_threshold = compress_threshold
+
+        for backend in (self.serializer, self.compression):
+            if not is_available(backend):
+                raise ValueError(f"{backend.name.lower()} is not installed")
+
+    def encode(self, value: Any) -> bytes:
+        """Serialize value, compressing it above the size threshold"""
+        data = _serialize(self.serializer, value)
+
+        compression = Compression.NONE
+        if self.compression != Compression.NONE and len(data) >= self.compress_threshold:
+            compression = self.compression
+            data = _compress(compression, data)
+
+        if self.serializer == Serializer.JSON and compression == Compression.NONE:
+            # Bare JSON, readable by workers that predate codecs
+            return data
+
+        header = HEADER_MARKER | (FORMAT_VERSION << 5) | (self.serializer << 2) | compression
+        return bytes((header,)) + data
+
+    def decode(self, data: Union[bytes, str]) -> Any:
+        """Deserialize payload written by any codec version"""
+        if isinstance(data, str):
+            return json.loads(data)
+
+        if not data or not data[0] & HEADER_MARKER:
+            return json.loads(data)
+
+        header = data[0]
+        version = (header >> 5) & 0b11
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported codec format version {version}")
+
+        serializer = Serializer((header >> 2) & 0b111)
+        compression = Compression(header & 0b11)
+        payload = _decompress(compression, data[1:])
+        return _deserialize(serializer, payload)
+
+
+@lru_cache()
+def get_codec() -> Codec:
+    """Get codec configured in settings, falling back to stdlib JSON"""
+    settings = get_settings()
+
+    try:
+        return Codec(
+            serializer=Serializer[settings.cache_codec.upper()],
+            compression=Compression[settings.cache_compression.upper()],
+            compress_threshold=settings.cache_compress_threshold,
+        )
+    except (KeyError, ValueError) as e:
+        logger.warning(f"Cache codec unavailable ({e}), falling back to json")
+        return Codec(serializer=Serializer.JSON)
@@ -35,6 +35,45 @@ class Settings(BaseSettings):
     jwt_algorithm: str = config("JWT_ALGORITHM", default="HS256")
     access_token_expire_minutes: int = config("ACCESS_TOKEN_EXPIRE_MINUTES", default=30, cast=int)
     refresh_token_expire_days: int = config("REFRESH_TOKEN_EXPIRE_DAYS", default=30, cast=int)
+    token_cache_size: int = config("TOKEN_CACHE_SIZE", default=10000, cast=int)
+    
+    # Principal cache (seconds)
+    principal_cache_size: int = config("PRINCIPAL_CACHE_SIZE", default=10000, cast=int)
+    principal_cache_local_ttl: int = config("PRINCIPAL_CACHE_LOCAL_TTL", default=30, cast=int)
+    principal_cache_ttl: int = config("PRINCIPAL_CACHE_TTL", default=300, cast=int)
+    
+    # Password hashing pool (executor: thread or process)
+    password_hash_workers: int = config("PASSWORD_HASH_WORKERS", default=4, cast=int)
+    password_hash_max_queue: int = config("PASSWORD_HASH_MAX_QUEUE", default=64, cast=int)
+    password_hash_executor: str = config("PASSWORD_HASH_EXECUTOR", default="thread")
+    
+    # Login attempt audit sink
+    login_audit_batch_size: int = config("LOGIN_AUDIT_BATCH_SIZE", default=100, cast=int)
+    login_audit_flush_ms: int = config("LOGIN_AUDIT_FLUSH_MS", default=250, cast=int)
+    login_audit_max_buffer: int = config("LOGIN_AUDIT_MAX_BUFFER", default=10000, cast=int)
+    
+    # Failed login counters (Redis time buckets)
+    failed_login_tracking_hours: int = config("FAILED_LOGIN_TRACKING_HOURS", default=24, cast=int)
+    failed_login_bucket_seconds: int = config("FAILED_LOGIN_BUCKET_SECONDS", default=300, cast=int)
+    
+    # Follow counters
+    follow_counter_hot_threshold: int = config("FOLLOW_COUNTER_HOT_THRESHOLD", default=10000, cast=int)
+    follow_counter_shards: int = config("FOLLOW_COUNTER_SHARDS", default=8, cast=int)
+    follow_counter_flush_ms: int = config("FOLLOW_COUNTER_FLUSH_MS", default=1000, cast=int)
+    
+    # XP write-behind buffer
+    xp_buffer_shards: int = config("XP_BUFFER_SHARDS", default=8, cast=int)
+    xp_flush_ms: int = config("XP_FLUSH_MS", default=1000, cast=int)
+    
+    # XP leaderboards
+    leaderboard_rebuild_batch_size: int = config("LEADERBOARD_REBUILD_BATCH_SIZE", default=5000, cast=int)
+    leaderboard_check_interval: int = config("LEADERBOARD_CHECK_INTERVAL", default=60, cast=int)
+    leaderboard_page_ttl: int = config("LEADERBOARD_PAGE_TTL", default=15, cast=int)
+    leaderboard_page_stale_ttl: int = config("LEADERBOARD_PAGE_STALE_TTL", default=60, cast=int)
+    
+    # Profile typeahead index
+    profile_autocomplete_enabled: bool = config("PROFILE_AUTOCOMPLETE_ENABLED", default=True, cast=bool)
+    profile_autocomplete_batch_size: int = config("PROFILE_AUTOCOMPLETE_BATCH_SIZE", default=10000, cast=int)
     
     # Google Cloud
     google_cloud_project: str = config("GOOGLE_CLOUD_PROJECT", default="")
@@ -65,6 +104,12 @@ class Settings(BaseSettings):
     rate_limit_posting: int = config("RATE_LIMIT_POSTING", default=20, cast=int)
     rate_limit_messaging: int = config("RATE_LIMIT_MESSAGING", default=100, cast=int)
     rate_limit_search: int = config("RATE_LIMIT_SEARCH", default=60, cast=int)
+    rate_limit_algorithm: str = config("RATE_LIMIT_ALGORITHM", default="gcra")  # fixed_window, sliding_log, gcra
+    
+    # Cache serialization
+    cache_codec: str = config("CACHE_CODEC", default="msgpack")  # json, orjson, msgpack
+    cache_compression: str = config("CACHE_COMPRESSION", default="none")  # none, zstd, lz4
+    cache_compress_threshold: int = config("CACHE_COMPRESS_THRESHOLD", default=1024, cast=int)
     
     # Logging
     log_level: str = config("LOG_LEVEL", default="INFO")
@@ -89,6 +134,25 @@ class Settings(BaseSettings):
     
     # Media
     max_file_size_mb: int = config("MAX_FILE_SIZE_MB", default=100, cast=int)
+    # Upload read/write chunk; GCS resumable uploads need a multiple of 256 KiB
+    media_upload_chunk_size: int = config("MEDIA_UPLOAD_CHUNK_SIZE", default=1024 * 1024, cast=int)
+    media_storage_backend: str = config("MEDIA_STORAGE_BACKEND", default="auto")  # auto, gcs, local, memory
+    media_storage_workers: int = config("MEDIA_STORAGE_WORKERS", default=8, cast=int)
+    media_local_root: str = config("MEDIA_LOCAL_ROOT", default="uploads")
+    media_base_url: str = config("MEDIA_BASE_URL", default="http://localhost:8000")
+    
+    # Image derivatives (resized copies rendered in a process pool)
+    media_derivative_widths: List[int] = config(
+        "MEDIA_DERIVATIVE_WIDTHS",
+        default="160,320,640,1280",
+        cast=lambda v: [int(s) for s in v.split(',')]
+    )
+    media_derivative_formats: List[str] = config(
+        "MEDIA_DERIVATIVE_FORMATS",
+        default="webp,avif",
+        cast=lambda v: [s.strip() for s in v.split(',')]
+    )
+    media_derivative_workers: int = config("MEDIA_DERIVATIVE_WORKERS", default=0, cast=int)  # 0 = one per core
     allowed_media_types: List[str] = config(
         "ALLOWED_MEDIA_TYPES",
         default="image/jpeg,image/png,image/webp,video/mp4,video/quicktime",
@@ -4,6 +4,7 @@ from contextlib import asynccontextmanager
 from typing import AsyncGenerator, Optional
 
 import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.pool import NullPool
@@ -92,6 +93,13 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
+def dialect_insert(session: AsyncSession, table):
+    """INSERT with ON CONFLICT support for the session's dialect (SQLite in tests)"""
+    if session.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(table)
+    return postgresql.insert(table)
+
+
 # Health check function
 async def check_db_health() -> bool:
     """Check database connectivity"""
@@ -0,0 +1,266 @@
+# Rate Limiting Engine
+import math
+import secrets
+import time
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+import redis.asyncio as redis
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import NoScriptError
+from redis.exceptions import TimeoutError as RedisTimeoutError
+
+from .cache import LRUCache
+from .logging import get_structured_logger
+
+logger = get_structured_logger(__name__)
+
+
+class RateLimitAlgorithm(str, Enum):
+    """Rate limiting algorithm"""
+    FIXED_WINDOW = "fixed_window"
+    SLIDING_LOG = "sliding_log"
+    GCRA = "gcra"
+
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    """Outcome of a single rate limit check"""
+    limited: bool
+    current: int
+    remaining: int
+    retry_after: float = 0.0
+
+
+# Server-side scripts. Each check is a single EVALSHA and uses the Redis
+# clock, so every worker agrees on window boundaries.
+#
+# Common arguments: KEYS[1] = key, ARGV[1] = limit, ARGV[2] = window (ms),
+# ARGV[3] = increment. Every script returns {limited, current, retry_after_ms}.
+
+_FIXED_WINDOW_SCRIPT = """
+local current = redis.call('INCRBY', KEYS[1], ARGV[3])
+local ttl = redis.call('PTTL', KEYS[1])
+if ttl < 0 then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    ttl = tonumber(ARGV[2])
+end
+if current > tonumber(ARGV[1]) then
+    return {1, current, ttl}
+end
+return {0, current, 0}
+"""
+
+# ARGV[4] = unique member prefix
+_SLIDING_LOG_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local increment = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local current = redis.call('ZCARD', KEYS[1])
+
+if current + increment > limit then
+    local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+    local retry_after = window
+    if oldest[2] then
+        retry_after = tonumber(oldest[2]) + window - now
+    end
+    return {1, current, retry_after}
+end
+
+for i = 1, increment do
+    redis.call('ZADD', KEYS[1], now, ARGV[4] .. ':' .. i)
+end
+redis.call('PEXPIRE', KEYS[1], window)
+return {0, current + increment, 0}
+"""
+
+# Generic cell rate algorithm: stores only the theoretical arrival time (TAT)
+_GCRA_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local increment = tonumber(ARGV[3])
+local interval = window / limit
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + tonumber(time[2]) / 1000
+
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then
+    tat = now
+end
+
+local new_tat = tat + increment * interval
+local allow_at = new_tat - window
+if allow_at > now then
+    local used = math.ceil((tat - now) / interval)
+    return {1, used, math.ceil(allow_at - now)}
+end
+
+redis.call('SET', KEYS[1], string.format('%.3f', new_tat), 'PX', math.ceil(new_tat - now))
+return {0, math.ceil((new_tat - now) / interval), 0}
+"""
+
+_SCRIPTS: Dict[RateLimitAlgorithm, str] = {
+    RateLimitAlgorithm.FIXED_WINDOW: _FIXED_WINDOW_SCRIPT,
+    RateLimitAlgorithm.SLIDING_LOG: _SLIDING_LOG_SCRIPT,
+    RateLimitAlgorithm.GCRA: _GCRA_SCRIPT,
+}
+
+# SHA1 of loaded scripts, shared by all engine instances
+_script_shas: Dict[RateLimitAlgorithm, str] = {}
+
+# Errors meaning Redis can't be reached; anything else is a real failure
+_UNAVAILABLE_ERRORS = (RedisConnectionError, RedisTimeoutError, OSError)
+
+
+class LocalRateLimiter:
+    """In-memory rate limiter used while Redis is unavailable.
+
+    Limits are enforced per process, so during an outage the effective
+    limit is multiplied by the number of workers.
+    """
+
+    def __init__(self, max_keys: int = 10000):
+        self._state = LRUCache(maxsize=max_keys)
+
+    def hit(
+        self,
+        algorithm: RateLimitAlgorithm,
+        key: str,
+        limit: int,
+        window: int,
+        increment: int = 1
+    ) -> RateLimitResult:
+        """Check and record hit"""
+        now = time.monotonic()
+
+        if algorithm == RateLimitAlgorithm.FIXED_WINDOW:
+            current, expires_at = self._state.get(key) or (0, now + window)
+            current += increment
+            self._state.set(key, (current, expires_at), ttl=expires_at - now)
+            if current > limit:
+                return RateLimitResult(True, current, 0, expires_at - now)
+            return RateLimitResult(False, current, limit - current)
+
+        if algorithm == RateLimitAlgorithm.SLIDING_LOG:
+            log = self._state.get(key)
+            if log is None:
+                log = deque()
+            while log and log[0] <= now - window:
+                log.popleft()
+            if len(log) + increment > limit:
+                retry_after = log[0] + window - now if log else window
+                self._state.set(key, log, ttl=window)
+                return RateLimitResult(True, len(log), 0, retry_after)
+            log.extend([now] * increment)
+            self._state.set(key, log, ttl=window)
+            return RateLimitResult(False, len(log), limit - len(log))
+
+        # GCRA
+        interval = window / limit
+        tat = max(self._state.get(key) or now, now)
+        new_tat = tat + increment * interval
+        allow_at = new_tat - window
+        if allow_at > now:
+            used = math.ceil((tat - now) / interval)
+            return RateLimitResult(True, used, max(limit - used, 0), allow_at - now)
+        self._state.set(key, new_tat, ttl=new_tat - now)
+        used = math.ceil((new_tat - now) / interval)
+        return RateLimitResult(False, used, max(limit - used, 0))
+
+    def reset(self, key: str) -> None:
+        """Reset state for key"""
+        self._state.delete(key)
+
+
+# Process-wide fallback state
+local_rate_limiter = LocalRateLimiter()
+
+
+class RateLimitEngine:
+    """Redis rate limiter that runs one server-side script per check"""
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        algorithm: RateLimitAlgorithm = RateLimitAlgorithm.GCRA,
+        fallback: Optional[LocalRateLimiter] = None
+    ):
+        self.redis = redis_client
+        self.algorithm = RateLimitAlgorithm(algorithm)
+        self.fallback = fallback or local_rate_limiter
+
+    async def _load_script(self, force: bool = False) -> str:
+        """Load script once with SCRIPT LOAD and remember its SHA"""
+        sha = _script_shas.get(self.algorithm)
+        if sha is None or force:
+            sha = await self.redis.script_load(_SCRIPTS[self.algorithm])
+            _script_shas[self.algorithm] = sha
+        return sha
+
+    def _key(self, key: str) -> str:
+        # Each algorithm stores a different Redis type, so switching
+        # algorithms must not reuse keys written by the previous one
+        return f"rl:{self.algorithm.value}:{key}"
+
+    def _script_args(self, limit: int, window: int, increment: int) -> List[Any]:
+        args: List[Any] = [limit, window * 1000, increment]
+        if self.algorithm == RateLimitAlgorithm.SLIDING_LOG:
+            args.append(secrets.token_hex(8))
+        return args
+
+    async def hit(
+        self,
+        key: str,
+        limit: int,
+        window: int = 60,
+        increment: int = 1
+    ) -> RateLimitResult:
+        """
+        Record hit and check rate limit.
+
+        Args:
+            key: Rate limit key (e.g., "auth:user_id")
+            limit: Maximum requests allowed per window
+            window: Time window in seconds
+            increment: Number of hits to record
+
+        Returns:
+            RateLimitResult for this check
+        """
+        key = self._key(key)
+        args = self._script_args(limit, window, increment)
+
+        try:
+            sha = await self._load_script()
+            try:
+                raw = await self.redis.evalsha(sha, 1, key, *args)
+            except NoScriptError:
+                # Script cache was flushed (restart, failover)
+                sha = await self._load_script(force=True)
+                raw = await self.redis.evalsha(sha, 1, key, *args)
+        except _UNAVAILABLE_ERRORS as e:
+            logger.warning(f"Rate limiter falling back to local state: {e}")
+            return self.fallback.hit(self.algorithm, key, limit, window, increment)
+
+        limited, current, retry_after_ms = (int(value) for value in raw)
+        return RateLimitResult(
+            limited=bool(limited),
+            current=current,
+            remaining=max(limit - current, 0),
+            retry_after=retry_after_ms / 1000,
+        )
+
+    async def reset(self, key: str) -> None:
+        """Reset rate limit for a key"""
+        key = self._key(key)
+        self.fallback.reset(key)
+        try:
+            await self.redis.delete(key)
+        except _UNAVAILABLE_ERRORS as e:
+            logger.warning(f"Rate limit reset skipped Redis for {key}: {e}")
@@ -1,14 +1,23 @@
 # Redis Configuration and Connection Management
+import asyncio
 import json
 import logging
+import math
+import random
+import secrets
+import time
 from contextlib import asynccontextmanager
-from typing import Any, AsyncGenerator, Dict, List, Optional, Union
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional, Set, Union
+from uuid import uuid4
 
 import redis.asyncio as redis
 from redis.asyncio import ConnectionPool
 
+from .cache import LRUCache
+from .codecs import Codec, get_codec
 from .config import get_settings
 from .logging import get_structured_logger
+from .rate_limit import RateLimitEngine, RateLimitResult
 
 logger = get_structured_logger(__name__)
 
@@ -16,10 +25,14 @@ logger = get_structured_logger(__name__)
 _redis_pool: Optional[ConnectionPool] = None
 _redis_client: Optional[redis.Redis] = None
 
+# Binary client for codec-encoded cache and pub/sub payloads
+_redis_binary_pool: Optional[ConnectionPool] = None
+_redis_binary_client: Optional[redis.Redis] = None
+
 
 async def init_redis() -> None:
     """Initialize Redis connection pool"""
-    global _redis_pool, _redis_client
+    global _redis_pool, _redis_client, _redis_binary_pool, _redis_binary_client
     
     settings = get_settings()
     
@@ -32,6 +45,14 @@ async def init_redis() -> None:
     
     _redis_client = redis.Redis(connection_pool=_redis_pool)
     
+    _redis_binary_pool = ConnectionPool.from_url(
+        settings.redis_url,
+        decode_responses=False,
+        max_connections=20,
+    )
+    
+    _redis_binary_client = redis.Redis(connection_pool=_redis_binary_pool)
+    
     # Test connection
     try:
         await _redis_client.ping()
@@ -43,13 +64,18 @@ async def init_redis() -> None:
 
 async def close_redis() -> None:
     """Close Redis connections"""
-    global _redis_pool, _redis_client
+    global _redis_pool, _redis_client, _redis_binary_pool, _redis_binary_client
+    
+    for client in (_redis_client, _redis_binary_client):
+        if client:
+            await client.aclose()
     
-    if _redis_client:
-        await _redis_client.aclose()
+    for pool in (_redis_pool, _redis_binary_pool):
+        if pool:
+            await pool.aclose()
     
-    if _redis_pool:
-        await _redis_pool.aclose()
+    _redis_pool = _redis_client = None
+    _redis_binary_pool = _redis_binary_client = None
     
     logger.info("Redis connections closed")
 
@@ -61,6 +87,13 @@ def get_redis() -> redis.Redis:
     return _redis_client
 
 
+def get_redis_binary() -> redis.Redis:
+    """Get Redis client that returns raw bytes (for codec-encoded payloads)"""
+    if not _redis_binary_client:
+        raise RuntimeError("Redis not initialized. Call init_redis() first.")
+    return _redis_binary_client
+
+
 async def check_redis_health() -> bool:
     """Check Redis connectivity"""
     try:
@@ -78,8 +111,11 @@ async def check_redis_health() -> bool:
 class RateLimiter:
     """Redis-based rate limiter"""
     
-    def __init__(self, redis_client: redis.Redis):
+    def __init__(self, redis_client: redis.Redis, algorithm: Optional[str] = None):
         self.redis = redis_client
+        self.engine = RateLimitEngine(
+            redis_client, algorithm or get_settings().rate_limit_algorithm
+        )
     
     async def is_rate_limited(
         self, 
@@ -100,31 +136,54 @@ class RateLimiter:
         Returns:
             Tuple of (is_limited, current_count)
         """
-        try:
-            pipe = self.redis.pipeline()
-            pipe.incr(key, increment)
-            pipe.expire(key, window)
-            results = await pipe.execute()
-            
-            current = int(results[0])
-            is_limited = current > limit
-            
-            return is_limited, current
-        except Exception as e:
-            logger.error(f"Rate limiter error: {e}")
-            return False, 0  # Fail open
+        result = await self.engine.hit(key, limit, window, increment)
+        return result.limited, result.current
+    
+    async def check(
+        self,
+        key: str,
+        limit: int,
+        window: int = 60,
+        increment: int = 1
+    ) -> RateLimitResult:
+        """Check rate limit and return remaining quota and retry-after"""
+        return await self.engine.hit(key, limit, window, increment)
     
     async def reset_rate_limit(self, key: str) -> None:
         """Reset rate limit for a key"""
-        await self.redis.delete(key)
+        await self.engine.reset(key)
+
+
+# Releases a lock only if it is still held by the caller
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Keep references so background refreshes are not garbage collected
+_background_refreshes: Set[asyncio.Task] = set()
 
 
 # Caching utilities
 class RedisCache:
-    """Redis-based caching utility"""
+    """Redis-based caching utility
     
-    def __init__(self, redis_client: redis.Redis):
+    Use with get_redis_binary(); the text client cannot read binary codecs.
+    """
+    
+    # Process-wide get_or_compute metrics
+    compute_stats: Dict[str, int] = {
+        "computes": 0,
+        "early_refreshes": 0,
+        "stale_served": 0,
+        "lock_waits": 0,
+    }
+    
+    def __init__(self, redis_client: redis.Redis, codec: Optional[Codec] = None):
         self.redis = redis_client
+        self.codec = codec or get_codec()
     
     async def get(self, key: str, default: Any = None) -> Any:
         """Get value from cache"""
@@ -132,7 +191,7 @@ class RedisCache:
             value = await self.redis.get(key)
             if value is None:
                 return default
-            return json.loads(value)
+            return self.codec.decode(value)
         except Exception as e:
             logger.error(f"Cache get error for key {key}: {e}")
             return default
@@ -145,7 +204,7 @@ class RedisCache:
     ) -> bool:
         """Set value in cache"""
         try:
-            serialized = json.dumps(value, default=str)
+            serialized = self.codec.encode(value)
             if ttl:
                 return await self.redis.setex(key, ttl, serialized)
             else:
@@ -177,19 +236,377 @@ class RedisCache:
         except Exception as e:
             logger.error(f"Cache increment error for key {key}: {e}")
             return 0
+    
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: int,
+        stale_ttl: int = 0,
+        beta: float = 1.0,
+        lock_timeout: int = 10,
+        wait_timeout: float = 5.0
+    ) -> Any:
+        """
+        Get value, recomputing it in at most one worker at a time.
+        
+        Entries are refreshed early with probabilistic early expiration
+        (XFetch): the closer an entry is to expiry, and the longer it took to
+        compute, the more likely a reader refreshes it ahead of time. With
+        `stale_ttl` set, expired entries are kept that much longer and served
+        while a background task recomputes them.
+        
+        `compute` may run after the caller's request has finished, so it must
+        open its own resources (e.g. `get_db_session()`) rather than close
+        over request-scoped ones. Values written by plain `set()` are treated
+        as misses.
+        
+        Args:
+            key: Cache key
+            compute: Coroutine function producing the value
+            ttl: Freshness lifetime in seconds
+            stale_ttl: Extra seconds an expired value may be served for
+            beta: Early expiration aggressiveness (> 1 favours earlier refresh)
+            lock_timeout: Recompute lock lifetime in seconds
+            wait_timeout: How long a miss waits for another worker's recompute
+        
+        Returns:
+            Cached or freshly computed value
+        """
+        envelope = self._unwrap(await self.get(key))
+        
+        if envelope is not None:
+            now = time.time()
+            if now - envelope["d"] * beta * math.log(1.0 - random.random()) < envelope["e"]:
+                return envelope["v"]
+            
+            # Due for refresh: whoever takes the lock recomputes in background
+            if now < envelope["e"]:
+                self.compute_stats["early_refreshes"] += 1
+            else:
+                self.compute_stats["stale_served"] += 1
+            
+            token = await self._acquire_lock(key, lock_timeout)
+            if token:
+                task = asyncio.create_task(
+                    self._background_refresh(key, compute, ttl, stale_ttl, token)
+                )
+                _background_refreshes.add(task)
+                task.add_done_callback(_background_refreshes.discard)
+            return envelope["v"]
+        
+        # Miss: one worker computes, the others wait for its result
+        token = await self._acquire_lock(key, lock_timeout)
+        if token:
+            return await self._refresh(key, compute, ttl, stale_ttl, token)
+        
+        self.compute_stats["lock_waits"] += 1
+        deadline = time.monotonic() + wait_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            envelope = self._unwrap(await self.get(key))
+            if envelope is not None:
+                return envelope["v"]
+        
+        # Lock holder is slow or gone; compute without caching
+        logger.warning(f"Cache recompute wait timed out for key {key}")
+        return await compute()
+    
+    @staticmethod
+    def _unwrap(envelope: Any) -> Optional[Dict[str, Any]]:
+        """XFetch envelope, or None for a miss or a value not written by get_or_compute"""
+        if isinstance(envelope, dict) and envelope.keys() == {"v", "d", "e"}:
+            return envelope
+        return None
+    
+    async def _refresh(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: int,
+        stale_ttl: int,
+        token: str
+    ) -> Any:
+        """Compute value and store it in an XFetch envelope"""
+        try:
+            started = time.time()
+            value = await compute()
+            finished = time.time()
+            self.compute_stats["computes"] += 1
+            
+            envelope = {"v": value, "d": finished - started, "e": finished + ttl}
+            await self.set(key, envelope, ttl + stale_ttl)
+            return value
+        except Exception as e:
+            logger.error(f"Cache recompute error for key {key}: {e}")
+            raise
+        finally:
+            await self._release_lock(key, token)
+    
+    async def _background_refresh(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: int,
+        stale_ttl: int,
+        token: str
+    ) -> None:
+        """Refresh off the request path; failures keep serving the old value"""
+        try:
+            await self._refresh(key, compute, ttl, stale_ttl, token)
+        except Exception:
+            pass  # Already logged by _refresh
+    
+    async def _acquire_lock(self, key: str, timeout: int) -> Optional[str]:
+        """Take short-lived recompute lock; returns owner token if acquired"""
+        token = secrets.token_hex(8)
+        try:
+            acquired = await self.redis.set(
+                f"lock:{key}", token, nx=True, px=timeout * 1000
+            )
+        except Exception as e:
+            # Without Redis there is nothing to coordinate with
+            logger.error(f"Cache lock error for key {key}: {e}")
+            return token
+        return token if acquired else None
+    
+    async def _release_lock(self, key: str, token: str) -> None:
+        """Release recompute lock if still held"""
+        try:
+            await self.redis.eval(_RELEASE_LOCK_SCRIPT, 1, f"lock:{key}", token)
+        except Exception as e:
+            logger.error(f"Cache unlock error for key {key}: {e}")
+
+
+class TieredCache:
+    """Two-tier cache: bounded in-process LRU (L1) in front of Redis (L2).
+    
+    Values held in L1 are shared between callers and must be treated as
+    read-only. Concurrent misses for one key are coalesced into a single
+    load, and invalidations are broadcast so other workers drop their L1
+    copy immediately.
+    """
+    
+    invalidation_channel = "cache:invalidate"
+    
+    # Live namespaces, for metrics and invalidation routing
+    namespaces: Dict[str, "TieredCache"] = {}
+    
+    def __init__(
+        self,
+        namespace: str,
+        l1_maxsize: int = 1024,
+        l1_ttl: int = 30,
+        ttl: int = 300
+    ):
+        self.namespace = namespace
+        self.local = LRUCache(maxsize=l1_maxsize, default_ttl=l1_ttl)
+        self.ttl = ttl
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Bumped by invalidations that land while a key is loading
+        self._generations: Dict[str, int] = {}
+        
+        # Metrics
+        self.l1_hits = 0
+        self.l2_hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.coalesced = 0
+        
+        TieredCache.namespaces[namespace] = self
+    
+    def _key(self, key: str) -> str:
+        return f"cache:{self.namespace}:{key}"
+    
+    def _shared(self) -> Optional[RedisCache]:
+        """Get L2 tier, if Redis is available"""
+        try:
+            return RedisCache(get_redis_binary())
+        except RuntimeError:
+            return None
+    
+    async def get(self, key: str, default: Any = None) -> Any:
+        """Get value from L1, then L2"""
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            self.l1_hits += 1
+            return value
+        
+        shared = self._shared()
+        if shared:
+            value = await shared.get(self._key(key), _MISSING)
+            if value is not _MISSING:
+                self.l2_hits += 1
+                self.local.set(key, value)
+                return value
+        
+        self.misses += 1
+        return default
+    
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        """Set value in both tiers"""
+        self.local.set(key, value)
+        
+        shared = self._shared()
+        if shared:
+            await shared.set(self._key(key), value, ttl or self.ttl)
+    
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: Optional[int] = None
+    ) -> Any:
+        """
+        Get value, loading it once on a miss (None results are not cached).
+        
+        Loaders usually close over their caller's request session, so a
+        coalesced load is never handed to another caller's loader: if the
+        loading caller is cancelled, the callers waiting on it retry with
+        their own loaders instead of seeing its CancelledError. A load that
+        is invalidated while running still answers its callers but is not
+        cached, since it may have read the row before the change committed.
+        """
+        value = await self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        
+        pending = self._inflight.get(key)
+        if pending:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise  # This caller was cancelled, not the load
+                return await self.get_or_load(key, loader, ttl)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        generation = self._generations.get(key, 0)
+        try:
+            value = await loader()
+            self.loads += 1
+            if value is not None and self._generations.get(key, 0) == generation:
+                await self.set(key, value, ttl)
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else is waiting
+            raise
+        finally:
+            self._inflight.pop(key, None)
+            self._generations.pop(key, None)
+    
+    def drop_local(self, key: str) -> None:
+        """Delete value from L1 and keep a running load from caching it"""
+        self.local.delete(key)
+        if key in self._inflight:
+            self._generations[key] = self._generations.get(key, 0) + 1
+    
+    async def invalidate(self, key: str) -> None:
+        """Delete value from both tiers and from every worker's L1"""
+        self.drop_local(key)
+        
+        shared = self._shared()
+        if shared:
+            await shared.delete(self._key(key))
+            await RedisPubSub(shared.redis).publish(
+                self.invalidation_channel,
+                {"origin": _instance_id, "namespace": self.namespace, "key": key},
+            )
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get hit-ratio metrics for this namespace"""
+        lookups = self.l1_hits + self.l2_hits + self.misses
+        return {
+            "l1_size": len(self.local),
+            "l1_hits": self.l1_hits,
+            "l2_hits": self.l2_hits,
+            "misses": self.misses,
+            "loads": self.loads,
+            "coalesced": self.coalesced,
+            "hit_ratio": round((self.l1_hits + self.l2_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+_MISSING = object()
+
+# Identifies this worker in invalidation broadcasts
+_instance_id = uuid4().hex
+_invalidation_task: Optional[asyncio.Task] = None
+
+
+async def _listen_for_invalidations() -> None:
+    """Drop L1 entries invalidated by other workers"""
+    pubsub = RedisPubSub(get_redis_binary())
+    while True:
+        try:
+            async with pubsub.subscribe(TieredCache.invalidation_channel) as channel:
+                async for message in channel.listen():
+                    if message["type"] != "message":
+                        continue
+                    payload = pubsub.codec.decode(message["data"])
+                    if payload.get("origin") == _instance_id:
+                        continue
+                    cache = TieredCache.namespaces.get(payload.get("namespace"))
+                    if cache:
+                        cache.drop_local(payload.get("key"))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Cache invalidation listener error: {e}")
+            await asyncio.sleep(1)
+
+
+async def start_cache_invalidation_listener() -> None:
+    """Start listening for cross-worker cache invalidations"""
+    global _invalidation_task
+    
+    if _invalidation_task is None:
+        _invalidation_task = asyncio.create_task(_listen_for_invalidations())
+
+
+async def stop_cache_invalidation_listener() -> None:
+    """Stop invalidation listener"""
+    global _invalidation_task
+    
+    if _invalidation_task:
+        _invalidation_task.cancel()
+        try:
+            await _invalidation_task
+        except asyncio.CancelledError:
+            pass
+        _invalidation_task = None
+
+
+def get_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Get metrics for every tiered cache namespace"""
+    return {
+        namespace: cache.stats()
+        for namespace, cache in TieredCache.namespaces.items()
+    }
 
 
 # Pub/Sub utilities
 class RedisPubSub:
-    """Redis Pub/Sub utility for real-time messaging"""
+    """Redis Pub/Sub utility for real-time messaging
     
-    def __init__(self, redis_client: redis.Redis):
+    Subscribers should use get_redis_binary() and decode messages with `codec`.
+    """
+    
+    def __init__(self, redis_client: redis.Redis, codec: Optional[Codec] = None):
         self.redis = redis_client
+        self.codec = codec or get_codec()
     
     async def publish(self, channel: str, message: Dict[str, Any]) -> int:
         """Publish message to channel"""
         try:
-            serialized = json.dumps(message, default=str)
+            serialized = self.codec.encode(message)
             return await self.redis.publish(channel, serialized)
         except Exception as e:
             logger.error(f"Pub/Sub publish error for channel {channel}: {e}")
@@ -260,7 +677,8 @@ class WebSocketManager:
     
     async def broadcast_to_channel(self, channel: str, message: Dict[str, Any]) -> None:
         """Broadcast message via Redis Pub/Sub"""
-        pubsub = RedisPubSub(self.redis)
+        # Codec payloads are binary; self.redis decodes responses as text
+        pubsub = RedisPubSub(get_redis_binary())
         await pubsub.publish(f"ws:{channel}", message)
     
     async def get_active_users(self) -> List[str]:
@@ -279,12 +697,12 @@ async def get_rate_limiter() -> RateLimiter:
 
 async def get_cache() -> RedisCache:
     """Get cache instance"""
-    return RedisCache(get_redis())
+    return RedisCache(get_redis_binary())
 
 
 async def get_pubsub() -> RedisPubSub:
     """Get pub/sub instance"""
-    return RedisPubSub(get_redis())
+    return RedisPubSub(get_redis_binary())
 
 
 async def get_websocket_manager() -> WebSocketManager:
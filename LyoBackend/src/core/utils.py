@@ -123,6 +123,25 @@ def calculate_file_hash(content: bytes) -> str:
     return hashlib.sha256(content).hexdigest()
 
 
+def make_etag(content: bytes) -> str:
+    """Strong ETag for a response body"""
+    return f'"{hashlib.sha256(content).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
 def format_file_size(size_bytes: int) -> str:
     """Format file size in human readable format"""
     if size_bytes == 0:
@@ -206,13 +225,32 @@ def parse_cursor(cursor: str) -> tuple[datetime, str]:
     import base64
     try:
         cursor_data = base64.urlsafe_b64decode(cursor.encode()).decode()
-        timestamp_str, id_str = cursor_data.split(':', 1)
+        # ISO timestamps contain colons; ids do not
+        timestamp_str, id_str = cursor_data.rsplit(':', 1)
         timestamp = datetime.fromisoformat(timestamp_str)
         return timestamp, id_str
     except Exception:
         raise ValueError("Invalid cursor format")
 
 
+def create_rank_cursor(rank: float, id: str) -> str:
+    """Create pagination cursor for relevance-ordered results"""
+    import base64
+    cursor_data = f"{rank!r}:{id}"
+    return base64.urlsafe_b64encode(cursor_data.encode()).decode()
+
+
+def parse_rank_cursor(cursor: str) -> tuple[float, str]:
+    """Parse relevance pagination cursor"""
+    import base64
+    try:
+        cursor_data = base64.urlsafe_b64decode(cursor.encode()).decode()
+        rank_str, id_str = cursor_data.split(':', 1)
+        return float(rank_str), id_str
+    except Exception:
+        raise ValueError("Invalid cursor format")
+
+
 def mask_sensitive_data(data: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
     """Mask sensitive fields in data"""
     masked = data.copy()
@@ -0,0 +1,326 @@
+# Image Derivative Worker
+import asyncio
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from PIL import Image, ImageOps, features
+from sqlalchemy import and_, select, update
+
+from ..core.config import get_settings
+from ..core.database import get_db_session
+from ..core.logging import get_structured_logger
+from .models import MediaBlob, MediaType, MediaUpload
+from .storage import StorageBackend, storage_backend
+
+logger = get_structured_logger(__name__)
+
+# Refuse to decode anything larger; a small file can expand to gigabytes
+Image.MAX_IMAGE_PIXELS = 50_000_000
+
+# (width, height, format, encoded bytes)
+Rendered = Tuple[int, int, str, bytes]
+
+CONTENT_TYPES = {
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "webp": "image/webp",
+    "avif": "image/avif",
+}
+
+_SAVE_OPTIONS = {
+    "jpeg": {"quality": 82, "progressive": True},
+    "png": {"compress_level": 6},
+    "webp": {"quality": 80, "method": 4},
+    "avif": {"quality": 60, "speed": 8},
+}
+
+
+def _encodable(fmt: str) -> bool:
+    """WebP and AVIF support depend on how Pillow was built"""
+    if fmt in ("webp", "avif"):
+        return features.check(fmt)
+    return fmt in _SAVE_OPTIONS
+
+
+def render_derivatives(content: bytes, widths: Sequence[int], formats: Sequence[str]) -> List[Rendered]:
+    """
+    Resize an image to each width (never upscaling) and encode every size
+    as each format plus a universally decodable fallback: JPEG, or PNG when
+    the image has transparency. Runs in a worker process.
+    """
+    with Image.open(io.BytesIO(content)) as image:
+        # Let the JPEG decoder downscale by up to 8x while decoding
+        largest = max(widths)
+        image.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(image)
+
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        image = image.convert("RGBA" if has_alpha else "RGB")
+        fallback = "png" if has_alpha else "jpeg"
+        encodings = [fallback] + [fmt for fmt in formats if fmt != fallback and _encodable(fmt)]
+
+        targets = sorted({width for width in widths if width < image.width}, reverse=True)
+        if not targets:
+            targets = [image.width]
+
+        rendered = []
+        current = image
+        for width in targets:
+            height = max(1, round(image.height * width / image.width))
+            # Each size is resized from the previous, larger one
+            current = current.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+            for fmt in encodings:
+                buffer = io.BytesIO()
+                current.save(buffer, format=fmt.upper(), **_SAVE_OPTIONS[fmt])
+                rendered.append((width, height, fmt, buffer.getvalue()))
+
+        return rendered
+
+
+def derivative_path(storage_path: str, width: int, fmt: str) -> str:
+    """Storage path for one derivative, next to the original"""
+    stem = storage_path.rsplit(".", 1)[0] if "." in storage_path.rsplit("/", 1)[-1] else storage_path
+    return f"{stem}_{width}w.{'jpg' if fmt == 'jpeg' else fmt}"
+
+
+def pick_derivative(
+    derivatives: Optional[List[Dict[str, Any]]],
+    width: int,
+    accept: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Best derivative for a display `width`: the smallest one at least that
+    wide (else the largest), in the most compact format the client's
+    Accept header names explicitly, falling back to JPEG/PNG.
+    """
+    if not derivatives:
+        return None
+
+    accept = accept or ""
+    preferred = [fmt for fmt in ("avif", "webp") if CONTENT_TYPES[fmt] in accept] + ["jpeg", "png"]
+    available = {derivative["format"] for derivative in derivatives}
+    fmt = next((fmt for fmt in preferred if fmt in available), None)
+    if fmt is None:
+        return None
+
+    candidates = sorted(
+        (derivative for derivative in derivatives if derivative["format"] == fmt),
+        key=lambda derivative: derivative["width"],
+    )
+    return next((derivative for derivative in candidates if derivative["width"] >= width), candidates[-1])
+
+
+async def _single_chunk(content: bytes) -> AsyncIterator[bytes]:
+    yield content
+
+
+class DerivativeWorker:
+    """Generate image derivatives off the request path.
+
+    Image uploads are stored with is_processed=False and their id is
+    submitted here. Consumer tasks fetch the original from storage, render
+    every size and format in a process pool (resizing and AVIF encoding
+    are CPU-bound and would stall the event loop), upload the results and
+    mark the row processed. A periodic sweep resubmits images a restarted
+    or overloaded worker never got to. Uploads sharing a blob share its
+    derivatives, so one render covers them all.
+    """
+
+    def __init__(
+        self,
+        widths: Sequence[int] = (160, 320, 640, 1280),
+        formats: Sequence[str] = ("webp", "avif"),
+        workers: int = 0,
+        max_queue: int = 1000,
+        sweep_interval: int = 300,
+        storage: Optional[StorageBackend] = None
+    ):
+        self.widths = tuple(widths)
+        self.formats = tuple(formats)
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.sweep_interval = sweep_interval
+        self.storage = storage or storage_backend
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+        # Metrics
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.derivatives_written = 0
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    def submit(self, media_id: UUID) -> bool:
+        """Queue an image; returns False if it was left for the sweep"""
+        if not self.running:
+            return False
+
+        try:
+            self._queue.put_nowait(media_id)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+    async def start(self) -> None:
+        """Start worker processes, consumers and the sweep"""
+        if self.running:
+            return
+
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [asyncio.create_task(self._consume()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._sweep()))
+        logger.info(f"Image derivative worker started with {self.workers} processes")
+
+    async def stop(self) -> None:
+        """Stop consumers and worker processes; queued images wait for the sweep"""
+        if not self.running:
+            return
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._executor = None
+
+        logger.info("Image derivative worker stopped")
+
+    async def process(self, media_id: UUID) -> bool:
+        """Render, store and record derivatives for one image"""
+        async with get_db_session() as session:
+            media = await session.get(MediaUpload, media_id)
+            blob = await session.get(MediaBlob, media.content_hash) if media and media.content_hash else None
+        if media is None or media.is_processed:
+            return False
+        if blob is not None and blob.storage_path != media.storage_path:
+            # Stored before content addressing
+            blob = None
+        # A shared object is public while any of its uploads are
+        is_public = blob.public_ref_count > 0 if blob is not None else media.is_public
+
+        content = b"".join([chunk async for chunk in self.storage.read(media.storage_path)])
+        try:
+            loop = asyncio.get_running_loop()
+            rendered = await loop.run_in_executor(
+                self._executor, render_derivatives, content, self.widths, self.formats
+            )
+        except Exception as e:
+            # Undecodable or oversized; record it as processed without derivatives
+            logger.warning(f"Could not render derivatives for media {media_id}: {e}")
+            self.failed += 1
+            rendered = []
+
+        derivatives = []
+        for width, height, fmt, data in rendered:
+            path = derivative_path(media.storage_path, width, fmt)
+            await self.storage.save(path, _single_chunk(data), CONTENT_TYPES[fmt], is_public)
+            derivatives.append({
+                "width": width,
+                "height": height,
+                "format": fmt,
+                "content_type": CONTENT_TYPES[fmt],
+                "size": len(data),
+                "path": path,
+            })
+
+        # Every upload of the same blob shares the derivatives, with URLs
+        # matching its own visibility
+        if blob is not None:
+            shared = and_(
+                MediaUpload.content_hash == media.content_hash,
+                MediaUpload.storage_path == media.storage_path,
+            )
+        else:
+            shared = MediaUpload.id == media_id
+        updated = 0
+        async with get_db_session() as session:
+            for public in (True, False):
+                urls = [{**derivative, "url": self.storage.url(derivative["path"], public)} for derivative in derivatives]
+                thumbnail = pick_derivative(urls, 0)
+                result = await session.execute(
+                    update(MediaUpload)
+                    .where(and_(shared, MediaUpload.is_public == public))
+                    .values(
+                        derivatives=urls,
+                        thumbnail_url=thumbnail["url"] if thumbnail else None,
+                        is_processed=True,
+                    )
+                )
+                updated += result.rowcount
+
+        if not updated:
+            # Every upload was deleted while we rendered
+            for derivative in derivatives:
+                await self.storage.delete(derivative["path"])
+            return False
+
+        self.processed += 1
+        self.derivatives_written += len(derivatives)
+        return True
+
+    async def _consume(self) -> None:
+        while True:
+            media_id = await self._queue.get()
+            try:
+                await self.process(media_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Storage or database trouble; the sweep retries later
+                logger.error(f"Derivative generation failed for media {media_id}: {e}")
+
+    async def _sweep(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.sweep_interval)
+                async with get_db_session() as session:
+                    result = await session.execute(
+                        select(MediaUpload.id)
+                        .where(
+                            and_(
+                                MediaUpload.media_type == MediaType.IMAGE.value,
+                                MediaUpload.is_processed == False,
+                                MediaUpload.created_at < cutoff,
+                            )
+                        )
+                        .limit(self.max_queue - self._queue.qsize())
+                    )
+                    for media_id in result.scalars():
+                        self.submit(media_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Derivative sweep failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Get derivative worker metrics"""
+        return {
+            "running": self.running,
+            "workers": self.workers,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "processed": self.processed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "derivatives_written": self.derivatives_written,
+        }
+
+
+# Global derivative worker instance
+settings = get_settings()
+derivative_worker = DerivativeWorker(
+    widths=settings.media_derivative_widths,
+    formats=settings.media_derivative_formats,
+    workers=settings.media_derivative_workers,
+)
@@ -3,7 +3,7 @@ from datetime import datetime
 from enum import Enum
 from uuid import UUID, uuid4
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, String, Text, func
+from sqlalchemy import JSON, BigInteger, Boolean, Column, DateTime, ForeignKey, Index, Integer, String, Text, func
 from sqlalchemy.dialects.postgresql import UUID as PostgreSQLUUID
 from sqlalchemy.orm import relationship
 
@@ -39,6 +39,8 @@ class MediaUpload(Base):
     storage_path = Column(String(500), nullable=False)  # GCS path
     public_url = Column(String(500), nullable=True)     # Public access URL
     thumbnail_url = Column(String(500), nullable=True)  # Thumbnail for images/videos
+    content_hash = Column(String(64), nullable=True)    # SHA-256 hex of the stored bytes
+    derivatives = Column(JSON, nullable=True)           # Resized copies: width, height, format, url, ...
     
     # Metadata
     metadata = Column(Text, nullable=True)  # JSON string for additional metadata
@@ -56,5 +58,31 @@ class MediaUpload(Base):
     # Relationships
     user = relationship("User", back_populates="media_uploads")
     
+    __table_args__ = (
+        Index('ix_media_uploads_content_hash', 'content_hash'),
+        Index('ix_media_uploads_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+    )
+    
     def __repr__(self):
         return f"<MediaUpload(id={self.id}, filename={self.filename}, user_id={self.user_id})>"
+
+
+class MediaBlob(Base):
+    """Stored file content, shared by every upload of the same bytes"""
+    __tablename__ = "media_blobs"
+
+    content_hash = Column(String(64), primary_key=True)  # SHA-256 hex
+    storage_path = Column(String(500), nullable=False)
+    content_type = Column(String(100), nullable=False)
+    size = Column(BigInteger, nullable=False)
+    
+    # Uploads referencing this blob; the object is deleted with the last one
+    ref_count = Column(Integer, default=0, nullable=False)
+    # Public uploads among them; the object is public while any remain
+    public_ref_count = Column(Integer, default=0, nullable=False)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    def __repr__(self):
+        return f"<MediaBlob(content_hash={self.content_hash}, ref_count={self.ref_count})>"
+
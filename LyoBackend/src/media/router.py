@@ -1,27 +1,39 @@
 # Media Upload API Routes
-from typing import List
+from typing import Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
+from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, Query, Response, UploadFile, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..auth.dependencies import get_current_user
-from ..auth.models import User
+from ..auth.dependencies import get_current_principal
+from ..auth.principal import Principal
 from ..core.database import get_db
 from ..core.exceptions import BusinessLogicError, NotFoundError
-from .schemas import MediaUpdateRequest, MediaUploadResponse
+from ..core.utils import etag_matches, make_etag
+from .derivatives import pick_derivative
+from .models import MediaType, MediaUpload
+from .schemas import MediaDerivative, MediaPage, MediaUpdateRequest, MediaUploadResponse
 from .service import media_service
 
 router = APIRouter(prefix="/media", tags=["media"])
 
 
+def _media_response(media: MediaUpload, width: Optional[int], accept: Optional[str]) -> MediaUploadResponse:
+    """Response for one upload, with the derivative that best fits `width`"""
+    response = MediaUploadResponse.from_orm(media)
+    if width:
+        best_fit = pick_derivative(media.derivatives, width, accept)
+        response.best_fit = MediaDerivative(**best_fit) if best_fit else None
+    return response
+
+
 @router.post("/upload", response_model=MediaUploadResponse)
 async def upload_media(
     file: UploadFile = File(...),
     usage_type: str = Form(...),
     alt_text: str = Form(None),
     is_public: bool = Form(True),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Upload media file"""
@@ -47,7 +59,9 @@ async def upload_media(
 @router.get("/{media_id}", response_model=MediaUploadResponse)
 async def get_media(
     media_id: UUID,
-    current_user: User = Depends(get_current_user),
+    width: Optional[int] = Query(None, ge=1, le=4096, description="Display width in pixels; picks best_fit"),
+    accept: Optional[str] = Header(None),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Get media by ID"""
@@ -66,14 +80,14 @@ async def get_media(
             detail="Access denied"
         )
     
-    return MediaUploadResponse.from_orm(media)
+    return _media_response(media, width, accept)
 
 
 @router.put("/{media_id}", response_model=MediaUploadResponse)
 async def update_media(
     media_id: UUID,
     update_data: MediaUpdateRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Update media metadata"""
@@ -103,7 +117,7 @@ async def update_media(
 @router.delete("/{media_id}")
 async def delete_media(
     media_id: UUID,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Delete media file"""
@@ -123,14 +137,40 @@ async def delete_media(
         )
 
 
-@router.get("/user/{user_id}", response_model=List[MediaUploadResponse])
+@router.get("/user/{user_id}", response_model=MediaPage)
 async def get_user_media(
     user_id: UUID,
-    usage_type: str = None,
-    current_user: User = Depends(get_current_user),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page"),
+    limit: int = Query(20, ge=1, le=100),
+    usage_type: Optional[str] = Query(None),
+    media_type: Optional[MediaType] = Query(None),
+    width: Optional[int] = Query(None, ge=1, le=4096, description="Display width in pixels; picks best_fit"),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Get media uploads for a user"""
-    # This endpoint would need additional implementation in the service
-    # For now, return empty list
-    return []
+    try:
+        media, next_cursor = await media_service.get_user_media(
+            user_id, current_user.id, cursor, limit, usage_type, media_type, db
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    page = MediaPage(
+        items=[_media_response(item, width, accept) for item in media],
+        next_cursor=next_cursor,
+    )
+    body = page.model_dump_json().encode()
+    etag = make_etag(body)
+    # Depends on the viewer, so only the client may cache it
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
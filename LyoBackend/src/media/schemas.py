@@ -1,11 +1,21 @@
 # Media Upload Schemas
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from uuid import UUID
 
 from pydantic import BaseModel, Field
 
 
+class MediaDerivative(BaseModel):
+    """Resized copy of an image"""
+    width: int
+    height: int
+    format: str
+    content_type: str
+    size: int
+    url: str
+
+
 class MediaUploadResponse(BaseModel):
     """Media upload response schema"""
     id: UUID
@@ -17,6 +27,8 @@ class MediaUploadResponse(BaseModel):
     usage_type: str
     public_url: Optional[str] = None
     thumbnail_url: Optional[str] = None
+    derivatives: Optional[List[MediaDerivative]] = None
+    best_fit: Optional[MediaDerivative] = None
     alt_text: Optional[str] = None
     is_processed: bool
     is_public: bool
@@ -26,6 +38,12 @@ class MediaUploadResponse(BaseModel):
         from_attributes = True
 
 
+class MediaPage(BaseModel):
+    """Page of media uploads with opaque cursor for the next page"""
+    items: List[MediaUploadResponse]
+    next_cursor: Optional[str] = None
+
+
 class MediaUploadRequest(BaseModel):
     """Media upload metadata request"""
     usage_type: str = Field(..., description="Usage type (avatar, cover, post_image, etc.)")
@@ -1,36 +1,30 @@
 # Media Upload Service
 import json
-import os
-import uuid
-from typing import Optional
+from typing import List, Optional, Tuple
 from uuid import UUID
 
 from fastapi import UploadFile
-from google.cloud import storage
+from sqlalchemy import and_, delete, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from ..core.config import get_settings
+from ..core.database import dialect_insert
 from ..core.exceptions import BusinessLogicError, NotFoundError
-from .models import MediaType, MediaUpload
+from ..core.utils import create_cursor, parse_cursor
+from .derivatives import derivative_worker, pick_derivative
+from .models import MediaBlob, MediaType, MediaUpload
+from .storage import StorageBackend, storage_backend
+from .upload import SNIFF_BYTES, UploadStream, sniff_content_type
 
 settings = get_settings()
 
 
 class MediaService:
-    """Service for handling media uploads to Google Cloud Storage"""
+    """Service for handling media uploads to the configured storage backend"""
     
-    def __init__(self):
-        # Initialize GCS client if credentials are available
-        self.gcs_client = None
-        self.bucket_name = settings.GCS_BUCKET_NAME
-        
-        if settings.GOOGLE_APPLICATION_CREDENTIALS:
-            try:
-                self.gcs_client = storage.Client()
-                self.bucket = self.gcs_client.bucket(self.bucket_name)
-            except Exception as e:
-                print(f"Warning: Could not initialize GCS client: {e}")
+    def __init__(self, storage: Optional[StorageBackend] = None):
+        self.storage = storage or storage_backend
 
     async def upload_file(
         self,
@@ -41,81 +35,206 @@ class MediaService:
         is_public: bool = True,
         db: AsyncSession = None
     ) -> MediaUpload:
-        """Upload file to GCS and create database record"""
+        """Stream file to content-addressed storage and create database record"""
         
         # Validate file type
         media_type = self._get_media_type(file.content_type)
         if not media_type:
             raise BusinessLogicError("Unsupported file type")
         
-        # Validate file size (10MB limit by default)
-        max_size = self._get_max_file_size(media_type)
-        file_size = 0
-        content = await file.read()
-        file_size = len(content)
+        # Stream in fixed-size chunks; the size limit is enforced as we read
+        stream = UploadStream(file, self._get_max_file_size(media_type), settings.media_upload_chunk_size)
         
-        if file_size > max_size:
-            raise BusinessLogicError(f"File too large. Maximum size: {max_size / (1024*1024):.1f}MB")
+        # Trust the file's leading bytes over the client's declared type
+        content_type = file.content_type
+        sniffed = sniff_content_type((await stream.head())[:SNIFF_BYTES])
+        if sniffed:
+            if self._get_media_type(sniffed) != media_type:
+                raise BusinessLogicError("File content does not match its declared type")
+            content_type = sniffed
         
-        # Generate unique filename
+        # Read it through once for the hash; identical bytes share one stored blob
+        await stream.consume()
+        content_hash = stream.sha256
         file_extension = self._get_file_extension(file.filename or "file")
-        unique_filename = f"{uuid.uuid4()}{file_extension}"
+        storage_path = f"blobs/{content_hash[:2]}/{content_hash}{file_extension}"
         
-        # Create storage path
-        storage_path = f"uploads/{user_id}/{usage_type}/{unique_filename}"
+        media_upload = MediaUpload(
+            user_id=user_id,
+            original_filename=file.filename or "unknown",
+            content_type=content_type,
+            file_size=str(stream.size),
+            content_hash=content_hash,
+            media_type=media_type.value,
+            usage_type=usage_type,
+            alt_text=alt_text,
+            is_public=is_public,
+            # Images get resized derivatives in the background
+            is_processed=media_type != MediaType.IMAGE
+        )
         
+        saved = False
         try:
-            # Upload to GCS if available, otherwise save locally for development
-            public_url = None
-            if self.gcs_client:
-                public_url = await self._upload_to_gcs(
-                    content, storage_path, file.content_type, is_public
+            if db:
+                # Takes a reference; the blob row stays locked until commit, so
+                # a concurrent upload or delete of the same bytes waits for us
+                stmt = dialect_insert(db, MediaBlob).values(
+                    content_hash=content_hash,
+                    storage_path=storage_path,
+                    content_type=content_type,
+                    size=stream.size,
+                    ref_count=1,
+                    public_ref_count=int(is_public),
                 )
-            else:
-                # Local development storage
-                await self._save_locally(content, storage_path)
-                public_url = f"{settings.BASE_URL}/media/{storage_path}"
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[MediaBlob.content_hash],
+                    set_={
+                        "ref_count": MediaBlob.ref_count + 1,
+                        "public_ref_count": MediaBlob.public_ref_count + stmt.excluded.public_ref_count,
+                    },
+                ).returning(MediaBlob.storage_path, MediaBlob.ref_count, MediaBlob.public_ref_count)
+                blob = (await db.execute(stmt)).one()
+                storage_path = blob.storage_path
             
-            # Create thumbnail for images
-            thumbnail_url = None
-            if media_type == MediaType.IMAGE:
-                thumbnail_url = await self._create_thumbnail(
-                    content, storage_path, file.content_type
-                )
+            if not db or blob.ref_count == 1:
+                await self.storage.save(storage_path, stream, content_type, is_public)
+                saved = True
+            else:
+                # Known bytes: reuse the stored object and its derivatives
+                await self._copy_from_sibling(media_upload, storage_path, db)
+                if is_public and blob.public_ref_count == 1:
+                    # First public reference to a private object
+                    for path in self._object_paths(storage_path, media_upload.derivatives):
+                        await self.storage.set_public(path, True)
             
-            # Create database record
-            media_upload = MediaUpload(
-                user_id=user_id,
-                filename=unique_filename,
-                original_filename=file.filename or "unknown",
-                content_type=file.content_type,
-                file_size=str(file_size),
-                media_type=media_type.value,
-                usage_type=usage_type,
-                storage_path=storage_path,
-                public_url=public_url,
-                thumbnail_url=thumbnail_url,
-                alt_text=alt_text,
-                is_public=is_public,
-                is_processed=True  # Set to True for now, False if async processing needed
-            )
+            media_upload.filename = storage_path.rsplit("/", 1)[-1]
+            media_upload.storage_path = storage_path
+            media_upload.public_url = self.storage.url(storage_path, is_public)
             
             if db:
                 db.add(media_upload)
                 await db.commit()
                 await db.refresh(media_upload)
+                if not media_upload.is_processed:
+                    derivative_worker.submit(media_upload.id)
             
             return media_upload
             
         except Exception as e:
+            if db:
+                await db.rollback()
+            if saved:
+                # Don't orphan the stored object
+                await self.storage.delete(storage_path)
+            if isinstance(e, BusinessLogicError):
+                raise
             raise BusinessLogicError(f"Upload failed: {str(e)}")
 
+    async def _copy_from_sibling(self, media: MediaUpload, storage_path: str, db: AsyncSession) -> None:
+        """Take derivatives from another upload of the same blob"""
+        result = await db.execute(
+            select(MediaUpload.derivatives, MediaUpload.is_processed)
+            .where(
+                and_(
+                    MediaUpload.content_hash == media.content_hash,
+                    MediaUpload.storage_path == storage_path,
+                )
+            )
+            .order_by(MediaUpload.is_processed.desc())
+            .limit(1)
+        )
+        sibling = result.first()
+        if sibling is None or not sibling.is_processed:
+            # Still queued; the worker fills in every upload of the blob
+            return
+        
+        media.is_processed = True
+        self._set_derivative_urls(media, sibling.derivatives)
+
+    async def _update_blob(self, media: MediaUpload, db: AsyncSession, refs: int, public_refs: int):
+        """Adjust the reference counts of a media row's blob; None for uploads stored before dedup"""
+        if not media.content_hash:
+            return None
+        result = await db.execute(
+            update(MediaBlob)
+            .where(
+                and_(
+                    MediaBlob.content_hash == media.content_hash,
+                    MediaBlob.storage_path == media.storage_path,
+                )
+            )
+            .values(
+                ref_count=MediaBlob.ref_count + refs,
+                public_ref_count=MediaBlob.public_ref_count + public_refs,
+            )
+            .returning(MediaBlob.ref_count, MediaBlob.public_ref_count)
+        )
+        return result.first()
+
+    def _object_paths(self, storage_path: str, derivatives) -> List[str]:
+        """Storage paths of an original and its derivatives"""
+        return [storage_path] + [derivative["path"] for derivative in derivatives or []]
+
+    def _set_derivative_urls(self, media: MediaUpload, derivatives) -> None:
+        """Set derivatives and thumbnail with URLs for the row's visibility"""
+        if derivatives is None:
+            media.derivatives = None
+            media.thumbnail_url = None
+            return
+        derivatives = [
+            {**derivative, "url": self.storage.url(derivative["path"], media.is_public)}
+            for derivative in derivatives
+        ]
+        thumbnail = pick_derivative(derivatives, 0)
+        media.derivatives = derivatives
+        media.thumbnail_url = thumbnail["url"] if thumbnail else None
+
     async def get_media(self, media_id: UUID, db: AsyncSession) -> Optional[MediaUpload]:
         """Get media by ID"""
         stmt = select(MediaUpload).where(MediaUpload.id == media_id)
         result = await db.execute(stmt)
         return result.scalar_one_or_none()
 
+    async def get_user_media(
+        self,
+        user_id: UUID,
+        viewer_id: Optional[UUID],
+        cursor: Optional[str] = None,
+        limit: int = 20,
+        usage_type: Optional[str] = None,
+        media_type: Optional[MediaType] = None,
+        db: AsyncSession = None
+    ) -> Tuple[List[MediaUpload], Optional[str]]:
+        """Get a user's media, newest first, with the cursor for the next page
+        
+        Other viewers only see public uploads. Seeks on (user_id, created_at, id)
+        and fetches one extra row to tell whether another page exists.
+        """
+        conditions = [MediaUpload.user_id == user_id, MediaUpload.is_active == True]
+        if viewer_id != user_id:
+            conditions.append(MediaUpload.is_public == True)
+        if usage_type:
+            conditions.append(MediaUpload.usage_type == usage_type)
+        if media_type:
+            conditions.append(MediaUpload.media_type == media_type.value)
+        if cursor:
+            timestamp, cursor_id = parse_cursor(cursor)
+            conditions.append(tuple_(MediaUpload.created_at, MediaUpload.id) < (timestamp, UUID(cursor_id)))
+        
+        stmt = (
+            select(MediaUpload)
+            .where(and_(*conditions))
+            .order_by(MediaUpload.created_at.desc(), MediaUpload.id.desc())
+            .limit(limit + 1)
+        )
+        result = await db.execute(stmt)
+        media = result.scalars().all()
+        if len(media) <= limit:
+            return media, None
+        
+        last = media[limit - 1]
+        return media[:limit], create_cursor(last.created_at, str(last.id))
+
     async def delete_media(
         self, media_id: UUID, user_id: UUID, db: AsyncSession
     ) -> bool:
@@ -128,14 +247,19 @@ class MediaService:
         if media.user_id != user_id:
             raise BusinessLogicError("Not authorized to delete this media")
         
-        # Delete from storage
-        if self.gcs_client:
-            await self._delete_from_gcs(media.storage_path)
-            if media.thumbnail_url:
-                thumbnail_path = media.storage_path.replace(media.filename, f"thumb_{media.filename}")
-                await self._delete_from_gcs(thumbnail_path)
-        else:
-            await self._delete_locally(media.storage_path)
+        paths = self._object_paths(media.storage_path, media.derivatives)
+        blob = await self._update_blob(media, db, -1, -int(bool(media.is_public)))
+        
+        if blob is None or blob.ref_count == 0:
+            # Last reference; the blob row stays locked until commit
+            for path in paths:
+                await self.storage.delete(path)
+            if blob is not None:
+                await db.execute(delete(MediaBlob).where(MediaBlob.content_hash == media.content_hash))
+        elif media.is_public and blob.public_ref_count == 0:
+            # Remaining references are all private
+            for path in paths:
+                await self.storage.set_public(path, False)
         
         # Delete from database
         await db.delete(media)
@@ -162,11 +286,15 @@ class MediaService:
         # Update fields
         if alt_text is not None:
             media.alt_text = alt_text
-        if is_public is not None:
+        if is_public is not None and is_public != media.is_public:
+            blob = await self._update_blob(media, db, 0, 1 if is_public else -1)
+            # A shared object is public while any of its uploads are
+            if blob is None or blob.public_ref_count == int(is_public):
+                for path in self._object_paths(media.storage_path, media.derivatives):
+                    await self.storage.set_public(path, is_public)
             media.is_public = is_public
-            # Update GCS permissions if needed
-            if self.gcs_client:
-                await self._update_gcs_permissions(media.storage_path, is_public)
+            media.public_url = self.storage.url(media.storage_path, is_public)
+            self._set_derivative_urls(media, media.derivatives)
         
         await db.commit()
         await db.refresh(media)
@@ -200,53 +328,6 @@ class MediaService:
             return '.' + filename.rsplit('.', 1)[1].lower()
         return ''
 
-    async def _upload_to_gcs(
-        self, content: bytes, storage_path: str, content_type: str, is_public: bool
-    ) -> str:
-        """Upload file to Google Cloud Storage"""
-        blob = self.bucket.blob(storage_path)
-        blob.upload_from_string(content, content_type=content_type)
-        
-        if is_public:
-            blob.make_public()
-        
-        return blob.public_url if is_public else f"gs://{self.bucket_name}/{storage_path}"
-
-    async def _save_locally(self, content: bytes, storage_path: str):
-        """Save file locally for development"""
-        local_path = f"uploads/{storage_path}"
-        os.makedirs(os.path.dirname(local_path), exist_ok=True)
-        
-        with open(local_path, 'wb') as f:
-            f.write(content)
-
-    async def _create_thumbnail(
-        self, content: bytes, storage_path: str, content_type: str
-    ) -> Optional[str]:
-        """Create thumbnail for images (placeholder implementation)"""
-        # In production, you would use PIL or similar to create actual thumbnails
-        # For now, return the original image URL
-        return None
-
-    async def _delete_from_gcs(self, storage_path: str):
-        """Delete file from GCS"""
-        blob = self.bucket.blob(storage_path)
-        blob.delete()
-
-    async def _delete_locally(self, storage_path: str):
-        """Delete local file"""
-        local_path = f"uploads/{storage_path}"
-        if os.path.exists(local_path):
-            os.remove(local_path)
-
-    async def _update_gcs_permissions(self, storage_path: str, is_public: bool):
-        """Update GCS file permissions"""
-        blob = self.bucket.blob(storage_path)
-        if is_public:
-            blob.make_public()
-        else:
-            blob.make_private()
-
 
 # Global service instance
 media_service = MediaService()
@@ -0,0 +1,272 @@
+# Media Storage Backends
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, Optional, Tuple
+from urllib.parse import quote
+
+import aiofiles
+import aiofiles.os
+from google.api_core.exceptions import NotFound
+from google.cloud import storage
+
+from ..core.config import Settings, get_settings
+
+
+class StorageBackend(ABC):
+    """Where media bytes live.
+
+    Uploads are written from an async stream of chunks and reads come back
+    the same way, so no backend needs a whole file in memory. None of the
+    methods block the event loop.
+    """
+
+    name = "abstract"
+
+    def __init__(self):
+        # Metrics
+        self.bytes_written = 0
+        self.bytes_read = 0
+        self.objects_written = 0
+        self.objects_deleted = 0
+
+    @abstractmethod
+    async def save(
+        self, path: str, chunks: AsyncIterable[bytes], content_type: str, is_public: bool
+    ) -> str:
+        """Write an object from a chunk stream; returns its URL"""
+
+    @abstractmethod
+    def read(self, path: str, chunk_size: int = 1024 * 1024) -> AsyncIterator[bytes]:
+        """Stream an object's bytes"""
+
+    @abstractmethod
+    async def delete(self, path: str) -> None:
+        """Delete an object; deleting a missing object is not an error"""
+
+    @abstractmethod
+    async def set_public(self, path: str, is_public: bool) -> str:
+        """Change an object's visibility; returns its URL"""
+
+    @abstractmethod
+    def url(self, path: str, is_public: bool) -> str:
+        """URL for an object"""
+
+    async def close(self) -> None:
+        """Release clients and workers"""
+
+    def stats(self) -> Dict[str, Any]:
+        """Get storage metrics"""
+        return {
+            "backend": self.name,
+            "bytes_written": self.bytes_written,
+            "bytes_read": self.bytes_read,
+            "objects_written": self.objects_written,
+            "objects_deleted": self.objects_deleted,
+        }
+
+
+class GCSStorage(StorageBackend):
+    """Google Cloud Storage through the official client.
+
+    The client is synchronous, so every call runs on a dedicated thread
+    pool rather than the event loop (or the loop's default executor, which
+    other code shares). Uploads are resumable sessions sent `chunk_size`
+    bytes at a time, so a transient failure retries one chunk within the
+    session instead of restarting the file.
+    """
+
+    name = "gcs"
+
+    def __init__(self, bucket_name: str, chunk_size: int = 1024 * 1024, workers: int = 8):
+        super().__init__()
+        self.bucket_name = bucket_name
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._bucket = None
+
+    async def _run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="media-storage",
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: func(*args, **kwargs))
+
+    async def _blob(self, path: str):
+        if self._bucket is None:
+            # Credential discovery may hit the metadata server
+            client = await self._run(storage.Client)
+            self._bucket = client.bucket(self.bucket_name)
+        return self._bucket.blob(path)
+
+    async def save(
+        self, path: str, chunks: AsyncIterable[bytes], content_type: str, is_public: bool
+    ) -> str:
+        blob = await self._blob(path)
+        writer = blob.open("wb", content_type=content_type, chunk_size=self.chunk_size)
+        size = 0
+        async for chunk in chunks:
+            await self._run(writer.write, chunk)
+            size += len(chunk)
+        # The object only exists once the session is finalized; an abandoned
+        # session expires on its own
+        await self._run(writer.close)
+
+        if is_public:
+            await self._run(blob.make_public)
+
+        self.bytes_written += size
+        self.objects_written += 1
+        return self.url(path, is_public)
+
+    async def read(self, path: str, chunk_size: int = 1024 * 1024) -> AsyncIterator[bytes]:
+        blob = await self._blob(path)
+        reader = await self._run(blob.open, "rb", chunk_size=chunk_size)
+        try:
+            while chunk := await self._run(reader.read, chunk_size):
+                self.bytes_read += len(chunk)
+                yield chunk
+        finally:
+            await self._run(reader.close)
+
+    async def delete(self, path: str) -> None:
+        blob = await self._blob(path)
+        try:
+            await self._run(blob.delete)
+            self.objects_deleted += 1
+        except NotFound:
+            pass
+
+    async def set_public(self, path: str, is_public: bool) -> str:
+        blob = await self._blob(path)
+        await self._run(blob.make_public if is_public else blob.make_private)
+        return self.url(path, is_public)
+
+    def url(self, path: str, is_public: bool) -> str:
+        if is_public:
+            return f"https://storage.googleapis.com/{self.bucket_name}/{quote(path)}"
+        return f"gs://{self.bucket_name}/{path}"
+
+    async def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+class LocalStorage(StorageBackend):
+    """Local filesystem storage for development"""
+
+    name = "local"
+
+    def __init__(self, root: str = "uploads", base_url: str = "http://localhost:8000"):
+        super().__init__()
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+
+    def _local_path(self, path: str) -> str:
+        return os.path.join(self.root, path)
+
+    async def save(
+        self, path: str, chunks: AsyncIterable[bytes], content_type: str, is_public: bool
+    ) -> str:
+        local_path = self._local_path(path)
+        await aiofiles.os.makedirs(os.path.dirname(local_path), exist_ok=True)
+
+        size = 0
+        try:
+            async with aiofiles.open(local_path, "wb") as f:
+                async for chunk in chunks:
+                    await f.write(chunk)
+                    size += len(chunk)
+        except BaseException:
+            # Don't leave a partial file behind
+            await aiofiles.os.remove(local_path)
+            raise
+
+        self.bytes_written += size
+        self.objects_written += 1
+        return self.url(path, is_public)
+
+    async def read(self, path: str, chunk_size: int = 1024 * 1024) -> AsyncIterator[bytes]:
+        async with aiofiles.open(self._local_path(path), "rb") as f:
+            while chunk := await f.read(chunk_size):
+                self.bytes_read += len(chunk)
+                yield chunk
+
+    async def delete(self, path: str) -> None:
+        try:
+            await aiofiles.os.remove(self._local_path(path))
+            self.objects_deleted += 1
+        except FileNotFoundError:
+            pass
+
+    async def set_public(self, path: str, is_public: bool) -> str:
+        return self.url(path, is_public)
+
+    def url(self, path: str, is_public: bool) -> str:
+        return f"{self.base_url}/media/{path}"
+
+
+class MemoryStorage(StorageBackend):
+    """In-memory storage for tests and offline development"""
+
+    name = "memory"
+
+    def __init__(self):
+        super().__init__()
+        # path -> (content, content_type, is_public)
+        self.objects: Dict[str, Tuple[bytes, str, bool]] = {}
+
+    async def save(
+        self, path: str, chunks: AsyncIterable[bytes], content_type: str, is_public: bool
+    ) -> str:
+        content = b"".join([chunk async for chunk in chunks])
+        self.objects[path] = (content, content_type, is_public)
+        self.bytes_written += len(content)
+        self.objects_written += 1
+        return self.url(path, is_public)
+
+    async def read(self, path: str, chunk_size: int = 1024 * 1024) -> AsyncIterator[bytes]:
+        if path not in self.objects:
+            raise FileNotFoundError(path)
+        content = self.objects[path][0]
+        for start in range(0, len(content), chunk_size):
+            self.bytes_read += len(content[start:start + chunk_size])
+            yield content[start:start + chunk_size]
+
+    async def delete(self, path: str) -> None:
+        if self.objects.pop(path, None) is not None:
+            self.objects_deleted += 1
+
+    async def set_public(self, path: str, is_public: bool) -> str:
+        content, content_type, _ = self.objects[path]
+        self.objects[path] = (content, content_type, is_public)
+        return self.url(path, is_public)
+
+    def url(self, path: str, is_public: bool) -> str:
+        return f"memory://{path}"
+
+
+def create_storage_backend(settings: Settings) -> StorageBackend:
+    """Storage backend selected by MEDIA_STORAGE_BACKEND"""
+    backend = settings.media_storage_backend
+    if backend == "auto":
+        backend = "gcs" if settings.GOOGLE_APPLICATION_CREDENTIALS else "local"
+
+    if backend == "gcs":
+        return GCSStorage(
+            settings.GCS_BUCKET_NAME,
+            chunk_size=settings.media_upload_chunk_size,
+            workers=settings.media_storage_workers,
+        )
+    if backend == "memory":
+        return MemoryStorage()
+    return LocalStorage(settings.media_local_root, settings.media_base_url)
+
+
+# Global storage backend instance
+storage_backend = create_storage_backend(get_settings())
@@ -0,0 +1,118 @@
+# Streaming Upload Reader
+import hashlib
+from typing import AsyncIterator, Optional
+
+from fastapi import UploadFile
+
+from ..core.exceptions import BusinessLogicError
+
+# (offset, signature, content type) for formats identified by leading bytes
+_SIGNATURES = [
+    (0, b"\xff\xd8\xff", "image/jpeg"),
+    (0, b"\x89PNG\r\n\x1a\n", "image/png"),
+    (0, b"GIF87a", "image/gif"),
+    (0, b"GIF89a", "image/gif"),
+    (0, b"\x1aE\xdf\xa3", "video/webm"),
+    (0, b"ID3", "audio/mpeg"),
+    (0, b"OggS", "audio/ogg"),
+    (0, b"fLaC", "audio/flac"),
+    (0, b"%PDF-", "application/pdf"),
+    (0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "application/msword"),
+]
+
+# RIFF container form types
+_RIFF_TYPES = {b"WEBP": "image/webp", b"WAVE": "audio/wav", b"AVI ": "video/x-msvideo"}
+
+# ISO base media (ftyp) major brands that are not plain MP4 video
+_FTYP_BRANDS = {
+    b"qt  ": "video/quicktime",
+    b"M4A ": "audio/mp4",
+    b"heic": "image/heic",
+    b"heix": "image/heic",
+    b"mif1": "image/heif",
+    b"avif": "image/avif",
+}
+
+# Enough of the file to identify every format above
+SNIFF_BYTES = 16
+
+
+def sniff_content_type(head: bytes) -> Optional[str]:
+    """Content type identified from a file's first bytes, or None if unknown"""
+    for offset, signature, content_type in _SIGNATURES:
+        if head.startswith(signature, offset):
+            return content_type
+    if head.startswith(b"RIFF") and len(head) >= 12:
+        return _RIFF_TYPES.get(head[8:12])
+    if head[4:8] == b"ftyp":
+        return _FTYP_BRANDS.get(head[8:12], "video/mp4")
+    # MPEG audio frame sync without an ID3 tag
+    if len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0:
+        return "audio/mpeg"
+    return None
+
+
+class UploadStream:
+    """Read an UploadFile in fixed-size chunks.
+
+    The size limit is enforced as chunks arrive, so an oversized upload is
+    rejected after reading at most one chunk past the limit, and the
+    SHA-256 of the content is computed on the way through. Only one chunk
+    is held in memory at a time. After consume() the file has been measured
+    and hashed, and iterating replays it from the start.
+    """
+
+    def __init__(self, file: UploadFile, max_size: int, chunk_size: int = 1024 * 1024):
+        self.file = file
+        self.max_size = max_size
+        self.chunk_size = chunk_size
+        self.size = 0
+        self._digest = hashlib.sha256()
+        self._head: Optional[bytes] = None
+        self._consumed = False
+
+    @property
+    def sha256(self) -> str:
+        """Hex digest of everything read so far"""
+        return self._digest.hexdigest()
+
+    async def head(self) -> bytes:
+        """First chunk of the file, read once and replayed by iteration"""
+        if self._head is None:
+            if self.file.size is not None:
+                # Multipart parsing already measured it; reject before reading
+                self._check_size(self.file.size)
+            self._head = await self._read()
+        return self._head
+
+    async def consume(self) -> None:
+        """Read to the end, so size and sha256 are known before storing"""
+        await self.head()
+        while not self._consumed:
+            if not await self._read():
+                self._consumed = True
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        if self._consumed:
+            # Starlette spools uploads to disk, so a second pass is cheap
+            await self.file.seek(0)
+            while chunk := await self.file.read(self.chunk_size):
+                yield chunk
+            return
+
+        chunk = await self.head()
+        while chunk:
+            yield chunk
+            chunk = await self._read()
+        self._consumed = True
+
+    async def _read(self) -> bytes:
+        chunk = await self.file.read(self.chunk_size)
+        self._check_size(self.size + len(chunk))
+        self.size += len(chunk)
+        self._digest.update(chunk)
+        return chunk
+
+    def _check_size(self, size: int) -> None:
+        if size > self.max_size:
+            raise BusinessLogicError(f"File too large. Maximum size: {self.max_size / (1024*1024):.1f}MB")
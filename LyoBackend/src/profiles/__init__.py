@@ -1,5 +1,5 @@
 # Profile Module Init
-from .models import Follow, Interest, UserInterest, UserProfile
+from .models import Follow, Interest, UserInterest, UserProfile, XPEvent
 from .router import router
 from .schemas import (
     FollowResponse,
@@ -17,6 +17,7 @@ __all__ = [
     "Follow", 
     "Interest",
     "UserInterest",
+    "XPEvent",
     
     # Service
     "ProfileService",
@@ -0,0 +1,382 @@
+# Profile Autocomplete - In-Process Prefix Index
+import asyncio
+import time
+from array import array
+from bisect import bisect_left, insort
+from heapq import merge
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..auth.models import User
+from ..core.config import get_settings
+from ..core.database import get_db_session
+from ..core.logging import get_structured_logger
+from ..core.redis import RedisPubSub, get_redis_binary
+from .models import UserProfile
+
+logger = get_structured_logger(__name__)
+
+
+class Suggestion(NamedTuple):
+    """Typeahead match"""
+    user_id: UUID
+    username: Optional[str]
+    display_name: Optional[str]
+
+
+def _index_keys(username: Optional[str], display_name: Optional[str]) -> Set[bytes]:
+    """Lowercased UTF-8 keys a profile is found under"""
+    return {name.lower().encode() for name in (username, display_name) if name}
+
+
+class _PackedKeys:
+    """Sorted keys packed into one bytes blob; a sequence view for bisect"""
+
+    __slots__ = ("blob", "offsets")
+
+    def __init__(self, blob: bytes = b"", offsets: Optional[array] = None):
+        self.blob = blob
+        self.offsets = offsets if offsets is not None else array("I", [0])
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> bytes:
+        return self.blob[self.offsets[i]:self.offsets[i + 1]]
+
+
+class PrefixIndex:
+    """Sorted-array prefix index over usernames and display names.
+
+    Lowercased keys are packed into one bytes blob with an offset array, so
+    a lookup is a binary search plus a forward scan over matching keys.
+    Updates land in a small sorted overlay and a tombstone set; once they
+    outgrow `compact_ratio` of the index `needs_compaction` is set and the
+    owner should compact() or rebuild.
+    """
+
+    def __init__(self, compact_ratio: float = 0.05, min_compact: int = 4096):
+        self.compact_ratio = compact_ratio
+        self.min_compact = min_compact
+        self.compactions = 0
+
+        # Per-profile records, addressed by slot
+        self._user_ids = bytearray()
+        self._usernames: List[Optional[str]] = []
+        self._display_names: List[Optional[str]] = []
+        self._slots: Dict[bytes, int] = {}
+        self._free: List[int] = []
+
+        # Packed sorted (key, slot) entries, plus overlay and tombstones
+        self._keys = _PackedKeys()
+        self._key_slots = array("I")
+        self._added: List[Tuple[bytes, int]] = []
+        self._stale: Set[int] = set()
+
+        # (key, slot) pairs collected by load() until seal()
+        self._pending: List[Tuple[bytes, int]] = []
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    @property
+    def overlay_size(self) -> int:
+        return len(self._added) + len(self._stale)
+
+    @property
+    def needs_compaction(self) -> bool:
+        return self.overlay_size > max(self.min_compact, len(self._keys) * self.compact_ratio)
+
+    def load(self, rows: Iterable[Tuple[UUID, Optional[str], Optional[str]]]) -> None:
+        """Add (user_id, username, display_name) rows; call seal() when done"""
+        for user_id, username, display_name in rows:
+            slot = self._allocate(user_id, username, display_name)
+            for key in _index_keys(username, display_name):
+                self._pending.append((key, slot))
+
+    def seal(self) -> None:
+        """Sort and pack everything passed to load()"""
+        pending, self._pending = self._pending, []
+        pending.sort()
+        self._pack(list(merge(self._live_entries(), pending)))
+
+    def search(self, prefix: str, limit: int = 10) -> List[Suggestion]:
+        """Profiles whose username or display name starts with `prefix`"""
+        key = prefix.lower().encode()
+        results: List[Suggestion] = []
+        seen: Set[int] = set()
+
+        added = list(self._scan_added(key))
+        entries = merge(self._scan_packed(key), added) if added else self._scan_packed(key)
+        for _, slot in entries:
+            if slot in seen:
+                continue
+            seen.add(slot)
+            results.append(Suggestion(
+                UUID(bytes=bytes(self._user_ids[slot * 16:slot * 16 + 16])),
+                self._usernames[slot],
+                self._display_names[slot],
+            ))
+            if len(results) >= limit:
+                break
+
+        return results
+
+    def upsert(self, user_id: UUID, username: Optional[str], display_name: Optional[str]) -> None:
+        """Insert a profile or replace its names"""
+        slot = self._slots.get(user_id.bytes)
+        if slot is None:
+            old_keys: Set[bytes] = set()
+            slot = self._allocate(user_id, username, display_name)
+        else:
+            old_keys = _index_keys(self._usernames[slot], self._display_names[slot])
+            self._usernames[slot] = username
+            self._display_names[slot] = display_name
+
+        new_keys = _index_keys(username, display_name)
+        for key in old_keys - new_keys:
+            self._drop(key, slot)
+        for key in new_keys - old_keys:
+            insort(self._added, (key, slot))
+
+    def remove(self, user_id: UUID) -> None:
+        """Drop a profile"""
+        slot = self._slots.pop(user_id.bytes, None)
+        if slot is None:
+            return
+
+        for key in _index_keys(self._usernames[slot], self._display_names[slot]):
+            self._drop(key, slot)
+        self._usernames[slot] = None
+        self._display_names[slot] = None
+        self._free.append(slot)
+
+    def compact(self) -> None:
+        """Merge overlay and tombstones back into the packed array"""
+        self._pack(list(self._live_entries()))
+        self.compactions += 1
+
+    def _allocate(self, user_id: UUID, username: Optional[str], display_name: Optional[str]) -> int:
+        user_id_bytes = user_id.bytes
+        if self._free:
+            slot = self._free.pop()
+            self._user_ids[slot * 16:slot * 16 + 16] = user_id_bytes
+            self._usernames[slot] = username
+            self._display_names[slot] = display_name
+        else:
+            slot = len(self._usernames)
+            self._user_ids += user_id_bytes
+            self._usernames.append(username)
+            self._display_names.append(display_name)
+
+        self._slots[user_id_bytes] = slot
+        return slot
+
+    def _live_entries(self) -> Iterator[Tuple[bytes, int]]:
+        """Every current (key, slot) entry in sorted order"""
+        packed = (
+            (self._keys[i], self._key_slots[i])
+            for i in range(len(self._keys))
+            if i not in self._stale
+        )
+        return merge(packed, self._added)
+
+    def _pack(self, entries: List[Tuple[bytes, int]]) -> None:
+        offsets = array("I", [0])
+        slots = array("I")
+        position = 0
+        for key, slot in entries:
+            position += len(key)
+            offsets.append(position)
+            slots.append(slot)
+
+        self._keys = _PackedKeys(b"".join(key for key, _ in entries), offsets)
+        self._key_slots = slots
+        self._added = []
+        self._stale = set()
+
+    def _drop(self, key: bytes, slot: int) -> None:
+        i = bisect_left(self._added, (key, slot))
+        if i < len(self._added) and self._added[i] == (key, slot):
+            del self._added[i]
+            return
+
+        i = bisect_left(self._keys, key)
+        while i < len(self._keys) and self._keys[i] == key:
+            if self._key_slots[i] == slot and i not in self._stale:
+                self._stale.add(i)
+                return
+            i += 1
+
+    def _scan_packed(self, key: bytes) -> Iterator[Tuple[bytes, int]]:
+        i = bisect_left(self._keys, key)
+        while i < len(self._keys):
+            entry = self._keys[i]
+            if not entry.startswith(key):
+                return
+            if i not in self._stale:
+                yield entry, self._key_slots[i]
+            i += 1
+
+    def _scan_added(self, key: bytes) -> Iterator[Tuple[bytes, int]]:
+        i = bisect_left(self._added, (key,))
+        while i < len(self._added) and self._added[i][0].startswith(key):
+            yield self._added[i]
+            i += 1
+
+
+class ProfileAutocomplete:
+    """Keep a PrefixIndex of every profile in this process.
+
+    The index is loaded with one streaming query on start, then follows the
+    profile updates every worker broadcasts on `channel`, so typeahead never
+    touches Postgres. Until the first load completes `ready` is False and
+    callers fall back to SQL search. Once updates outgrow the index overlay
+    a fresh index is loaded and swapped in rather than compacting in place.
+    """
+
+    channel = "profiles:updates"
+
+    def __init__(self, enabled: bool = True, batch_size: int = 10000):
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.index = PrefixIndex()
+        self.ready = False
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.builds = 0
+        self.build_seconds = 0.0
+        self.lookups = 0
+        self.updates = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def search(self, prefix: str, limit: int = 10) -> List[Suggestion]:
+        """Typeahead lookup; only meaningful once `ready`"""
+        self.lookups += 1
+        return self.index.search(prefix, limit)
+
+    async def publish(self, user_id: UUID, db: AsyncSession) -> None:
+        """Broadcast a profile's committed names to every worker's index"""
+        if not self.enabled:
+            return
+
+        result = await db.execute(
+            select(UserProfile.username, User.display_name)
+            .join(User, User.id == UserProfile.user_id)
+            .where(UserProfile.user_id == user_id)
+        )
+        row = result.one_or_none()
+        if row is None:
+            payload = {"user_id": str(user_id), "deleted": True}
+        else:
+            payload = {"user_id": str(user_id), "username": row.username, "display_name": row.display_name}
+
+        # Apply locally too so this worker reads its own writes
+        self._apply(payload)
+        try:
+            await RedisPubSub(get_redis_binary()).publish(self.channel, payload)
+        except RuntimeError:
+            # Redis not initialized; other workers catch up on their next load
+            pass
+
+    def _apply(self, payload: Dict[str, Any]) -> None:
+        user_id = UUID(payload["user_id"])
+        if payload.get("deleted"):
+            self.index.remove(user_id)
+        else:
+            self.index.upsert(user_id, payload.get("username"), payload.get("display_name"))
+        self.updates += 1
+
+    async def rebuild(self) -> None:
+        """Load a fresh index with one streaming query and swap it in"""
+        started = time.perf_counter()
+        index = PrefixIndex()
+
+        async with get_db_session() as session:
+            result = await session.stream(
+                select(UserProfile.user_id, UserProfile.username, User.display_name)
+                .join(User, User.id == UserProfile.user_id)
+                .execution_options(yield_per=self.batch_size)
+            )
+            async for rows in result.partitions():
+                index.load(rows)
+
+        # Sorting millions of keys takes seconds; keep the event loop serving
+        await asyncio.to_thread(index.seal)
+        self.index = index
+        self.ready = True
+        self.builds += 1
+        self.build_seconds = time.perf_counter() - started
+        logger.info(f"Profile autocomplete index loaded {len(index)} profiles in {self.build_seconds:.2f}s")
+
+    async def start(self) -> None:
+        """Start loading the index and following updates"""
+        if not self.enabled or self.running:
+            return
+
+        self._task = asyncio.create_task(self._run())
+        logger.info("Profile autocomplete started")
+
+    async def stop(self) -> None:
+        """Stop following updates"""
+        if not self.running:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        logger.info("Profile autocomplete stopped")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                pubsub = RedisPubSub(get_redis_binary())
+                async with pubsub.subscribe(self.channel) as channel:
+                    # Subscribed before loading, so updates committed during
+                    # the load queue up and are replayed on top of it
+                    await self.rebuild()
+                    async for message in channel.listen():
+                        if message["type"] != "message":
+                            continue
+                        self._apply(pubsub.codec.decode(message["data"]))
+                        if self.index.needs_compaction:
+                            await self.rebuild()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Profile autocomplete error: {e}")
+                await asyncio.sleep(1)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get autocomplete metrics"""
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "running": self.running,
+            "profiles": len(self.index),
+            "overlay": self.index.overlay_size,
+            "compactions": self.index.compactions,
+            "builds": self.builds,
+            "build_seconds": round(self.build_seconds, 3),
+            "lookups": self.lookups,
+            "updates": self.updates,
+        }
+
+
+# Global profile autocomplete instance
+settings = get_settings()
+profile_autocomplete = ProfileAutocomplete(
+    enabled=settings.profile_autocomplete_enabled,
+    batch_size=settings.profile_autocomplete_batch_size,
+)
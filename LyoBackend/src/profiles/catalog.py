@@ -0,0 +1,170 @@
+# Interests Catalog - Immutable In-Process Snapshot
+import asyncio
+import json
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.cache import LRUCache
+from ..core.database import get_db_session
+from ..core.logging import get_structured_logger
+from ..core.redis import RedisPubSub, get_redis, get_redis_binary
+from ..core.utils import make_etag
+from .models import Interest
+from .schemas import InterestResponse
+
+logger = get_structured_logger(__name__)
+
+# (body, etag)
+RenderedPage = Tuple[bytes, str]
+
+
+class InterestCatalogSnapshot:
+    """Immutable view of the interests catalog.
+
+    Each interest is validated and JSON-encoded once when the snapshot is
+    built; a page is the encoded items joined into an array, memoized with
+    its ETag per (category, skip, limit).
+    """
+
+    __slots__ = ("version", "categories", "pages", "_items", "_by_category")
+
+    def __init__(self, version: int, interests: Iterable[Interest]):
+        by_category: Dict[Optional[str], list] = {}
+        items = []
+        for interest in interests:
+            data = InterestResponse.model_validate(interest).model_dump(mode="json")
+            encoded = json.dumps(data, separators=(",", ":")).encode()
+            items.append(encoded)
+            by_category.setdefault(interest.category, []).append(encoded)
+
+        self.version = version
+        self.categories = tuple(sorted(category for category in by_category if category))
+        self._items = tuple(items)
+        self._by_category = {category: tuple(entries) for category, entries in by_category.items()}
+        self.pages = LRUCache(maxsize=256)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def render(self, category: Optional[str] = None, skip: int = 0, limit: int = 50) -> RenderedPage:
+        """Pre-encoded JSON array for one page of the catalog, with strong ETag"""
+        key = (category, skip, limit)
+        page = self.pages.get(key)
+        if page is None:
+            items = self._by_category.get(category, ()) if category else self._items
+            body = b"[" + b",".join(items[skip:skip + limit]) + b"]"
+            page = (body, make_etag(body))
+            self.pages.set(key, page)
+        return page
+
+
+class InterestCatalog:
+    """Serve the interests catalog from an in-process snapshot.
+
+    The catalog is loaded once and replaced only when a new version is
+    broadcast on `channel` (see `bump_version`, called after seeding or
+    editing interests).
+    """
+
+    channel = "interests:catalog"
+    version_key = "interests:catalog:version"
+
+    def __init__(self):
+        self.snapshot: Optional[InterestCatalogSnapshot] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loading: Optional[asyncio.Lock] = None
+
+        # Metrics
+        self.loads = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def get(self, db: AsyncSession) -> InterestCatalogSnapshot:
+        """Current snapshot, loading it with `db` on first use"""
+        if self.snapshot is None:
+            if self._loading is None:
+                self._loading = asyncio.Lock()
+            async with self._loading:
+                if self.snapshot is None:
+                    await self.reload(db, await self._current_version())
+        return self.snapshot
+
+    async def reload(self, db: AsyncSession, version: int) -> None:
+        """Build a fresh snapshot and swap it in"""
+        result = await db.execute(select(Interest).order_by(Interest.name))
+        self.snapshot = InterestCatalogSnapshot(version, result.scalars().all())
+        self.loads += 1
+        logger.info(f"Interests catalog v{version} loaded ({len(self.snapshot)} interests)")
+
+    async def bump_version(self) -> int:
+        """Tell every worker the catalog changed; returns the new version"""
+        version = await get_redis().incr(self.version_key)
+        await RedisPubSub(get_redis_binary()).publish(self.channel, {"version": version})
+        return version
+
+    async def _current_version(self) -> int:
+        try:
+            return int(await get_redis().get(self.version_key) or 0)
+        except Exception:
+            return 0
+
+    async def start(self) -> None:
+        """Start following catalog version bumps"""
+        if self.running:
+            return
+
+        self._task = asyncio.create_task(self._run())
+        logger.info("Interests catalog listener started")
+
+    async def stop(self) -> None:
+        """Stop following catalog version bumps"""
+        if not self.running:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        logger.info("Interests catalog listener stopped")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                pubsub = RedisPubSub(get_redis_binary())
+                async with pubsub.subscribe(self.channel) as channel:
+                    # Subscribed before loading so a bump during the load is not missed
+                    async with get_db_session() as session:
+                        await self.reload(session, await self._current_version())
+                    async for message in channel.listen():
+                        if message["type"] != "message":
+                            continue
+                        version = pubsub.codec.decode(message["data"])["version"]
+                        if self.snapshot is None or version != self.snapshot.version:
+                            async with get_db_session() as session:
+                                await self.reload(session, version)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Interests catalog listener error: {e}")
+                await asyncio.sleep(1)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get catalog metrics"""
+        return {
+            "running": self.running,
+            "version": self.snapshot.version if self.snapshot else None,
+            "interests": len(self.snapshot) if self.snapshot else 0,
+            "loads": self.loads,
+            "pages": self.snapshot.pages.stats() if self.snapshot else None,
+        }
+
+
+# Global interests catalog instance
+interest_catalog = InterestCatalog()
@@ -0,0 +1,307 @@
+# Follower / Following Counters
+import asyncio
+import random
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import and_, bindparam, exists, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.cache import LRUCache
+from ..core.config import get_settings
+from ..core.database import get_db_session
+from ..core.logging import get_structured_logger
+from ..core.redis import get_redis
+from .models import Follow, UserProfile
+
+logger = get_structured_logger(__name__)
+
+# (user_id, counter column, delta)
+CounterDelta = Tuple[UUID, str, int]
+
+_COLUMNS = ("followers_count", "following_count")
+
+_profiles = UserProfile.__table__
+
+
+class FollowCounters:
+    """Keep denormalized follow counts in step with approved follows.
+
+    Counters are updated in the same transaction as the follow change. For
+    hot accounts (followers_count at or above `hot_threshold`) the follower
+    increment is deferred to sharded Redis hashes instead, so concurrent
+    follows don't serialize on one user_profiles row, and a background task
+    applies the summed deltas in batches.
+    """
+
+    key_prefix = "profile:counters:"
+    hot_key = "profile:counters:hot"
+
+    def __init__(self, hot_threshold: int = 10000, shards: int = 8, flush_interval_ms: int = 1000):
+        self.hot_threshold = hot_threshold
+        self.shards = shards
+        self.flush_interval = flush_interval_ms / 1000
+        self._hot = LRUCache(maxsize=10000, default_ttl=60)
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+        # Metrics
+        self.deferred = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.discarded = 0
+        self.repaired = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def record(
+        self,
+        db: AsyncSession,
+        follower_id: UUID,
+        following_id: UUID,
+        delta: int
+    ) -> List[CounterDelta]:
+        """
+        Apply counter changes for one approved follow being added or removed.
+
+        Runs inside the caller's transaction. Returns the deltas deferred to
+        Redis, which the caller passes to `defer` once the transaction commits.
+        """
+        await db.execute(
+            update(UserProfile)
+            .where(UserProfile.user_id == follower_id)
+            .values(following_count=UserProfile.following_count + delta)
+        )
+
+        if await self._is_hot(following_id):
+            return [(following_id, "followers_count", delta)]
+
+        result = await db.execute(
+            update(UserProfile)
+            .where(UserProfile.user_id == following_id)
+            .values(followers_count=UserProfile.followers_count + delta)
+            .returning(UserProfile.followers_count)
+        )
+        followers_count = result.scalar_one_or_none()
+        if followers_count is not None and followers_count >= self.hot_threshold:
+            await self._mark_hot(following_id)
+
+        return []
+
+    async def defer(self, deltas: List[CounterDelta]) -> None:
+        """Buffer committed deltas in a random Redis shard"""
+        if not deltas:
+            return
+
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            for user_id, column, delta in deltas:
+                shard = random.randrange(self.shards)
+                pipe.hincrby(f"{self.key_prefix}{shard}", f"{user_id}:{column}", delta)
+            await pipe.execute()
+            self.deferred += len(deltas)
+        except Exception as e:
+            # Reconciliation repairs the drift
+            logger.error(f"Failed to defer {len(deltas)} counter deltas: {e}")
+
+    async def _is_hot(self, user_id: UUID) -> bool:
+        hot = self._hot.get(user_id)
+        if hot is not None:
+            return hot
+
+        try:
+            hot = bool(await get_redis().sismember(self.hot_key, str(user_id)))
+        except Exception:
+            # Without Redis every update goes straight to Postgres
+            return False
+
+        self._hot.set(user_id, hot)
+        return hot
+
+    async def _mark_hot(self, user_id: UUID) -> None:
+        try:
+            await get_redis().sadd(self.hot_key, str(user_id))
+            self._hot.set(user_id, True)
+        except Exception as e:
+            logger.error(f"Failed to mark {user_id} as hot: {e}")
+
+    async def start(self) -> None:
+        """Start background flusher"""
+        if self.running:
+            return
+
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info("Follow counter flusher started")
+
+    async def stop(self) -> None:
+        """Stop background flusher after a final flush"""
+        if not self.running:
+            return
+
+        self._stopping.set()
+        await self._task
+        self._task = None
+
+        logger.info("Follow counter flusher stopped")
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Follow counter flush failed: {e}")
+
+    async def flush(self) -> int:
+        """Apply buffered deltas from every shard; returns number of rows updated"""
+        try:
+            redis_client = get_redis()
+        except RuntimeError:
+            return 0
+
+        totals: Dict[Tuple[UUID, str], int] = defaultdict(int)
+        for shard in range(self.shards):
+            key = f"{self.key_prefix}{shard}"
+            try:
+                # Read and clear atomically so concurrent flushers never double count
+                pipe = redis_client.pipeline(transaction=True)
+                pipe.hgetall(key)
+                pipe.delete(key)
+                fields, _ = await pipe.execute()
+            except Exception as e:
+                logger.error(f"Failed to read counter shard {key}: {e}")
+                continue
+
+            for field, delta in fields.items():
+                parsed = self._parse_field(field, delta)
+                if parsed is None:
+                    # Requeueing it would fail every later flush too
+                    logger.warning(f"Discarding malformed counter buffer field {field!r}")
+                    self.discarded += 1
+                    continue
+                user_id, column, delta = parsed
+                totals[(user_id, column)] += delta
+
+        totals = {key: delta for key, delta in totals.items() if delta}
+        if not totals:
+            return 0
+
+        try:
+            async with get_db_session() as session:
+                for column in _COLUMNS:
+                    params = [
+                        {"b_user_id": user_id, "b_delta": delta}
+                        for (user_id, counter), delta in totals.items()
+                        if counter == column
+                    ]
+                    if params:
+                        await session.execute(
+                            update(_profiles)
+                            .where(_profiles.c.user_id == bindparam("b_user_id"))
+                            .values({column: _profiles.c[column] + bindparam("b_delta")}),
+                            params,
+                        )
+        except Exception as e:
+            logger.error(f"Failed to flush {len(totals)} counter deltas: {e}")
+            await self.defer([
+                (user_id, column, delta)
+                for (user_id, column), delta in totals.items()
+            ])
+            return 0
+
+        self.flushed += len(totals)
+        self.flushes += 1
+        return len(totals)
+
+    @staticmethod
+    def _parse_field(field: str, delta: str) -> Optional[CounterDelta]:
+        """(user_id, column, delta) from a buffer entry, or None if malformed"""
+        user_id, _, column = field.rpartition(":")
+        if column not in _COLUMNS:
+            return None
+        try:
+            return UUID(user_id), column, int(delta)
+        except ValueError:
+            return None
+
+    async def reconcile(self, session: AsyncSession) -> int:
+        """
+        Recompute every counter from follows with one grouped COUNT per column.
+
+        Buffered deltas are flushed first. Follows committed while this runs
+        may be counted twice, so run it during low traffic.
+
+        Returns:
+            Number of profile counters repaired
+        """
+        await self.flush()
+
+        repaired = 0
+        for column, key in (
+            ("followers_count", Follow.following_id),
+            ("following_count", Follow.follower_id),
+        ):
+            counts = (
+                select(key.label("user_id"), func.count().label("total"))
+                .where(Follow.is_approved == True)
+                .group_by(key)
+                .subquery()
+            )
+            result = await session.execute(
+                update(_profiles)
+                .where(
+                    and_(
+                        _profiles.c.user_id == counts.c.user_id,
+                        _profiles.c[column] != counts.c.total
+                    )
+                )
+                .values({column: counts.c.total})
+            )
+            repaired += result.rowcount
+
+            # Profiles with no approved follows left
+            result = await session.execute(
+                update(_profiles)
+                .where(
+                    and_(
+                        _profiles.c[column] != 0,
+                        ~exists().where(
+                            and_(key == _profiles.c.user_id, Follow.is_approved == True)
+                        )
+                    )
+                )
+                .values({column: 0})
+            )
+            repaired += result.rowcount
+
+        await session.commit()
+        self.repaired += repaired
+        return repaired
+
+    def stats(self) -> Dict[str, Any]:
+        """Get counter metrics"""
+        return {
+            "running": self.running,
+            "hot_accounts_cached": len(self._hot),
+            "deferred": self.deferred,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "discarded": self.discarded,
+            "repaired": self.repaired,
+        }
+
+
+# Global follow counters instance
+settings = get_settings()
+follow_counters = FollowCounters(
+    hot_threshold=settings.follow_counter_hot_threshold,
+    shards=settings.follow_counter_shards,
+    flush_interval_ms=settings.follow_counter_flush_ms,
+)
@@ -0,0 +1,363 @@
+# XP Leaderboards - Redis Sorted Sets
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import get_settings
+from ..core.database import get_db_session
+from ..core.logging import get_structured_logger
+from ..core.redis import get_redis
+from ..core.utils import generate_secure_token
+from .models import Follow, UserInterest, UserProfile
+
+logger = get_structured_logger(__name__)
+
+# (user_id, xp, zero-based rank)
+Ranked = Tuple[UUID, int, int]
+
+# Remember users whose boards changed while a rebuild is running.
+# KEYS[1] = rebuild marker, KEYS[2] = touched set, ARGV = user ids
+_MARK_TOUCHED_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('SADD', KEYS[2], unpack(ARGV))
+end
+return 0
+"""
+
+
+class Leaderboards:
+    """XP leaderboards kept in Redis sorted sets.
+
+    There is one global board and one board per interest; friends boards
+    are scored from the global board. Scores are absolute XP totals read
+    back from Postgres after each grant, so a replayed or late update can't
+    drift. If the boards disappear (Redis flush or failover) a background
+    check rebuilds them from Postgres in streaming batches. Updates made
+    while a rebuild runs are recorded and replayed over the rebuilt
+    boards, so its snapshot can't overwrite them.
+    """
+
+    key_prefix = "leaderboard:xp:"
+    built_key = "leaderboard:xp:built"
+    rebuild_lock_key = "leaderboard:xp:rebuilding"
+    rebuild_active_key = "leaderboard:xp:rebuild:active"
+    rebuild_touched_key = "leaderboard:xp:rebuild:touched"
+
+    def __init__(self, batch_size: int = 5000, check_interval: int = 60):
+        self.batch_size = batch_size
+        self.check_interval = check_interval
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.updates = 0
+        self.rebuilds = 0
+        self.last_rebuild_entries = 0
+        self.replayed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def global_key(self) -> str:
+        return f"{self.key_prefix}global"
+
+    def interest_key(self, interest_id: UUID) -> str:
+        return f"{self.key_prefix}interest:{interest_id}"
+
+    async def sync_users(self, db: AsyncSession, user_ids: Iterable[UUID]) -> None:
+        """Write current XP for users to the global and their interest boards"""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            self._mark_touched(pipe, user_ids)
+            for user_id, xp_points, interest_id in await self._current_entries(db, user_ids):
+                self._write_entry(pipe, user_id, xp_points, interest_id)
+            await pipe.execute()
+            self.updates += len(user_ids)
+        except RuntimeError:
+            # Redis not initialized; boards are rebuilt once it is
+            pass
+        except Exception as e:
+            # The next rebuild repairs the boards
+            logger.error(f"Failed to update leaderboards for {len(user_ids)} users: {e}")
+
+    async def _current_entries(self, db: AsyncSession, user_ids: List[UUID]) -> list:
+        """(user_id, xp, interest_id or None) rows for users, read from Postgres"""
+        result = await db.execute(
+            select(UserProfile.user_id, UserProfile.xp_points, UserInterest.interest_id)
+            .outerjoin(UserInterest, UserInterest.user_id == UserProfile.user_id)
+            .where(UserProfile.user_id.in_(user_ids))
+        )
+        return result.all()
+
+    def _write_entry(self, pipe, user_id: UUID, xp_points: int, interest_id: Optional[UUID]) -> None:
+        if xp_points <= 0:
+            return
+        pipe.zadd(self.global_key(), {str(user_id): xp_points})
+        if interest_id:
+            pipe.zadd(self.interest_key(interest_id), {str(user_id): xp_points})
+
+    def _mark_touched(self, pipe, user_ids: Iterable[UUID]) -> None:
+        pipe.eval(
+            _MARK_TOUCHED_SCRIPT, 2, self.rebuild_active_key, self.rebuild_touched_key,
+            *(str(user_id) for user_id in user_ids),
+        )
+
+    async def sync_interests(
+        self,
+        db: AsyncSession,
+        user_id: UUID,
+        added: Iterable[UUID] = (),
+        removed: Iterable[UUID] = ()
+    ) -> None:
+        """Move a user onto or off interest boards"""
+        added, removed = list(added), list(removed)
+        if not added and not removed:
+            return
+
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            self._mark_touched(pipe, [user_id])
+            xp_points = await db.scalar(
+                select(UserProfile.xp_points).where(UserProfile.user_id == user_id)
+            )
+            if xp_points and xp_points > 0:
+                for interest_id in added:
+                    pipe.zadd(self.interest_key(interest_id), {str(user_id): xp_points})
+            for interest_id in removed:
+                pipe.zrem(self.interest_key(interest_id), str(user_id))
+            await pipe.execute()
+        except RuntimeError:
+            pass
+        except Exception as e:
+            logger.error(f"Failed to update interest leaderboards for {user_id}: {e}")
+
+    async def page(self, key: str, offset: int, limit: int) -> List[Ranked]:
+        """Entries ranked offset..offset+limit-1, highest XP first"""
+        entries = await get_redis().zrevrange(key, offset, offset + limit - 1, withscores=True)
+        return [
+            (UUID(member), int(score), offset + i)
+            for i, (member, score) in enumerate(entries)
+        ]
+
+    async def rank(self, key: str, user_id: UUID) -> Optional[Ranked]:
+        """A user's zero-based rank and XP on a board, or None if not ranked"""
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.zrevrank(key, str(user_id))
+        pipe.zscore(key, str(user_id))
+        rank, score = await pipe.execute()
+        if rank is None:
+            return None
+        return user_id, int(score), rank
+
+    async def friends(
+        self,
+        db: AsyncSession,
+        user_id: UUID,
+        offset: int,
+        limit: int
+    ) -> Tuple[List[Ranked], Optional[Ranked]]:
+        """Rank the user and everyone they follow, scored from the global board"""
+        result = await db.execute(
+            select(Follow.following_id).where(
+                and_(Follow.follower_id == user_id, Follow.is_approved == True)
+            )
+        )
+        members = [user_id, *result.scalars().all()]
+        scores = await get_redis().zmscore(self.global_key(), [str(member) for member in members])
+
+        scored = sorted(
+            ((member, int(score)) for member, score in zip(members, scores) if score is not None),
+            key=lambda entry: (-entry[1], str(entry[0])),
+        )
+        ranked = [(member, xp, rank) for rank, (member, xp) in enumerate(scored)]
+        me = next((entry for entry in ranked if entry[0] == user_id), None)
+        return ranked[offset:offset + limit], me
+
+    async def rebuild(self, session: AsyncSession) -> int:
+        """
+        Rebuild every board from Postgres.
+
+        Each board is written to a temporary key in streaming batches and
+        renamed over the live key, so readers never see a partial board.
+        Users updated between the snapshot and the rename are re-synced
+        from Postgres afterwards.
+
+        Returns:
+            Number of board entries written
+        """
+        redis_client = get_redis()
+        build_id = generate_secure_token(6)
+        staged: Dict[str, str] = {}
+        entries = 0
+
+        # Open the window before reading, so no committed update is missed
+        pipe = redis_client.pipeline(transaction=True)
+        pipe.set(self.rebuild_active_key, build_id, ex=3600)
+        pipe.delete(self.rebuild_touched_key)
+        await pipe.execute()
+
+        def stage(key: str) -> str:
+            if key not in staged:
+                staged[key] = f"{key}:build:{build_id}"
+            return staged[key]
+
+        try:
+            result = await session.stream(
+                select(UserProfile.user_id, UserProfile.xp_points)
+                .where(UserProfile.xp_points > 0)
+                .execution_options(yield_per=self.batch_size)
+            )
+            async for rows in result.partitions():
+                await redis_client.zadd(
+                    stage(self.global_key()),
+                    {str(user_id): xp_points for user_id, xp_points in rows},
+                )
+                entries += len(rows)
+
+            result = await session.stream(
+                select(UserInterest.interest_id, UserInterest.user_id, UserProfile.xp_points)
+                .join(UserProfile, UserProfile.user_id == UserInterest.user_id)
+                .where(UserProfile.xp_points > 0)
+                .execution_options(yield_per=self.batch_size)
+            )
+            async for rows in result.partitions():
+                pipe = redis_client.pipeline(transaction=False)
+                for interest_id, user_id, xp_points in rows:
+                    pipe.zadd(stage(self.interest_key(interest_id)), {str(user_id): xp_points})
+                await pipe.execute()
+                entries += len(rows)
+
+            stale = await self._stale_boards(redis_client, staged)
+
+            pipe = redis_client.pipeline(transaction=True)
+            for key, build_key in staged.items():
+                pipe.rename(build_key, key)
+            if self.global_key() not in staged:
+                stale.append(self.global_key())
+            if stale:
+                pipe.delete(*stale)
+            pipe.set(self.built_key, build_id)
+            await pipe.execute()
+        except Exception:
+            if staged:
+                await redis_client.delete(*staged.values())
+            await redis_client.delete(self.rebuild_active_key, self.rebuild_touched_key)
+            raise
+
+        await self._replay(session, staged)
+
+        self.rebuilds += 1
+        self.last_rebuild_entries = entries
+        logger.info(f"Leaderboards rebuilt: {len(staged)} boards, {entries} entries")
+        return entries
+
+    async def _stale_boards(self, redis_client, staged: Dict[str, str]) -> List[str]:
+        """Live interest boards with no members left"""
+        return [
+            key async for key in redis_client.scan_iter(match=f"{self.key_prefix}interest:*")
+            if ":build:" not in key and key not in staged
+        ]
+
+    async def _replay(self, session: AsyncSession, staged: Dict[str, str]) -> None:
+        """Re-sync users whose boards changed during the rebuild window"""
+        redis_client = get_redis()
+        interest_boards = [key for key in staged if key != self.global_key()]
+
+        # The window stays open while replaying, so an update that lands
+        # between our read and write is picked up by the next round
+        for _ in range(5):
+            pipe = redis_client.pipeline(transaction=True)
+            pipe.smembers(self.rebuild_touched_key)
+            pipe.delete(self.rebuild_touched_key)
+            touched, _ = await pipe.execute()
+            if not touched:
+                break
+
+            user_ids = [UUID(member) for member in touched]
+            rows = await self._current_entries(session, user_ids)
+            pipe = redis_client.pipeline(transaction=True)
+            for user_id in user_ids:
+                # Interests removed during the window survive in the snapshot
+                for key in interest_boards:
+                    pipe.zrem(key, str(user_id))
+                pipe.zrem(self.global_key(), str(user_id))
+            for user_id, xp_points, interest_id in rows:
+                self._write_entry(pipe, user_id, xp_points, interest_id)
+            await pipe.execute()
+            self.replayed += len(user_ids)
+        else:
+            logger.warning("Leaderboard rebuild stopped replaying under sustained updates")
+
+        await redis_client.delete(self.rebuild_active_key, self.rebuild_touched_key)
+
+    async def rebuild_if_missing(self) -> bool:
+        """Rebuild once across workers if the boards were lost"""
+        redis_client = get_redis()
+        if await redis_client.exists(self.built_key):
+            return False
+        if not await redis_client.set(self.rebuild_lock_key, "1", nx=True, ex=600):
+            return False
+
+        try:
+            async with get_db_session() as session:
+                await self.rebuild(session)
+        finally:
+            await redis_client.delete(self.rebuild_lock_key)
+        return True
+
+    async def start(self) -> None:
+        """Start watching for lost boards"""
+        if self.running:
+            return
+
+        self._task = asyncio.create_task(self._run())
+        logger.info("Leaderboard watcher started")
+
+    async def stop(self) -> None:
+        """Stop watching for lost boards"""
+        if not self.running:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        logger.info("Leaderboard watcher stopped")
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.rebuild_if_missing()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Leaderboard rebuild failed: {e}")
+            await asyncio.sleep(self.check_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get leaderboard metrics"""
+        return {
+            "running": self.running,
+            "updates": self.updates,
+            "rebuilds": self.rebuilds,
+            "last_rebuild_entries": self.last_rebuild_entries,
+            "replayed": self.replayed,
+        }
+
+
+# Global leaderboards instance
+settings = get_settings()
+leaderboards = Leaderboards(
+    batch_size=settings.leaderboard_rebuild_batch_size,
+    check_interval=settings.leaderboard_check_interval,
+)
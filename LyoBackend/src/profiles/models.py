@@ -8,6 +8,7 @@ from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, T
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
+from ..auth.models import full_name_key, search_key_indexes
 from ..core.database import Base
 
 
@@ -57,6 +58,10 @@ class UserProfile(Base):
     following = relationship("Follow", foreign_keys="Follow.follower_id", back_populates="follower")
     followers = relationship("Follow", foreign_keys="Follow.following_id", back_populates="following")
     
+    __table_args__ = (
+        *search_key_indexes('username', sa.func.lower(username)),
+    )
+    
     def __repr__(self):
         return f"<UserProfile {self.username or self.user_id}>"
 
@@ -82,7 +87,15 @@ class Follow(Base):
     following = relationship("UserProfile", foreign_keys=[following_id], back_populates="followers")
     
     # Unique constraint to prevent duplicate follows
-    __table_args__ = (sa.UniqueConstraint('follower_id', 'following_id', name='unique_follow'),)
+    __table_args__ = (
+        sa.UniqueConstraint('follower_id', 'following_id', name='unique_follow'),
+        # Covering indexes for relationship status lookups in both directions
+        sa.Index('ix_follows_follower_following_approved', 'follower_id', 'following_id', 'is_approved'),
+        sa.Index('ix_follows_following_follower_approved', 'following_id', 'follower_id', 'is_approved'),
+        # Keyset pagination for followers / follow requests and following
+        sa.Index('ix_follows_following_approved_created_at', 'following_id', 'is_approved', 'created_at', 'id'),
+        sa.Index('ix_follows_follower_approved_created_at', 'follower_id', 'is_approved', 'created_at', 'id'),
+    )
     
     def __repr__(self):
         return f"<Follow {self.follower_id} -> {self.following_id}>"
@@ -127,6 +140,34 @@ class UserInterest(Base):
         return f"<UserInterest {self.user_id} -> {self.interest_id}>"
 
 
+class XPEvent(Base):
+    """Append-only ledger of XP grants"""
+    __tablename__ = "xp_events"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    amount = Column(Integer, nullable=False)
+    reason = Column(String(50), nullable=False)  # lesson_completed, quiz_passed, manual, ...
+    grants = Column(Integer, default=1, nullable=False)  # Buffered grants folded into this row
+    
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    
+    # Per-user XP history
+    __table_args__ = (sa.Index('ix_xp_events_user_id_created_at', 'user_id', 'created_at'),)
+    
+    def __repr__(self):
+        return f"<XPEvent {self.user_id} +{self.amount} {self.reason}>"
+
+
 # Add relationship to User model
 from ..auth.models import User
 User.profile = relationship("UserProfile", back_populates="user", uselist=False)
+
+
+# Profile search keys. ProfileService.search_profiles must use these exact
+# expressions for Postgres to match them to the indexes declared with
+# search_key_indexes on each table.
+search_username = sa.func.lower(UserProfile.username)
+search_display_name = sa.func.lower(User.display_name)
+search_full_name = full_name_key(User.first_name, User.last_name)
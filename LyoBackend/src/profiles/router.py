@@ -2,33 +2,43 @@
 from typing import List, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..auth.dependencies import get_current_user
-from ..auth.models import User
+from ..auth.dependencies import get_current_principal
+from ..auth.principal import Principal
 from ..core.database import get_db
 from ..core.exceptions import BusinessLogicError, NotFoundError
+from ..core.utils import etag_matches
 from .schemas import (
+    BulkInterestRequest,
+    BulkInterestResponse,
     FollowRequest,
+    FollowRequestPage,
     FollowResponse,
     InterestRequest,
     InterestResponse,
+    LeaderboardPage,
     ProfileCreate,
+    ProfilePage,
     ProfileResponse,
     ProfileSearchResponse,
     ProfileStats,
+    ProfileSuggestion,
     ProfileUpdate,
     UserInterestResponse,
 )
+from .autocomplete import profile_autocomplete
+from .catalog import interest_catalog
 from .service import ProfileService
+from .xp import REASON_PATTERN, xp_engine
 
 router = APIRouter(prefix="/profiles", tags=["profiles"])
 
 
 @router.get("/me", response_model=ProfileResponse)
 async def get_my_profile(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Get current user's profile"""
@@ -46,7 +56,7 @@ async def get_my_profile(
 @router.put("/me", response_model=ProfileResponse)
 async def update_my_profile(
     profile_data: ProfileUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Update current user's profile"""
@@ -62,10 +72,113 @@ async def update_my_profile(
         )
 
 
+@router.get("/search", response_model=ProfilePage)
+async def search_profiles(
+    q: str = Query(..., min_length=2, description="Search query"),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page"),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """Search user profiles"""
+    try:
+        profiles, next_cursor = await ProfileService.search_profiles(
+            q, current_user.id, cursor, limit, db
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return ProfilePage(
+        items=[ProfileSearchResponse.from_orm(profile) for profile in profiles],
+        next_cursor=next_cursor,
+    )
+
+
+@router.get("/search/autocomplete", response_model=List[ProfileSuggestion])
+async def autocomplete_profiles(
+    q: str = Query(..., min_length=1, max_length=50, description="Username or display name prefix"),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """Typeahead served from the in-process prefix index"""
+    if profile_autocomplete.ready:
+        return [ProfileSuggestion.from_orm(match) for match in profile_autocomplete.search(q, limit)]
+    
+    # Index still loading; fall back to SQL search
+    profiles, _ = await ProfileService.search_profiles(q, None, None, limit, db)
+    return [
+        ProfileSuggestion(
+            user_id=profile.user_id,
+            username=profile.username,
+            display_name=profile.user.display_name,
+        )
+        for profile in profiles
+    ]
+
+
+@router.get("/interests", response_model=List[InterestResponse])
+async def get_interests(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=100),
+    category: Optional[str] = Query(None),
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get available interests"""
+    snapshot = await interest_catalog.get(db)
+    body, etag = snapshot.render(category, skip, limit)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    # Pre-encoded body; skips response_model validation
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get("/leaderboards/global", response_model=LeaderboardPage)
+async def get_global_leaderboard(
+    offset: int = Query(0, ge=0, le=10000),
+    limit: int = Query(50, ge=1, le=100),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """Top learners by XP"""
+    return await ProfileService.get_leaderboard(current_user.id, "global", offset, limit, db)
+
+
+@router.get("/leaderboards/interests/{interest_id}", response_model=LeaderboardPage)
+async def get_interest_leaderboard(
+    interest_id: UUID,
+    offset: int = Query(0, ge=0, le=10000),
+    limit: int = Query(50, ge=1, le=100),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """Top learners by XP among users with an interest"""
+    return await ProfileService.get_leaderboard(
+        current_user.id, "interest", offset, limit, db, interest_id=interest_id
+    )
+
+
+@router.get("/leaderboards/friends", response_model=LeaderboardPage)
+async def get_friends_leaderboard(
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=100),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """The current user ranked against everyone they follow"""
+    return await ProfileService.get_leaderboard(current_user.id, "friends", offset, limit, db)
+
+
 @router.get("/{user_id}", response_model=ProfileResponse)
 async def get_profile(
     user_id: UUID,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Get user profile by ID"""
@@ -94,7 +207,7 @@ async def get_profile(
 @router.get("/username/{username}", response_model=ProfileResponse)
 async def get_profile_by_username(
     username: str,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Get user profile by username"""
@@ -123,7 +236,7 @@ async def get_profile_by_username(
 @router.post("/{user_id}/follow", response_model=FollowResponse)
 async def follow_user(
     user_id: UUID,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Follow a user"""
@@ -147,7 +260,7 @@ async def follow_user(
 @router.delete("/{user_id}/follow")
 async def unfollow_user(
     user_id: UUID,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Unfollow a user"""
@@ -161,54 +274,81 @@ async def unfollow_user(
         )
 
 
-@router.get("/{user_id}/followers", response_model=List[ProfileSearchResponse])
+@router.get("/{user_id}/followers", response_model=ProfilePage)
 async def get_followers(
     user_id: UUID,
-    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page"),
     limit: int = Query(20, ge=1, le=100),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Get user's followers"""
-    followers = await ProfileService.get_followers(
-        user_id, current_user.id, skip, limit, db
+    try:
+        followers, next_cursor = await ProfileService.get_followers(
+            user_id, current_user.id, cursor, limit, db
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return ProfilePage(
+        items=[ProfileSearchResponse.from_orm(profile) for profile in followers],
+        next_cursor=next_cursor,
     )
-    return [ProfileSearchResponse.from_orm(profile) for profile in followers]
 
 
-@router.get("/{user_id}/following", response_model=List[ProfileSearchResponse])
+@router.get("/{user_id}/following", response_model=ProfilePage)
 async def get_following(
     user_id: UUID,
-    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page"),
     limit: int = Query(20, ge=1, le=100),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Get users that user is following"""
-    following = await ProfileService.get_following(
-        user_id, current_user.id, skip, limit, db
+    try:
+        following, next_cursor = await ProfileService.get_following(
+            user_id, current_user.id, cursor, limit, db
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return ProfilePage(
+        items=[ProfileSearchResponse.from_orm(profile) for profile in following],
+        next_cursor=next_cursor,
     )
-    return [ProfileSearchResponse.from_orm(profile) for profile in following]
 
 
-@router.get("/me/follow-requests", response_model=List[FollowResponse])
+@router.get("/me/follow-requests", response_model=FollowRequestPage)
 async def get_follow_requests(
-    skip: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Cursor from the previous page"),
     limit: int = Query(20, ge=1, le=100),
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Get pending follow requests"""
-    requests = await ProfileService.get_follow_requests(
-        current_user.id, skip, limit, db
+    try:
+        requests, next_cursor = await ProfileService.get_follow_requests(
+            current_user.id, cursor, limit, db
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return FollowRequestPage(
+        items=[FollowResponse.from_orm(request) for request in requests],
+        next_cursor=next_cursor,
     )
-    return [FollowResponse.from_orm(request) for request in requests]
 
 
 @router.post("/follow-requests/{follower_id}/approve", response_model=FollowResponse)
 async def approve_follow_request(
     follower_id: UUID,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Approve a follow request"""
@@ -227,7 +367,7 @@ async def approve_follow_request(
 @router.delete("/follow-requests/{follower_id}")
 async def reject_follow_request(
     follower_id: UUID,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Reject a follow request"""
@@ -246,7 +386,7 @@ async def reject_follow_request(
 @router.post("/me/interests", response_model=UserInterestResponse)
 async def add_interest(
     interest_request: InterestRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Add interest to user profile"""
@@ -262,10 +402,34 @@ async def add_interest(
         )
 
 
+@router.post("/me/interests/bulk", response_model=BulkInterestResponse)
+async def add_interests(
+    bulk_request: BulkInterestRequest,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """Add several interests at once; reports the outcome per interest"""
+    results = await ProfileService.add_interests(
+        current_user.id, bulk_request.interests, db
+    )
+    return BulkInterestResponse(results=results)
+
+
+@router.delete("/me/interests", response_model=BulkInterestResponse)
+async def remove_interests(
+    interest_ids: List[UUID] = Query(..., alias="interest_id", max_length=50),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+):
+    """Remove several interests at once; reports the outcome per interest"""
+    results = await ProfileService.remove_interests(current_user.id, interest_ids, db)
+    return BulkInterestResponse(results=results)
+
+
 @router.delete("/me/interests/{interest_id}")
 async def remove_interest(
     interest_id: UUID,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Remove interest from user profile"""
@@ -279,37 +443,10 @@ async def remove_interest(
         )
 
 
-@router.get("/search", response_model=List[ProfileSearchResponse])
-async def search_profiles(
-    q: str = Query(..., min_length=2, description="Search query"),
-    skip: int = Query(0, ge=0),
-    limit: int = Query(20, ge=1, le=100),
-    current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
-):
-    """Search user profiles"""
-    profiles = await ProfileService.search_profiles(
-        q, current_user.id, skip, limit, db
-    )
-    return [ProfileSearchResponse.from_orm(profile) for profile in profiles]
-
-
-@router.get("/interests", response_model=List[InterestResponse])
-async def get_interests(
-    skip: int = Query(0, ge=0),
-    limit: int = Query(50, ge=1, le=100),
-    category: Optional[str] = Query(None),
-    db: AsyncSession = Depends(get_db)
-):
-    """Get available interests"""
-    interests = await ProfileService.get_interests(skip, limit, category, db)
-    return [InterestResponse.from_orm(interest) for interest in interests]
-
-
 @router.get("/{user_id}/stats", response_model=ProfileStats)
 async def get_profile_stats(
     user_id: UUID,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Get profile statistics"""
@@ -346,12 +483,17 @@ async def get_profile_stats(
 @router.post("/me/xp", include_in_schema=False)
 async def update_xp(
     xp_gained: int,
-    current_user: User = Depends(get_current_user),
+    reason: str = Query("manual", max_length=50, pattern=REASON_PATTERN),
+    buffered: bool = False,
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
-    """Update user XP (internal use)"""
+    """Update user XP (internal use); buffered grants are applied within a second or so"""
+    if buffered and await xp_engine.grant_buffered(current_user.id, xp_gained, reason):
+        return {"xp_gained": xp_gained, "buffered": True}
+    
     profile = await ProfileService.update_xp_and_level(
-        current_user.id, xp_gained, db
+        current_user.id, xp_gained, db, reason
     )
     return {
         "level": profile.level,
@@ -362,7 +504,7 @@ async def update_xp(
 
 @router.post("/me/streak", include_in_schema=False)
 async def update_streak(
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: AsyncSession = Depends(get_db)
 ):
     """Update user streak (internal use)"""
@@ -1,6 +1,6 @@
 # Profile Schemas (Pydantic Models)
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Literal, Optional
 from uuid import UUID
 
 from pydantic import BaseModel, Field, validator
@@ -151,6 +151,22 @@ class InterestRequest(BaseModel):
     is_learning: bool = True
 
 
+class BulkInterestRequest(BaseModel):
+    """Add several interests at once"""
+    interests: List[InterestRequest] = Field(..., min_length=1, max_length=50)
+
+
+class InterestResult(BaseModel):
+    """Outcome for one interest of a bulk request"""
+    interest_id: UUID
+    status: Literal["added", "already_added", "removed", "not_found"]
+
+
+class BulkInterestResponse(BaseModel):
+    """Per-interest outcomes of a bulk request"""
+    results: List[InterestResult]
+
+
 class ProfileSearchResponse(BaseModel):
     """Simplified profile for search results"""
     id: UUID
@@ -167,6 +183,45 @@ class ProfileSearchResponse(BaseModel):
         from_attributes = True
 
 
+class ProfileSuggestion(BaseModel):
+    """Typeahead match"""
+    user_id: UUID
+    username: Optional[str] = None
+    display_name: Optional[str] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class ProfilePage(BaseModel):
+    """Page of profiles with opaque cursor for the next page"""
+    items: List[ProfileSearchResponse]
+    next_cursor: Optional[str] = None
+
+
+class LeaderboardEntry(BaseModel):
+    """Ranked profile on a leaderboard"""
+    rank: int
+    user_id: UUID
+    username: Optional[str] = None
+    display_name: Optional[str] = None
+    avatar_url: Optional[str] = None
+    level: int
+    xp_points: int
+
+
+class LeaderboardPage(BaseModel):
+    """Page of a leaderboard plus the caller's own position"""
+    entries: List[LeaderboardEntry]
+    me: Optional[LeaderboardEntry] = None
+
+
+class FollowRequestPage(BaseModel):
+    """Page of follow requests with opaque cursor for the next page"""
+    items: List[FollowResponse]
+    next_cursor: Optional[str] = None
+
+
 class ProfileStats(BaseModel):
     """Profile statistics"""
     total_followers: int
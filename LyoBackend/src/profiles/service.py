@@ -1,21 +1,48 @@
 # Profile Service Layer
-from typing import List, Optional, Tuple
-from uuid import UUID
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID, uuid4
 
-from sqlalchemy import and_, func, or_, select
+from sqlalchemy import Select, and_, case, delete, func, or_, select, tuple_, union, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from ..core.database import get_db
+from ..auth.models import User
+from ..core.config import get_settings
+from ..core.database import dialect_insert, get_db, get_db_session
 from ..core.exceptions import BusinessLogicError, NotFoundError
-from .models import Follow, Interest, UserInterest, UserProfile
+from ..core.redis import RedisCache, get_redis_binary
+from ..core.utils import create_cursor, create_rank_cursor, parse_cursor, parse_rank_cursor
+from .autocomplete import profile_autocomplete
+from .counters import follow_counters
+from .leaderboards import leaderboards
+from .models import (
+    Follow,
+    Interest,
+    UserInterest,
+    UserProfile,
+    search_display_name,
+    search_full_name,
+    search_username,
+)
 from .schemas import (
     InterestRequest,
+    InterestResult,
+    LeaderboardEntry,
+    LeaderboardPage,
     ProfileCreate,
     ProfileResponse,
     ProfileUpdate,
     UserInterestResponse,
 )
+from .xp import streak_values, xp_engine, xp_values
+
+
+# Session.info key for per-request relationship status memo
+_RELATIONSHIP_MEMO_KEY = "relationship_statuses"
+
+# pg_trgm cannot use an index for substring patterns shorter than a trigram
+_TRIGRAM_MIN_LENGTH = 3
 
 
 class ProfileService:
@@ -31,14 +58,67 @@ class ProfileService:
         result = await db.execute(stmt)
         profile = result.scalar_one_or_none()
         
-        if not profile:
-            profile = UserProfile(
-                user_id=user_id,
-                difficulty_preference="intermediate"
-            )
-            db.add(profile)
-            await db.commit()
-            await db.refresh(profile)
+        if profile:
+            return profile
+        
+        # Profiles are created at sign-up; this covers older accounts. A
+        # concurrent first request may win the insert, then we read its row.
+        profile = await db.scalar(
+            ProfileService._insert_default_profile(user_id, db).returning(UserProfile)
+        )
+        await db.commit()
+        
+        if profile is None:
+            result = await db.execute(stmt)
+            return result.scalar_one()
+        
+        await profile_autocomplete.publish(user_id, db)
+        return profile
+
+    @staticmethod
+    async def create_default_profile(user_id: UUID, db: AsyncSession) -> bool:
+        """
+        Create a default profile inside the caller's transaction.
+        
+        Returns False if the user already has one. The caller commits.
+        """
+        result = await db.execute(
+            ProfileService._insert_default_profile(user_id, db).returning(UserProfile.id)
+        )
+        return result.scalar_one_or_none() is not None
+
+    @staticmethod
+    def _insert_default_profile(user_id: UUID, db: AsyncSession):
+        """INSERT ... ON CONFLICT (user_id) DO NOTHING for a default profile"""
+        return dialect_insert(db, UserProfile).values(
+            user_id=user_id,
+            difficulty_preference="intermediate"
+        ).on_conflict_do_nothing(index_elements=["user_id"])
+
+    @staticmethod
+    async def update_profile_values(
+        user_id: UUID,
+        values: Dict,
+        db: AsyncSession
+    ) -> UserProfile:
+        """
+        Apply column updates (e.g. `xp_points=UserProfile.xp_points + 10`) in
+        one UPDATE ... RETURNING, without loading the profile first.
+        
+        Creates the default profile if it is missing. The caller commits.
+        """
+        stmt = (
+            update(UserProfile)
+            .where(UserProfile.user_id == user_id)
+            .values(**values)
+            .returning(UserProfile)
+            .execution_options(populate_existing=True)
+        )
+        profile = await db.scalar(stmt)
+        
+        if profile is None:
+            await db.execute(ProfileService._insert_default_profile(user_id, db))
+            profile = await db.scalar(stmt)
         
         return profile
 
@@ -113,11 +193,15 @@ class ProfileService:
                 raise BusinessLogicError("Username already taken")
         
         # Update profile fields
-        for field, value in profile_data.dict(exclude_unset=True).items():
+        changes = profile_data.dict(exclude_unset=True)
+        for field, value in changes.items():
             setattr(profile, field, value)
         
         await db.commit()
         await db.refresh(profile)
+        
+        if "username" in changes:
+            await profile_autocomplete.publish(user_id, db)
         return profile
 
     @staticmethod
@@ -158,7 +242,12 @@ class ProfileService:
         )
         
         db.add(follow)
+        deferred = []
+        if follow.is_approved:
+            deferred = await follow_counters.record(db, follower_id, following_id, 1)
+        ProfileService._forget_relationship_statuses(db)
         await db.commit()
+        await follow_counters.defer(deferred)
         await db.refresh(follow)
         return follow
 
@@ -182,7 +271,12 @@ class ProfileService:
             raise NotFoundError("Follow relationship not found")
         
         await db.delete(follow)
+        deferred = []
+        if follow.is_approved:
+            deferred = await follow_counters.record(db, follower_id, following_id, -1)
+        ProfileService._forget_relationship_statuses(db)
         await db.commit()
+        await follow_counters.defer(deferred)
         return True
 
     @staticmethod
@@ -208,7 +302,10 @@ class ProfileService:
         follow.is_approved = True
         follow.approved_at = func.now()
         
+        deferred = await follow_counters.record(db, follower_id, user_id, 1)
+        ProfileService._forget_relationship_statuses(db)
         await db.commit()
+        await follow_counters.defer(deferred)
         await db.refresh(follow)
         return follow
 
@@ -233,6 +330,7 @@ class ProfileService:
             raise NotFoundError("Follow request not found")
         
         await db.delete(follow)
+        ProfileService._forget_relationship_statuses(db)
         await db.commit()
         return True
 
@@ -240,13 +338,13 @@ class ProfileService:
     async def get_followers(
         user_id: UUID,
         viewer_id: Optional[UUID],
-        skip: int = 0,
+        cursor: Optional[str] = None,
         limit: int = 20,
-        db: AsyncSession
-    ) -> List[UserProfile]:
-        """Get user's followers"""
+        db: AsyncSession = None
+    ) -> Tuple[List[UserProfile], Optional[str]]:
+        """Get user's followers, newest first, with the cursor for the next page"""
         stmt = (
-            select(UserProfile)
+            select(UserProfile, Follow.created_at, Follow.id)
             .join(Follow, Follow.follower_id == UserProfile.user_id)
             .where(
                 and_(
@@ -255,34 +353,28 @@ class ProfileService:
                 )
             )
             .options(selectinload(UserProfile.user))
-            .offset(skip)
-            .limit(limit)
         )
+        stmt = ProfileService._apply_cursor(stmt, Follow.created_at, Follow.id, cursor, limit)
         
         result = await db.execute(stmt)
-        profiles = result.scalars().all()
+        profiles, next_cursor = ProfileService._page(result.all(), limit)
         
-        # Add relationship status for each profile
         if viewer_id:
-            for profile in profiles:
-                if viewer_id != profile.user_id:
-                    profile.relationship_status = await ProfileService._get_relationship_status(
-                        viewer_id, profile.user_id, db
-                    )
+            await ProfileService._attach_relationship_statuses(viewer_id, profiles, db)
         
-        return profiles
+        return profiles, next_cursor
 
     @staticmethod
     async def get_following(
         user_id: UUID,
         viewer_id: Optional[UUID],
-        skip: int = 0,
+        cursor: Optional[str] = None,
         limit: int = 20,
-        db: AsyncSession
-    ) -> List[UserProfile]:
-        """Get users that user is following"""
+        db: AsyncSession = None
+    ) -> Tuple[List[UserProfile], Optional[str]]:
+        """Get users that user is following, newest first, with the cursor for the next page"""
         stmt = (
-            select(UserProfile)
+            select(UserProfile, Follow.created_at, Follow.id)
             .join(Follow, Follow.following_id == UserProfile.user_id)
             .where(
                 and_(
@@ -291,35 +383,29 @@ class ProfileService:
                 )
             )
             .options(selectinload(UserProfile.user))
-            .offset(skip)
-            .limit(limit)
         )
+        stmt = ProfileService._apply_cursor(stmt, Follow.created_at, Follow.id, cursor, limit)
         
         result = await db.execute(stmt)
-        profiles = result.scalars().all()
+        profiles, next_cursor = ProfileService._page(result.all(), limit)
         
-        # Add relationship status for each profile
         if viewer_id:
-            for profile in profiles:
-                if viewer_id != profile.user_id:
-                    profile.relationship_status = await ProfileService._get_relationship_status(
-                        viewer_id, profile.user_id, db
-                    )
+            await ProfileService._attach_relationship_statuses(viewer_id, profiles, db)
         
-        return profiles
+        return profiles, next_cursor
 
     @staticmethod
     async def get_follow_requests(
         user_id: UUID,
-        skip: int = 0,
+        cursor: Optional[str] = None,
         limit: int = 20,
-        db: AsyncSession
-    ) -> List[Follow]:
-        """Get pending follow requests"""
+        db: AsyncSession = None
+    ) -> Tuple[List[Follow], Optional[str]]:
+        """Get pending follow requests, newest first, with the cursor for the next page"""
         stmt = (
-            select(Follow)
+            select(Follow, Follow.created_at, Follow.id)
             .options(
-                selectinload(Follow.follower_profile).selectinload(UserProfile.user)
+                selectinload(Follow.follower).selectinload(UserProfile.user)
             )
             .where(
                 and_(
@@ -327,12 +413,11 @@ class ProfileService:
                     Follow.is_approved == False
                 )
             )
-            .offset(skip)
-            .limit(limit)
         )
+        stmt = ProfileService._apply_cursor(stmt, Follow.created_at, Follow.id, cursor, limit)
         
         result = await db.execute(stmt)
-        return result.scalars().all()
+        return ProfileService._page(result.all(), limit)
 
     @staticmethod
     async def add_interest(
@@ -372,6 +457,7 @@ class ProfileService:
         db.add(user_interest)
         await db.commit()
         await db.refresh(user_interest)
+        await leaderboards.sync_interests(db, user_id, added=[user_interest.interest_id])
         return user_interest
 
     @staticmethod
@@ -395,62 +481,199 @@ class ProfileService:
         
         await db.delete(user_interest)
         await db.commit()
+        await leaderboards.sync_interests(db, user_id, removed=[interest_id])
         return True
 
+    @staticmethod
+    async def add_interests(
+        user_id: UUID,
+        interest_requests: List[InterestRequest],
+        db: AsyncSession
+    ) -> List[InterestResult]:
+        """Add several interests with one lookup and one insert"""
+        # Last request wins for a repeated interest id
+        requests = {request.interest_id: request for request in interest_requests}
+        
+        result = await db.execute(select(Interest.id).where(Interest.id.in_(requests)))
+        known = set(result.scalars().all())
+        
+        added = set()
+        if known:
+            now = datetime.now(timezone.utc)
+            stmt = dialect_insert(db, UserInterest).values([
+                {
+                    "id": uuid4(),
+                    "user_id": user_id,
+                    "interest_id": interest_id,
+                    "proficiency_level": requests[interest_id].proficiency_level,
+                    "is_learning": requests[interest_id].is_learning,
+                    "created_at": now,
+                }
+                for interest_id in requests
+                if interest_id in known
+            ])
+            stmt = stmt.on_conflict_do_nothing(
+                index_elements=["user_id", "interest_id"]
+            ).returning(UserInterest.interest_id)
+            result = await db.execute(stmt)
+            added = set(result.scalars().all())
+            await db.commit()
+            await leaderboards.sync_interests(db, user_id, added=added)
+        
+        return [
+            InterestResult(
+                interest_id=interest_id,
+                status="added" if interest_id in added
+                else "already_added" if interest_id in known
+                else "not_found"
+            )
+            for interest_id in requests
+        ]
+
+    @staticmethod
+    async def remove_interests(
+        user_id: UUID,
+        interest_ids: List[UUID],
+        db: AsyncSession
+    ) -> List[InterestResult]:
+        """Remove several interests with one delete"""
+        interest_ids = list(dict.fromkeys(interest_ids))
+        
+        result = await db.execute(
+            delete(UserInterest)
+            .where(
+                and_(
+                    UserInterest.user_id == user_id,
+                    UserInterest.interest_id.in_(interest_ids)
+                )
+            )
+            .returning(UserInterest.interest_id)
+        )
+        removed = set(result.scalars().all())
+        await db.commit()
+        await leaderboards.sync_interests(db, user_id, removed=removed)
+        
+        return [
+            InterestResult(
+                interest_id=interest_id,
+                status="removed" if interest_id in removed else "not_found"
+            )
+            for interest_id in interest_ids
+        ]
+
     @staticmethod
     async def search_profiles(
         query: str,
         viewer_id: Optional[UUID],
-        skip: int = 0,
+        cursor: Optional[str] = None,
         limit: int = 20,
-        db: AsyncSession
-    ) -> List[UserProfile]:
-        """Search profiles by username or display name"""
-        search_term = f"%{query.lower()}%"
+        db: AsyncSession = None
+    ) -> Tuple[List[UserProfile], Optional[str]]:
+        """Search profiles by username, display name or full name, best matches first"""
+        term = query.strip().lower()
+        
+        rank = ProfileService._search_rank(term, db)
+        seek = None
+        if cursor:
+            cursor_rank, cursor_id = parse_rank_cursor(cursor)
+            seek = tuple_(rank, UserProfile.id) < (cursor_rank, UUID(cursor_id))
+        
+        # One indexed lookup per key; an OR across both tables would force a
+        # sequential scan. Each key contributes its best matches past the
+        # cursor, by the same rank as the final order, so the union always
+        # contains the whole next page.
+        candidates = []
+        for key in (search_username, search_display_name, search_full_name):
+            if len(term) < _TRIGRAM_MIN_LENGTH:
+                # Too short for trigrams; prefix match uses the pattern_ops index
+                match = key.startswith(term, autoescape=True)
+            else:
+                match = key.contains(term, autoescape=True)
+            branch = (
+                select(UserProfile.id)
+                .join(User, User.id == UserProfile.user_id)
+                .where(match if seek is None else and_(match, seek))
+                .order_by(rank.desc(), UserProfile.id.desc())
+                .limit(limit + 1)
+                .subquery()
+            )
+            candidates.append(select(branch.c.id))
         
         stmt = (
-            select(UserProfile)
+            select(UserProfile, rank)
+            .join(User, User.id == UserProfile.user_id)
             .options(selectinload(UserProfile.user))
-            .where(
-                or_(
-                    func.lower(UserProfile.username).contains(search_term),
-                    func.lower(UserProfile.user.display_name).contains(search_term),
-                    func.lower(UserProfile.user.first_name + ' ' + UserProfile.user.last_name).contains(search_term)
-                )
-            )
-            .offset(skip)
-            .limit(limit)
+            .where(UserProfile.id.in_(union(*candidates)))
+            .order_by(rank.desc(), UserProfile.id.desc())
+            .limit(limit + 1)
         )
-        
         result = await db.execute(stmt)
-        profiles = result.scalars().all()
+        rows = result.all()
+        
+        profiles = [profile for profile, _ in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last_profile, last_rank = rows[limit - 1]
+            next_cursor = create_rank_cursor(float(last_rank), str(last_profile.id))
         
-        # Add relationship status for each profile
         if viewer_id:
-            for profile in profiles:
-                if viewer_id != profile.user_id:
-                    profile.relationship_status = await ProfileService._get_relationship_status(
-                        viewer_id, profile.user_id, db
-                    )
+            await ProfileService._attach_relationship_statuses(viewer_id, profiles, db)
         
-        return profiles
+        return profiles, next_cursor
 
     @staticmethod
-    async def get_interests(
-        skip: int = 0,
-        limit: int = 50,
-        category: Optional[str] = None,
-        db: AsyncSession
-    ) -> List[Interest]:
-        """Get all available interests"""
-        stmt = select(Interest)
+    def _search_rank(term: str, db: AsyncSession):
+        """Relevance: prefix matches first, then trigram similarity on Postgres"""
+        prefix_bonus = case(
+            (search_username == term, 3.0),
+            (search_username.startswith(term, autoescape=True), 2.0),
+            (
+                or_(
+                    search_display_name.startswith(term, autoescape=True),
+                    search_full_name.startswith(term, autoescape=True)
+                ),
+                1.0
+            ),
+            else_=0.0
+        )
         
-        if category:
-            stmt = stmt.where(Interest.category == category)
+        if db.get_bind().dialect.name != "postgresql":
+            return prefix_bonus
         
-        stmt = stmt.offset(skip).limit(limit)
-        result = await db.execute(stmt)
-        return result.scalars().all()
+        similarity = func.greatest(
+            func.similarity(search_username, term),
+            func.similarity(search_display_name, term),
+            func.similarity(search_full_name, term)
+        )
+        return prefix_bonus + func.coalesce(similarity, 0.0)
+
+    @staticmethod
+    def _apply_cursor(
+        stmt: Select,
+        created_at,
+        id_column,
+        cursor: Optional[str],
+        limit: int
+    ) -> Select:
+        """Order newest first by (created_at, id) and seek past the cursor
+        
+        Fetches one extra row so _page can tell whether another page exists.
+        """
+        if cursor:
+            timestamp, cursor_id = parse_cursor(cursor)
+            stmt = stmt.where(tuple_(created_at, id_column) < (timestamp, UUID(cursor_id)))
+        
+        return stmt.order_by(created_at.desc(), id_column.desc()).limit(limit + 1)
+
+    @staticmethod
+    def _page(rows: list, limit: int) -> Tuple[list, Optional[str]]:
+        """Split (item, created_at, id) rows into a page and the next cursor"""
+        items = [row[0] for row in rows[:limit]]
+        if len(rows) <= limit:
+            return items, None
+        
+        _, created_at, last_id = rows[limit - 1]
+        return items, create_cursor(created_at, str(last_id))
 
     @staticmethod
     async def _get_relationship_status(
@@ -459,70 +682,206 @@ class ProfileService:
         db: AsyncSession
     ) -> dict:
         """Get relationship status between viewer and target user"""
-        # Check if viewer follows target
-        stmt = select(Follow).where(
-            and_(
-                Follow.follower_id == viewer_id,
-                Follow.following_id == target_id
-            )
+        statuses = await ProfileService._get_relationship_statuses(
+            viewer_id, [target_id], db
         )
-        result = await db.execute(stmt)
-        following_relationship = result.scalar_one_or_none()
+        return statuses[target_id]
+
+    @staticmethod
+    async def _get_relationship_statuses(
+        viewer_id: UUID,
+        target_ids: Iterable[UUID],
+        db: AsyncSession
+    ) -> Dict[UUID, dict]:
+        """Get relationship status between viewer and many target users in one query
+        
+        Statuses are memoized on the session for the rest of the request.
+        """
+        memo = db.info.setdefault(_RELATIONSHIP_MEMO_KEY, {})
+        
+        statuses = {}
+        for target_id in target_ids:
+            if target_id != viewer_id and (viewer_id, target_id) not in memo:
+                statuses[target_id] = {
+                    "is_following": False,
+                    "is_followed_by": False,
+                    "follow_request_pending": False,
+                }
+        
+        if statuses:
+            await ProfileService._load_relationship_statuses(viewer_id, statuses, db)
+            for target_id, status in statuses.items():
+                memo[(viewer_id, target_id)] = status
         
-        # Check if target follows viewer
-        stmt = select(Follow).where(
-            and_(
-                Follow.follower_id == target_id,
-                Follow.following_id == viewer_id
+        return {
+            target_id: memo[(viewer_id, target_id)]
+            for target_id in target_ids
+            if target_id != viewer_id
+        }
+
+    @staticmethod
+    async def _load_relationship_statuses(
+        viewer_id: UUID,
+        statuses: Dict[UUID, dict],
+        db: AsyncSession
+    ) -> None:
+        """Fill statuses from a single scan of follows in both directions"""
+        stmt = select(Follow.follower_id, Follow.following_id, Follow.is_approved).where(
+            or_(
+                and_(
+                    Follow.follower_id == viewer_id,
+                    Follow.following_id.in_(statuses.keys())
+                ),
+                and_(
+                    Follow.following_id == viewer_id,
+                    Follow.follower_id.in_(statuses.keys())
+                )
             )
         )
         result = await db.execute(stmt)
-        follower_relationship = result.scalar_one_or_none()
         
-        return {
-            "is_following": following_relationship.is_approved if following_relationship else False,
-            "is_followed_by": follower_relationship.is_approved if follower_relationship else False,
-            "follow_request_pending": (
-                following_relationship and not following_relationship.is_approved
-            ) if following_relationship else False
-        }
+        for follower_id, following_id, is_approved in result:
+            if follower_id == viewer_id:
+                status = statuses[following_id]
+                status["is_following"] = is_approved
+                status["follow_request_pending"] = not is_approved
+            else:
+                statuses[follower_id]["is_followed_by"] = is_approved
+
+    @staticmethod
+    def _forget_relationship_statuses(db: AsyncSession) -> None:
+        """Drop memoized statuses after a follow changes"""
+        db.info.pop(_RELATIONSHIP_MEMO_KEY, None)
+
+    @staticmethod
+    async def _attach_relationship_statuses(
+        viewer_id: UUID,
+        profiles: List[UserProfile],
+        db: AsyncSession
+    ) -> None:
+        """Set relationship_status on every profile in a page"""
+        statuses = await ProfileService._get_relationship_statuses(
+            viewer_id, [profile.user_id for profile in profiles], db
+        )
+        for profile in profiles:
+            if profile.user_id in statuses:
+                profile.relationship_status = statuses[profile.user_id]
 
     @staticmethod
     async def update_xp_and_level(
         user_id: UUID,
         xp_gained: int,
-        db: AsyncSession
+        db: AsyncSession,
+        reason: str = "manual"
     ) -> UserProfile:
-        """Update user XP and level"""
-        profile = await ProfileService.get_or_create_profile(user_id, db)
-        
-        profile.xp_points += xp_gained
-        
-        # Calculate new level (simple formula: level = sqrt(xp/100))
-        import math
-        new_level = int(math.sqrt(profile.xp_points / 100)) + 1
-        
-        if new_level > profile.level:
-            profile.level = new_level
-            # Could trigger achievement/notification here
+        """Grant XP and recompute level in one atomic UPDATE, with a ledger entry"""
+        profile = await ProfileService.update_profile_values(user_id, xp_values(xp_gained), db)
+        await xp_engine.record(db, user_id, xp_gained, reason)
         
         await db.commit()
-        await db.refresh(profile)
+        await leaderboards.sync_users(db, [user_id])
         return profile
 
+    @staticmethod
+    async def get_leaderboard(
+        user_id: UUID,
+        board: str,
+        offset: int,
+        limit: int,
+        db: AsyncSession,
+        interest_id: Optional[UUID] = None
+    ) -> LeaderboardPage:
+        """Page of a global, interest or friends leaderboard with the caller's rank"""
+        if board == "friends":
+            ranked, me = await leaderboards.friends(db, user_id, offset, limit)
+            entries = await ProfileService._hydrate_ranked([*ranked, me] if me else ranked, db)
+            return LeaderboardPage(
+                entries=[entries[entry] for entry in ranked if entry in entries],
+                me=entries.get(me),
+            )
+        
+        key = leaderboards.interest_key(interest_id) if board == "interest" else leaderboards.global_key()
+        page = await ProfileService._leaderboard_page(key, offset, limit)
+        me = await leaderboards.rank(key, user_id)
+        if me is None:
+            return LeaderboardPage(entries=page)
+        
+        # The caller's profile is usually on the page already
+        mine = next((entry for entry in page if entry.user_id == user_id), None)
+        if mine is not None:
+            mine = mine.model_copy(update={"rank": me[2] + 1, "xp_points": me[1]})
+        else:
+            mine = (await ProfileService._hydrate_ranked([me], db)).get(me)
+        return LeaderboardPage(entries=page, me=mine)
+
+    @staticmethod
+    async def _leaderboard_page(key: str, offset: int, limit: int) -> List[LeaderboardEntry]:
+        """Shared hydrated page of a global or interest board, cached briefly in Redis"""
+        async def compute() -> list:
+            # May run after the request ends, so it can't use the request session
+            async with get_db_session() as session:
+                ranked = await leaderboards.page(key, offset, limit)
+                entries = await ProfileService._hydrate_ranked(ranked, session)
+            return [entries[entry].model_dump(mode="json") for entry in ranked if entry in entries]
+        
+        try:
+            cache = RedisCache(get_redis_binary())
+        except RuntimeError:
+            entries = await compute()
+        else:
+            settings = get_settings()
+            entries = await cache.get_or_compute(
+                f"cache:{key}:{offset}:{limit}",
+                compute,
+                ttl=settings.leaderboard_page_ttl,
+                stale_ttl=settings.leaderboard_page_stale_ttl,
+            )
+        return [LeaderboardEntry(**entry) for entry in entries]
+
+    @staticmethod
+    async def _hydrate_ranked(
+        ranked: List[Tuple[UUID, int, int]],
+        db: AsyncSession
+    ) -> Dict[Tuple[UUID, int, int], LeaderboardEntry]:
+        """Leaderboard entries for ranked users with one query; users without a profile are left out"""
+        if not ranked:
+            return {}
+        result = await db.execute(
+            select(
+                UserProfile.user_id,
+                UserProfile.username,
+                UserProfile.avatar_url,
+                UserProfile.level,
+                User.display_name,
+            )
+            .join(User, User.id == UserProfile.user_id)
+            .where(UserProfile.user_id.in_({entry[0] for entry in ranked}))
+        )
+        profiles = {row.user_id: row for row in result}
+        
+        return {
+            (member, xp_points, rank): LeaderboardEntry(
+                rank=rank + 1,
+                user_id=member,
+                username=profiles[member].username,
+                display_name=profiles[member].display_name,
+                avatar_url=profiles[member].avatar_url,
+                level=profiles[member].level,
+                xp_points=xp_points,
+            )
+            for member, xp_points, rank in ranked
+            if member in profiles
+        }
+
     @staticmethod
     async def update_streak(
         user_id: UUID,
         db: AsyncSession
     ) -> UserProfile:
-        """Update user's learning streak"""
-        profile = await ProfileService.get_or_create_profile(user_id, db)
-        
-        # Simple streak logic - in production, this would be more sophisticated
-        # checking actual learning activity dates
-        profile.streak_days += 1
-        profile.last_activity = func.now()
+        """Record a day of learning activity (UTC calendar days)"""
+        profile = await ProfileService.update_profile_values(
+            user_id, streak_values(datetime.now(timezone.utc)), db
+        )
         
         await db.commit()
-        await db.refresh(profile)
         return profile
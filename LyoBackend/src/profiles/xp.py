@@ -0,0 +1,294 @@
+# XP and Streak Engine
+import asyncio
+import random
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import Integer, bindparam, case, cast, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..auth.models import User
+from ..core.config import get_settings
+from ..core.database import dialect_insert, get_db_session
+from ..core.logging import get_structured_logger
+from ..core.redis import get_redis
+from .leaderboards import leaderboards
+from .models import UserProfile, XPEvent
+
+logger = get_structured_logger(__name__)
+
+_profiles = UserProfile.__table__
+
+# Grant reasons: snake_case identifiers, safe inside the "user|reason|kind" buffer fields
+REASON_PATTERN = r"^[a-z0-9_]+$"
+_REASON = re.compile(REASON_PATTERN)
+
+
+def level_for_xp(xp):
+    """Level for an XP total: floor(sqrt(xp / 100)) + 1, as a SQL expression"""
+    return cast(func.floor(func.sqrt(xp / 100.0)), Integer) + 1
+
+
+def xp_values(amount, columns=UserProfile) -> Dict[str, Any]:
+    """
+    SET clause adding `amount` XP and recomputing the level in the same
+    statement. Levels never go down.
+    """
+    xp = columns.xp_points + amount
+    level = level_for_xp(xp)
+    return {
+        "xp_points": xp,
+        "level": case((level > columns.level, level), else_=columns.level),
+    }
+
+
+def streak_values(now: datetime) -> Dict[str, Any]:
+    """
+    SET clause for one day of activity, by UTC calendar day: a second
+    activity on the same day keeps the streak, activity the day after
+    extends it, and a longer gap restarts it at 1.
+    """
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    yesterday = today - timedelta(days=1)
+    return {
+        "streak_days": case(
+            (UserProfile.streak_updated >= today, UserProfile.streak_days),
+            (UserProfile.streak_updated >= yesterday, UserProfile.streak_days + 1),
+            else_=1,
+        ),
+        "streak_updated": now,
+    }
+
+
+class XPEngine:
+    """Append XP grants to the xp_events ledger, with a write-behind path.
+
+    Profile XP itself is updated atomically by the caller (see `xp_values`);
+    `record` adds the ledger row in the same transaction. High-frequency
+    small grants go through `grant_buffered` instead: they are summed in
+    sharded Redis hashes and a background task applies each user's total
+    and one ledger row per (user, reason) in batches.
+    """
+
+    key_prefix = "xp:pending:"
+
+    def __init__(self, shards: int = 8, flush_interval_ms: int = 1000):
+        self.shards = shards
+        self.flush_interval = flush_interval_ms / 1000
+        self._task: Optional[asyncio.Task] = None
+        self._stopping: Optional[asyncio.Event] = None
+
+        # Metrics
+        self.buffered = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.discarded = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def record(self, db: AsyncSession, user_id: UUID, amount: int, reason: str) -> None:
+        """Append a ledger row inside the caller's transaction"""
+        db.add(XPEvent(user_id=user_id, amount=amount, reason=reason))
+
+    async def grant_buffered(self, user_id: UUID, amount: int, reason: str) -> bool:
+        """
+        Queue a grant for the next flush.
+
+        Returns False if Redis is unavailable or the reason can't be
+        buffered; the caller should grant directly instead.
+        """
+        if not _REASON.match(reason):
+            return False
+
+        try:
+            shard = f"{self.key_prefix}{random.randrange(self.shards)}"
+            pipe = get_redis().pipeline(transaction=False)
+            pipe.hincrby(shard, f"{user_id}|{reason}|xp", amount)
+            pipe.hincrby(shard, f"{user_id}|{reason}|n", 1)
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to buffer XP grant for {user_id}: {e}")
+            return False
+
+        self.buffered += 1
+        return True
+
+    async def start(self) -> None:
+        """Start background flusher"""
+        if self.running:
+            return
+
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+        logger.info("XP flusher started")
+
+    async def stop(self) -> None:
+        """Stop background flusher after a final flush"""
+        if not self.running:
+            return
+
+        self._stopping.set()
+        await self._task
+        self._task = None
+
+        logger.info("XP flusher stopped")
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"XP flush failed: {e}")
+
+    async def flush(self) -> int:
+        """Apply buffered grants from every shard; returns number of users updated"""
+        try:
+            redis_client = get_redis()
+        except RuntimeError:
+            return 0
+
+        # (user_id, reason) -> [xp, grants]
+        totals: Dict[Tuple[UUID, str], list] = defaultdict(lambda: [0, 0])
+        for shard in range(self.shards):
+            key = f"{self.key_prefix}{shard}"
+            try:
+                # Read and clear atomically so concurrent flushers never double count
+                pipe = redis_client.pipeline(transaction=True)
+                pipe.hgetall(key)
+                pipe.delete(key)
+                fields, _ = await pipe.execute()
+            except Exception as e:
+                logger.error(f"Failed to read XP shard {key}: {e}")
+                continue
+
+            for field, value in fields.items():
+                parsed = self._parse_field(field)
+                if parsed is None:
+                    # Requeueing it would fail every later flush too
+                    logger.warning(f"Discarding malformed XP buffer field {field!r}")
+                    self.discarded += 1
+                    continue
+                user_id, reason, kind = parsed
+                totals[(user_id, reason)][0 if kind == "xp" else 1] += int(value)
+
+        if not totals:
+            return 0
+
+        try:
+            async with get_db_session() as session:
+                totals = await self._prepare_profiles(session, totals)
+                per_user: Dict[UUID, int] = defaultdict(int)
+                for (user_id, _), (amount, _) in totals.items():
+                    per_user[user_id] += amount
+                if not per_user:
+                    return 0
+
+                await session.execute(
+                    update(_profiles)
+                    .where(_profiles.c.user_id == bindparam("b_user_id"))
+                    .values(xp_values(bindparam("b_amount", type_=Integer), _profiles.c)),
+                    [
+                        {"b_user_id": user_id, "b_amount": amount}
+                        for user_id, amount in per_user.items()
+                    ],
+                )
+                await session.execute(
+                    insert(XPEvent),
+                    [
+                        {"user_id": user_id, "amount": amount, "reason": reason, "grants": grants}
+                        for (user_id, reason), (amount, grants) in totals.items()
+                    ],
+                )
+        except Exception as e:
+            logger.error(f"Failed to flush XP for {len(totals)} buffered totals: {e}")
+            await self._requeue(totals)
+            return 0
+
+        try:
+            async with get_db_session() as session:
+                await leaderboards.sync_users(session, list(per_user))
+        except Exception as e:
+            # XP is committed; the next rebuild picks up the scores
+            logger.error(f"Failed to sync leaderboards for {len(per_user)} users: {e}")
+
+        self.flushed += len(per_user)
+        self.flushes += 1
+        return len(per_user)
+
+    @staticmethod
+    def _parse_field(field: str) -> Optional[Tuple[UUID, str, str]]:
+        """(user_id, reason, kind) from a buffer field, or None if malformed"""
+        parts = field.split("|")
+        if len(parts) != 3 or parts[2] not in ("xp", "n") or not _REASON.match(parts[1]):
+            return None
+        try:
+            return UUID(parts[0]), parts[1], parts[2]
+        except ValueError:
+            return None
+
+    async def _prepare_profiles(
+        self, session: AsyncSession, totals: Dict[Tuple[UUID, str], list]
+    ) -> Dict[Tuple[UUID, str], list]:
+        """
+        Create default profiles for users who have none yet, so the batched
+        UPDATE can't silently miss them, and drop totals for users that no
+        longer exist.
+        """
+        user_ids = {user_id for user_id, _ in totals}
+        result = await session.execute(
+            select(User.id, UserProfile.id)
+            .outerjoin(UserProfile, UserProfile.user_id == User.id)
+            .where(User.id.in_(user_ids))
+        )
+        rows = result.all()
+        known = {user_id for user_id, _ in rows}
+        missing = [user_id for user_id, profile_id in rows if profile_id is None]
+
+        if missing:
+            await session.execute(
+                dialect_insert(session, UserProfile)
+                .values([{"user_id": user_id, "difficulty_preference": "intermediate"} for user_id in missing])
+                .on_conflict_do_nothing(index_elements=["user_id"])
+            )
+        if len(known) < len(user_ids):
+            logger.warning(f"Discarding buffered XP for {len(user_ids) - len(known)} unknown users")
+            self.discarded += len(user_ids) - len(known)
+        return {key: value for key, value in totals.items() if key[0] in known}
+
+    async def _requeue(self, totals: Dict[Tuple[UUID, str], list]) -> None:
+        try:
+            pipe = get_redis().pipeline(transaction=False)
+            shard = f"{self.key_prefix}{random.randrange(self.shards)}"
+            for (user_id, reason), (amount, grants) in totals.items():
+                pipe.hincrby(shard, f"{user_id}|{reason}|xp", amount)
+                pipe.hincrby(shard, f"{user_id}|{reason}|n", grants)
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Dropped {len(totals)} buffered XP totals: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Get XP engine metrics"""
+        return {
+            "running": self.running,
+            "buffered": self.buffered,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "discarded": self.discarded,
+        }
+
+
+# Global XP engine instance
+settings = get_settings()
+xp_engine = XPEngine(
+    shards=settings.xp_buffer_shards,
+    flush_interval_ms=settings.xp_flush_ms,
+)
@@ -1,6 +1,7 @@
 # Test Configuration
 import asyncio
 import os
+import fakeredis
 import pytest
 import pytest_asyncio
 from httpx import AsyncClient
@@ -8,6 +9,8 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sess
 from sqlalchemy import event
 from sqlalchemy.pool import StaticPool
 
+from src.core import database
+from src.core import redis as core_redis
 from src.core.database import Base, get_db
 from src.main import app
 
@@ -57,6 +60,28 @@ async def db_session(setup_database):
         yield session
 
 
+@pytest.fixture
+def background_sessions(setup_database, monkeypatch):
+    """Route get_db_session() (used by background workers) to the test database"""
+    monkeypatch.setattr(database, "async_session_maker", test_session_factory)
+    return test_session_factory
+
+
+@pytest_asyncio.fixture
+async def fake_redis(monkeypatch):
+    """In-process Redis behind get_redis() and get_redis_binary()"""
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    binary_client = fakeredis.FakeAsyncRedis(server=server)
+    monkeypatch.setattr(core_redis, "_redis_client", client)
+    monkeypatch.setattr(core_redis, "_redis_binary_client", binary_client)
+    
+    yield client
+    
+    await client.aclose()
+    await binary_client.aclose()
+
+
 @pytest_asyncio.fixture
 async def client(setup_database):
     """Get test client"""
@@ -1,10 +1,29 @@
 # Authentication Tests
+import asyncio
+import threading
+import time
+from datetime import timedelta
+from uuid import uuid4
+
 import pytest
+from fastapi import HTTPException
 from httpx import AsyncClient
+from sqlalchemy import event, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import Request
 
-from src.auth.models import User
+import src.auth.router as auth_router
+from src.auth import audit
+from src.auth import service as auth_service_module
+from src.auth.audit import LoginAttemptSink
+from src.auth.hashing import PasswordHasher, pwd_context
+from src.auth.models import LoginAttempt, RefreshToken, User
+from src.auth.principal import principal_cache
+from src.auth.schemas import LoginRequest, PasswordChange, UserUpdate
 from src.auth.service import auth_service
+from src.core import redis as core_redis
+from src.core.exceptions import ServiceUnavailableError
+from src.core.utils import utc_now
 
 
 class TestAuth:
@@ -122,3 +141,268 @@ class TestAuth:
         headers = {"Authorization": "Bearer invalid-token"}
         response = await client.get("/v1/auth/me", headers=headers)
         assert response.status_code == 401
+    
+    def test_verify_token_cache(self):
+        """Test repeated token verification is served from the token cache"""
+        token = auth_service.create_access_token(str(uuid4()), "student")
+        before = auth_service.token_cache.stats()
+        
+        first = auth_service.verify_token(token)
+        second = auth_service.verify_token(token)
+        
+        after = auth_service.token_cache.stats()
+        assert first == second
+        assert after["misses"] - before["misses"] == 1
+        assert after["hits"] - before["hits"] == 1
+
+
+@pytest.mark.asyncio
+class TestFailedAttempts:
+    """Test recent failed login counting"""
+    
+    async def test_counts_from_redis_buckets(self, db_session: AsyncSession, fake_redis):
+        """Test failures are counted per time bucket and expire after the tracking window"""
+        settings = auth_service.settings
+        for _ in range(3):
+            await auth_service.log_login_attempt(db_session, "Ana@Example.com", False)
+        await auth_service.log_login_attempt(db_session, "ana@example.com", True)
+        
+        assert await auth_service.get_recent_failed_attempts(db_session, "ana@example.com") == 3
+        keys = await fake_redis.keys("auth:failed:ana@example.com:*")
+        assert len(keys) == 1
+        assert await fake_redis.get(keys[0]) == "3"
+        window = settings.failed_login_tracking_hours * 3600 + settings.failed_login_bucket_seconds
+        assert window - 5 < await fake_redis.ttl(keys[0]) <= window
+        
+        # A bucket from two hours ago only counts for wider windows
+        old_bucket = int((utc_now() - timedelta(hours=2)).timestamp()) // settings.failed_login_bucket_seconds
+        await fake_redis.set(auth_service._failed_attempts_key("ana@example.com", old_bucket), 4)
+        assert await auth_service.get_recent_failed_attempts(db_session, "ana@example.com", hours=1) == 3
+        assert await auth_service.get_recent_failed_attempts(db_session, "ana@example.com", hours=3) == 7
+        assert await auth_service.get_recent_failed_attempts(db_session, "bob@example.com") == 0
+    
+    async def test_sql_fallback(self, db_session: AsyncSession, monkeypatch):
+        """Test counts come from the attempt log without Redis or beyond the tracking window"""
+        now = utc_now()
+        db_session.add_all([
+            LoginAttempt(email="ana@example.com", success=False, created_at=now - timedelta(minutes=10)),
+            LoginAttempt(email="ana@example.com", success=False, created_at=now - timedelta(hours=30)),
+            LoginAttempt(email="ana@example.com", success=True, created_at=now - timedelta(minutes=5)),
+            LoginAttempt(email="bob@example.com", success=False, created_at=now - timedelta(minutes=5)),
+        ])
+        await db_session.commit()
+        
+        monkeypatch.setattr(core_redis, "_redis_client", None)
+        # Recording without Redis is a no-op rather than an error
+        await auth_service.record_failed_attempt("ana@example.com")
+        assert await auth_service.get_recent_failed_attempts(db_session, "ana@example.com") == 1
+        
+        hours = auth_service.settings.failed_login_tracking_hours + 24
+        assert await auth_service.get_recent_failed_attempts(db_session, "ana@example.com", hours=hours) == 2
+
+
+@pytest.mark.asyncio
+class TestPrincipalCache:
+    """Test principal caching and invalidation on user writes"""
+    
+    async def _user(self, db: AsyncSession) -> User:
+        user = User(
+            email=f"{uuid4().hex}@example.com",
+            hashed_password=pwd_context.hash("old-password"),
+            role="student",
+        )
+        db.add(user)
+        await db.commit()
+        return user
+    
+    async def _cached(self, user_id) -> bool:
+        return await principal_cache.cache.get(str(user_id)) is not None
+    
+    async def test_principal_is_loaded_once(self, db_session: AsyncSession, fake_redis):
+        """Test repeated lookups are served from cache without touching the session"""
+        user = await self._user(db_session)
+        queries = []
+        
+        def on_execute(state):
+            queries.append(state.statement)
+        
+        event.listen(db_session.sync_session, "do_orm_execute", on_execute)
+        try:
+            first = await principal_cache.get(user.id, db_session)
+            second = await principal_cache.get(user.id, db_session)
+        finally:
+            event.remove(db_session.sync_session, "do_orm_execute", on_execute)
+        
+        assert first == second
+        assert (first.id, first.role, first.is_active) == (user.id, "student", True)
+        assert len(queries) == 1
+        assert await principal_cache.get(uuid4(), db_session) is None
+    
+    async def test_profile_update_invalidates(self, db_session: AsyncSession, fake_redis):
+        """Test PUT /me drops the cached principal"""
+        user = await self._user(db_session)
+        await principal_cache.get(user.id, db_session)
+        assert await self._cached(user.id)
+        
+        await auth_router.update_current_user(UserUpdate(bio="Learning Swift"), db_session, user)
+        assert not await self._cached(user.id)
+    
+    async def test_password_change_invalidates(self, db_session: AsyncSession, fake_redis):
+        """Test a password change drops the cached principal"""
+        user = await self._user(db_session)
+        await principal_cache.get(user.id, db_session)
+        
+        await auth_router.change_password(
+            PasswordChange(current_password="old-password", new_password="new-password"),
+            db_session, user,
+        )
+        assert not await self._cached(user.id)
+        assert pwd_context.verify("new-password", user.hashed_password)
+    
+    async def test_deactivation_invalidates(self, db_session: AsyncSession, fake_redis):
+        """Test deactivating an account is seen by the next lookup and revokes refresh tokens"""
+        user = await self._user(db_session)
+        db_session.add(RefreshToken(token_hash=uuid4().hex, user_id=user.id, expires_at=utc_now() + timedelta(days=1)))
+        await db_session.commit()
+        assert (await principal_cache.get(user.id, db_session)).is_active
+        
+        await auth_router.deactivate_current_user(db_session, user)
+        
+        assert not await self._cached(user.id)
+        principal = await principal_cache.get(user.id, db_session)
+        assert not principal.is_active
+        token = await db_session.scalar(select(RefreshToken).where(RefreshToken.user_id == user.id))
+        await db_session.refresh(token)
+        assert token.is_blacklisted
+
+
+@pytest.mark.asyncio
+class TestPasswordHasher:
+    """Test the bounded password hashing pool"""
+    
+    async def test_metrics_count_outcomes(self):
+        """Test completed counts only successful jobs; failures and cancellations are separate"""
+        hasher = PasswordHasher(workers=1, max_queue=4)
+        try:
+            hashed = await hasher.hash("correct horse")
+            assert await hasher.verify("correct horse", hashed)
+            with pytest.raises(ValueError):
+                await hasher.verify("correct horse", "not-a-bcrypt-hash")
+            
+            job = asyncio.create_task(hasher._run(time.sleep, 0.2))
+            await asyncio.sleep(0.05)
+            job.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await job
+            
+            stats = hasher.stats()
+            assert (stats["completed"], stats["failed"], stats["cancelled"]) == (2, 1, 1)
+            assert stats["in_flight"] == 0
+            assert stats["latency_p99_ms"] > 0
+        finally:
+            hasher.shutdown()
+    
+    async def test_saturated_pool_returns_503(self, db_session: AsyncSession, fake_redis, monkeypatch):
+        """Test jobs beyond workers + queue are rejected and login answers 503 with Retry-After"""
+        hasher = PasswordHasher(workers=1, max_queue=1)
+        monkeypatch.setattr(auth_service_module, "password_hasher", hasher)
+        release = threading.Event()
+        blocked = [asyncio.create_task(hasher._run(release.wait, 5)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        
+        try:
+            assert hasher.queue_depth == 1
+            with pytest.raises(ServiceUnavailableError):
+                await hasher.hash("password")
+            
+            user = User(email="busy@example.com", hashed_password=pwd_context.hash("password"), role="student")
+            db_session.add(user)
+            await db_session.commit()
+            request = Request({"type": "http", "headers": [], "client": ("10.0.0.1", 1234)})
+            with pytest.raises(HTTPException) as error:
+                await auth_router.login(
+                    LoginRequest(email="busy@example.com", password="password"), request, db_session
+                )
+            assert error.value.status_code == 503
+            assert error.value.headers["Retry-After"] == "1"
+            assert hasher.stats()["rejected"] == 2
+        finally:
+            release.set()
+            await asyncio.gather(*blocked)
+            hasher.shutdown()
+        assert hasher.stats()["completed"] == 2
+
+
+@pytest.mark.asyncio
+class TestLoginAttemptSink:
+    """Test buffered login attempt auditing"""
+    
+    def _attempt(self, i: int) -> dict:
+        return {
+            "email": f"user{i}@example.com",
+            "ip_address": "10.0.0.1",
+            "user_agent": None,
+            "success": i % 2 == 0,
+            "failure_reason": None,
+            "created_at": utc_now(),
+        }
+    
+    async def _count(self, db: AsyncSession) -> int:
+        return await db.scalar(select(func.count()).select_from(LoginAttempt))
+    
+    async def test_flushes_by_size_and_time(self, db_session: AsyncSession, background_sessions):
+        """Test rows are bulk inserted per full batch, then after the flush interval"""
+        sink = LoginAttemptSink(batch_size=3, flush_interval_ms=100)
+        assert not sink.submit(self._attempt(0))
+        await sink.start()
+        try:
+            assert all(sink.submit(self._attempt(i)) for i in range(7))
+            await asyncio.sleep(0.05)
+            assert (sink.written, sink.flushes) == (6, 2)
+            
+            await asyncio.sleep(0.25)
+            assert (sink.written, sink.flushes) == (7, 3)
+            assert await self._count(db_session) == 7
+        finally:
+            await sink.stop()
+    
+    async def test_stop_writes_buffered_rows(self, db_session: AsyncSession, background_sessions):
+        """Test stopping drains the buffer instead of losing it"""
+        sink = LoginAttemptSink(batch_size=100, flush_interval_ms=10_000)
+        await sink.start()
+        for i in range(5):
+            sink.submit(self._attempt(i))
+        await sink.stop()
+        
+        assert not sink.running
+        assert sink.written == 5
+        assert await self._count(db_session) == 5
+        assert not sink.submit(self._attempt(5))
+    
+    async def test_full_or_stopped_sink_falls_back_to_session(
+        self, db_session: AsyncSession, background_sessions, fake_redis, monkeypatch
+    ):
+        """Test attempts the sink can't take are added to the caller's session and committed with it"""
+        sink = LoginAttemptSink(batch_size=100, flush_interval_ms=10_000, max_buffer=1)
+        monkeypatch.setattr(audit, "login_attempt_sink", sink)
+        monkeypatch.setattr(auth_service_module, "login_attempt_sink", sink)
+        
+        assert not await auth_service.log_login_attempt(db_session, "ana@example.com", True)
+        assert len(db_session.new) == 1
+        await db_session.commit()
+        
+        await sink.start()
+        try:
+            assert await auth_service.log_login_attempt(db_session, "ana@example.com", True)
+            assert not await auth_service.log_login_attempt(db_session, "ana@example.com", True)
+            assert len(db_session.new) == 1
+            await db_session.commit()
+        finally:
+            await sink.stop()
+        
+        # A failed login commits its unbuffered attempt itself
+        with pytest.raises(auth_service_module.AuthenticationError):
+            await auth_service.authenticate_user(
+                db_session, LoginRequest(email="nobody@example.com", password="password")
+            )
+        assert await self._count(db_session) == 4
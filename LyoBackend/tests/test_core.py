@@ -0,0 +1,473 @@
+# Core Utility Tests
+import asyncio
+import json
+import time
+from datetime import date, datetime, timezone
+from uuid import uuid4
+
+import fakeredis
+import pytest
+import pytest_asyncio
+from redis.exceptions import ResponseError
+
+from src.core import codecs
+from src.core import rate_limit
+from src.core import redis as core_redis
+from src.core.codecs import Codec, Compression, Serializer, is_available
+from src.core.rate_limit import LocalRateLimiter, RateLimitAlgorithm, RateLimitEngine
+from src.core.redis import RedisCache, TieredCache, WebSocketManager, get_redis, get_redis_binary
+
+
+class Counter:
+    """Compute function that counts its calls"""
+
+    def __init__(self, value="fresh", delay: float = 0.0):
+        self.value = value
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.value
+
+
+async def drain_refreshes():
+    """Wait for background refreshes started by get_or_compute"""
+    while core_redis._background_refreshes:
+        await asyncio.gather(*core_redis._background_refreshes)
+
+
+@pytest.mark.asyncio
+class TestGetOrCompute:
+    """Test stampede protection in RedisCache.get_or_compute"""
+
+    async def test_miss_computes_once_then_serves_cache(self, fake_redis):
+        """Test concurrent misses share a single compute and later reads hit the cache"""
+        cache = RedisCache(get_redis_binary())
+        compute = Counter(value={"top": [1, 2, 3]}, delay=0.1)
+        
+        results = await asyncio.gather(*(
+            cache.get_or_compute("hot", compute, ttl=60) for _ in range(5)
+        ))
+        assert results == [{"top": [1, 2, 3]}] * 5
+        assert compute.calls == 1
+        
+        assert await cache.get_or_compute("hot", compute, ttl=60, beta=0) == {"top": [1, 2, 3]}
+        assert compute.calls == 1
+        assert await fake_redis.exists("lock:hot") == 0
+        assert 55 < await fake_redis.ttl("hot") <= 60
+
+    async def test_early_refresh_serves_current_value(self, fake_redis, monkeypatch):
+        """Test an XFetch early refresh returns the cached value and recomputes in background"""
+        cache = RedisCache(get_redis_binary())
+        await cache.get_or_compute("hot", Counter("old"), ttl=60)
+        
+        # random() close to 1 makes every read an early refresh
+        monkeypatch.setattr(core_redis.random, "random", lambda: 1 - 1e-12)
+        before = dict(RedisCache.compute_stats)
+        compute = Counter("new")
+        assert await cache.get_or_compute("hot", compute, ttl=60, beta=1e6) == "old"
+        await drain_refreshes()
+        
+        assert compute.calls == 1
+        assert RedisCache.compute_stats["early_refreshes"] == before["early_refreshes"] + 1
+        monkeypatch.undo()
+        assert await cache.get_or_compute("hot", compute, ttl=60, beta=0) == "new"
+
+    async def test_expired_value_served_while_refreshing(self, fake_redis):
+        """Test stale_ttl keeps serving an expired value while one worker refreshes it"""
+        cache = RedisCache(get_redis_binary())
+        await cache.set("hot", {"v": "old", "d": 0.01, "e": time.time() - 1}, 30)
+        
+        before = dict(RedisCache.compute_stats)
+        compute = Counter("new", delay=0.05)
+        results = await asyncio.gather(*(
+            cache.get_or_compute("hot", compute, ttl=60, stale_ttl=30) for _ in range(3)
+        ))
+        assert results == ["old"] * 3
+        await drain_refreshes()
+        
+        assert compute.calls == 1
+        assert RedisCache.compute_stats["stale_served"] == before["stale_served"] + 3
+        assert await cache.get_or_compute("hot", compute, ttl=60, beta=0) == "new"
+        assert 60 < await fake_redis.ttl("hot") <= 90
+
+    async def test_wait_timeout_computes_without_caching(self, fake_redis):
+        """Test a miss gives up waiting on a stuck lock holder and computes uncached"""
+        cache = RedisCache(get_redis_binary())
+        await fake_redis.set("lock:hot", "someone-else", px=10_000)
+        
+        compute = Counter("fallback")
+        started = time.monotonic()
+        assert await cache.get_or_compute("hot", compute, ttl=60, wait_timeout=0.2) == "fallback"
+        assert time.monotonic() - started >= 0.2
+        assert compute.calls == 1
+        assert await fake_redis.exists("hot") == 0
+        # The other worker's lock is left alone
+        assert await fake_redis.get("lock:hot") == "someone-else"
+
+    async def test_waiter_picks_up_lock_holders_result(self, fake_redis):
+        """Test a miss waiting on the lock returns the value the holder stores"""
+        cache = RedisCache(get_redis_binary())
+        await fake_redis.set("lock:hot", "someone-else", px=10_000)
+        
+        async def finish_elsewhere():
+            await asyncio.sleep(0.1)
+            await cache.set("hot", {"v": "theirs", "d": 0.1, "e": time.time() + 60}, 60)
+        
+        compute = Counter("mine")
+        result, _ = await asyncio.gather(
+            cache.get_or_compute("hot", compute, ttl=60, wait_timeout=2),
+            finish_elsewhere(),
+        )
+        assert result == "theirs"
+        assert compute.calls == 0
+
+    async def test_plain_values_are_misses(self, fake_redis):
+        """Test a value written by set() under the key is recomputed instead of raising"""
+        cache = RedisCache(get_redis_binary())
+        for value in ("plain", {"v": "missing fields"}, [1, 2]):
+            await cache.set("hot", value, 60)
+            compute = Counter("fresh")
+            assert await cache.get_or_compute("hot", compute, ttl=60, beta=0) == "fresh"
+            assert compute.calls == 1
+
+
+@pytest.mark.asyncio
+class TestTieredCache:
+    """Test coalesced loads in the two-tier cache"""
+
+    async def test_concurrent_misses_share_one_load(self, fake_redis):
+        """Test callers missing together wait for a single load and see its errors"""
+        cache = TieredCache(namespace="test-coalesce")
+        compute = Counter(value={"role": "student"}, delay=0.05)
+        
+        results = await asyncio.gather(*(cache.get_or_load("k", compute) for _ in range(4)))
+        assert results == [{"role": "student"}] * 4
+        assert (compute.calls, cache.loads, cache.coalesced) == (1, 1, 3)
+        
+        async def failing():
+            await asyncio.sleep(0.05)
+            raise ValueError("db down")
+        
+        results = await asyncio.gather(
+            *(cache.get_or_load("other", failing) for _ in range(2)), return_exceptions=True
+        )
+        assert [type(result) for result in results] == [ValueError, ValueError]
+
+    async def test_cancelled_loader_does_not_cancel_waiters(self, fake_redis):
+        """Test waiters retry with their own loader when the loading request is cancelled"""
+        cache = TieredCache(namespace="test-cancel")
+        started = asyncio.Event()
+        
+        async def first_request_load():
+            started.set()
+            await asyncio.sleep(10)
+        
+        second_request_load = Counter(value={"role": "admin"})
+        owner = asyncio.create_task(cache.get_or_load("k", first_request_load))
+        await started.wait()
+        waiter = asyncio.create_task(cache.get_or_load("k", second_request_load))
+        await asyncio.sleep(0.01)
+        assert cache.coalesced == 1
+        
+        owner.cancel()
+        assert await waiter == {"role": "admin"}
+        assert owner.cancelled()
+        assert second_request_load.calls == 1
+        assert await cache.get("k") == {"role": "admin"}
+        
+        # A cancelled waiter stays cancelled without disturbing the load
+        slow = Counter(value="v", delay=0.05)
+        owner = asyncio.create_task(cache.get_or_load("slow", slow))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(cache.get_or_load("slow", Counter()))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert await owner == "v"
+        assert cache.coalesced == 2
+
+    async def test_invalidation_during_load_is_not_undone(self, fake_redis):
+        """Test a load that read the old row before an invalidation doesn't cache it"""
+        cache = TieredCache(namespace="test-invalidate")
+        stale = Counter(value={"is_active": True}, delay=0.05)
+        
+        load = asyncio.create_task(cache.get_or_load("k", stale))
+        await asyncio.sleep(0.01)
+        await cache.invalidate("k")
+        # The in-flight caller still gets its answer
+        assert await load == {"is_active": True}
+        assert await cache.get("k") is None
+        
+        fresh = Counter(value={"is_active": False})
+        assert await cache.get_or_load("k", fresh) == {"is_active": False}
+        assert fresh.calls == 1
+        
+        # Invalidations broadcast by other workers count too
+        cache.local.clear()
+        await fake_redis.flushall()
+        load = asyncio.create_task(cache.get_or_load("k", stale))
+        await asyncio.sleep(0.01)
+        cache.drop_local("k")
+        await load
+        assert await cache.get_or_load("k", fresh) == {"is_active": False}
+        assert fresh.calls == 2
+
+
+class TestCodec:
+    """Test versioned cache payload codecs"""
+
+    def test_header_byte_layout(self):
+        """Test the header records marker, version, serializer and compression"""
+        payload = Codec(Serializer.MSGPACK).encode({"a": 1})
+        assert payload[0] == 0b1_01_010_00
+        
+        payload = Codec(Serializer.ORJSON).encode({"a": 1})
+        assert payload[0] == 0b1_01_001_00
+        assert json.loads(payload[1:]) == {"a": 1}
+
+    def test_plain_json_stays_legacy_readable(self):
+        """Test uncompressed stdlib JSON is written bare and legacy payloads decode"""
+        codec = Codec(Serializer.MSGPACK)
+        assert Codec(Serializer.JSON).encode({"a": [1, 2]}) == b'{"a": [1, 2]}'
+        assert codec.decode(b'{"a": [1, 2]}') == {"a": [1, 2]}
+        assert codec.decode('{"a": [1, 2]}') == {"a": [1, 2]}
+        assert codec.decode(b"[]") == []
+
+    def test_decode_follows_payload_header(self):
+        """Test any codec reads payloads written by any other"""
+        value = {"name": "ana", "scores": [1, 2, 3]}
+        writers = [Codec(serializer) for serializer in Serializer]
+        for writer in writers:
+            for reader in writers:
+                assert reader.decode(writer.encode(value)) == value
+
+    def test_unknown_format_version_is_rejected(self):
+        """Test payloads from a newer format version are not misread"""
+        payload = bytearray(Codec(Serializer.MSGPACK).encode(1))
+        payload[0] = (payload[0] & 0b1_00_111_11) | (2 << 5)
+        with pytest.raises(ValueError):
+            Codec().decode(bytes(payload))
+
+    @pytest.mark.parametrize("compression", [Compression.ZSTD, Compression.LZ4])
+    def test_compression_threshold(self, compression):
+        """Test only payloads at or above the threshold are compressed"""
+        if not is_available(compression):
+            pytest.skip(f"{compression.name.lower()} is not installed")
+        codec = Codec(Serializer.MSGPACK, compression, compress_threshold=256)
+        
+        small = codec.encode("x" * 10)
+        assert small[0] & 0b11 == Compression.NONE
+        
+        large_value = {"bio": "learning " * 200}
+        large = codec.encode(large_value)
+        assert large[0] & 0b11 == compression
+        assert len(large) < len(codecs._serialize(Serializer.MSGPACK, large_value))
+        assert Codec().decode(large) == large_value
+        
+        # Compressed JSON needs the header too
+        payload = Codec(Serializer.JSON, compression, compress_threshold=0).encode(large_value)
+        assert payload[0] & codecs.HEADER_MARKER
+        assert Codec().decode(payload) == large_value
+
+    def test_msgpack_keeps_uuid_and_datetime_types(self):
+        """Test msgpack extension types round-trip; JSON backends fall back to strings"""
+        value = {
+            "id": uuid4(),
+            "at": datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc),
+            "on": date(2024, 5, 1),
+        }
+        codec = Codec(Serializer.MSGPACK)
+        assert codec.decode(codec.encode(value)) == value
+        
+        decoded = codec.decode(Codec(Serializer.ORJSON).encode(value))
+        assert decoded["id"] == str(value["id"])
+        assert isinstance(decoded["at"], str)
+
+    def test_missing_library_is_reported(self, monkeypatch):
+        """Test selecting an uninstalled backend fails up front; no compression always works"""
+        assert is_available(Compression.NONE)
+        monkeypatch.setitem(codecs._COMPRESSION_LIBS, Compression.ZSTD, None)
+        monkeypatch.setitem(codecs._SERIALIZER_LIBS, Serializer.MSGPACK, None)
+        assert not is_available(Compression.ZSTD)
+        with pytest.raises(ValueError):
+            Codec(Serializer.JSON, Compression.ZSTD)
+        with pytest.raises(ValueError):
+            Codec(Serializer.MSGPACK)
+        assert Codec(Serializer.JSON, Compression.NONE).encode(1) == b"1"
+
+
+@pytest.mark.asyncio
+class TestWebSocketBroadcast:
+    """Test WebSocket channel broadcasts"""
+
+    async def test_broadcast_is_codec_encoded(self, fake_redis):
+        """Test broadcasts publish binary codec payloads subscribers can decode"""
+        manager = WebSocketManager(get_redis())
+        pubsub = get_redis_binary().pubsub()
+        await pubsub.subscribe("ws:room")
+        await pubsub.get_message(timeout=1)
+        
+        user_id = uuid4()
+        await manager.broadcast_to_channel("room", {"user_id": user_id, "text": "hi"})
+        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1)
+        await pubsub.aclose()
+        
+        assert isinstance(message["data"], bytes)
+        assert codecs.get_codec().decode(message["data"]) == {"user_id": user_id, "text": "hi"}
+
+
+@pytest.mark.asyncio
+class TestRateLimitEngine:
+    """Test server-side rate limit scripts and the local fallback"""
+
+    @pytest.fixture
+    def server(self):
+        return fakeredis.FakeServer()
+
+    @pytest_asyncio.fixture
+    async def redis_client(self, server):
+        client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+        yield client
+        await client.aclose()
+
+    def engine(self, redis_client, algorithm: RateLimitAlgorithm) -> RateLimitEngine:
+        return RateLimitEngine(redis_client, algorithm, fallback=LocalRateLimiter())
+
+    async def test_fixed_window(self, redis_client):
+        """Test hits are counted per window and the TTL is the retry delay"""
+        engine = self.engine(redis_client, RateLimitAlgorithm.FIXED_WINDOW)
+        results = [await engine.hit("k", limit=3, window=60) for _ in range(4)]
+        
+        assert [result.limited for result in results] == [False, False, False, True]
+        assert [result.remaining for result in results] == [2, 1, 0, 0]
+        assert 59 < results[-1].retry_after <= 60
+        assert 59_000 < await redis_client.pttl("rl:fixed_window:k") <= 60_000
+        
+        await engine.reset("k")
+        assert not (await engine.hit("k", limit=3, window=60)).limited
+
+    async def test_sliding_log(self, redis_client):
+        """Test the log admits hits again once the oldest one leaves the window"""
+        engine = self.engine(redis_client, RateLimitAlgorithm.SLIDING_LOG)
+        assert not (await engine.hit("k", limit=2, window=1)).limited
+        assert (await engine.hit("k", limit=2, window=1, increment=2)).limited
+        second = await engine.hit("k", limit=2, window=1)
+        assert (second.limited, second.current) == (False, 2)
+        
+        limited = await engine.hit("k", limit=2, window=1)
+        assert limited.limited and limited.current == 2
+        assert 0 < limited.retry_after <= 1
+        assert await redis_client.zcard("rl:sliding_log:k") == 2
+        
+        await asyncio.sleep(limited.retry_after + 0.05)
+        assert not (await engine.hit("k", limit=2, window=1)).limited
+
+    async def test_gcra(self, redis_client):
+        """Test GCRA allows a burst of `limit` and then spaces hits evenly"""
+        engine = self.engine(redis_client, RateLimitAlgorithm.GCRA)
+        results = [await engine.hit("k", limit=4, window=60) for _ in range(5)]
+        
+        assert [result.limited for result in results] == [False] * 4 + [True]
+        assert [result.current for result in results[:4]] == [1, 2, 3, 4]
+        assert 14 < results[-1].retry_after <= 15
+        # Only the theoretical arrival time is stored
+        assert await redis_client.type("rl:gcra:k") == "string"
+
+    async def test_algorithms_use_separate_keys(self, redis_client):
+        """Test switching algorithm for a key starts fresh instead of hitting WRONGTYPE"""
+        sliding = self.engine(redis_client, RateLimitAlgorithm.SLIDING_LOG)
+        gcra = self.engine(redis_client, RateLimitAlgorithm.GCRA)
+        assert not (await sliding.hit("k", limit=1)).limited
+        assert (await sliding.hit("k", limit=1)).limited
+        
+        assert not (await gcra.hit("k", limit=1)).limited
+        assert await redis_client.type("rl:sliding_log:k") == "zset"
+
+    async def test_reloads_flushed_scripts(self, redis_client, monkeypatch):
+        """Test NOSCRIPT after a script cache flush reloads the script once"""
+        monkeypatch.setattr(rate_limit, "_script_shas", {})
+        engine = self.engine(redis_client, RateLimitAlgorithm.FIXED_WINDOW)
+        loads = []
+        script_load = redis_client.script_load
+        
+        async def counting_load(script):
+            loads.append(script)
+            return await script_load(script)
+        
+        monkeypatch.setattr(redis_client, "script_load", counting_load)
+        await engine.hit("k", limit=5)
+        await engine.hit("k", limit=5)
+        assert len(loads) == 1
+        
+        await redis_client.script_flush()
+        result = await engine.hit("k", limit=5)
+        assert (result.limited, result.current) == (False, 3)
+        assert len(loads) == 2
+
+    async def test_falls_back_to_local_state_without_redis(self, server, redis_client):
+        """Test an unreachable Redis is replaced by per-process limits"""
+        engine = self.engine(redis_client, RateLimitAlgorithm.FIXED_WINDOW)
+        server.connected = False
+        results = [await engine.hit("k", limit=2, window=60) for _ in range(3)]
+        assert [result.limited for result in results] == [False, False, True]
+        
+        await engine.reset("k")
+        assert not (await engine.hit("k", limit=2, window=60)).limited
+
+    async def test_script_errors_are_not_hidden(self, redis_client):
+        """Test real script failures surface instead of silently using local limits"""
+        engine = self.engine(redis_client, RateLimitAlgorithm.GCRA)
+        await redis_client.rpush("rl:gcra:k", "not a rate limit")
+        with pytest.raises(ResponseError):
+            await engine.hit("k", limit=2)
+
+
+class TestLocalRateLimiter:
+    """Test the in-memory fallback algorithms"""
+
+    def test_fixed_window(self, monkeypatch):
+        limiter = LocalRateLimiter()
+        now = [100.0]
+        monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+        monkeypatch.setattr("src.core.cache.time.monotonic", lambda: now[0])
+        
+        hits = [limiter.hit(RateLimitAlgorithm.FIXED_WINDOW, "k", 2, 10) for _ in range(3)]
+        assert [hit.limited for hit in hits] == [False, False, True]
+        assert hits[-1].retry_after == 10
+        
+        now[0] += 10
+        assert not limiter.hit(RateLimitAlgorithm.FIXED_WINDOW, "k", 2, 10).limited
+
+    def test_sliding_log(self, monkeypatch):
+        limiter = LocalRateLimiter()
+        now = [100.0]
+        monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+        monkeypatch.setattr("src.core.cache.time.monotonic", lambda: now[0])
+        
+        assert not limiter.hit(RateLimitAlgorithm.SLIDING_LOG, "k", 2, 10).limited
+        now[0] += 5
+        assert not limiter.hit(RateLimitAlgorithm.SLIDING_LOG, "k", 2, 10).limited
+        limited = limiter.hit(RateLimitAlgorithm.SLIDING_LOG, "k", 2, 10)
+        assert limited.limited and limited.retry_after == 5
+        
+        now[0] += 5
+        result = limiter.hit(RateLimitAlgorithm.SLIDING_LOG, "k", 2, 10)
+        assert (result.limited, result.current) == (False, 2)
+
+    def test_gcra(self, monkeypatch):
+        limiter = LocalRateLimiter()
+        now = [100.0]
+        monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+        monkeypatch.setattr("src.core.cache.time.monotonic", lambda: now[0])
+        
+        hits = [limiter.hit(RateLimitAlgorithm.GCRA, "k", 4, 60) for _ in range(5)]
+        assert [hit.limited for hit in hits] == [False] * 4 + [True]
+        assert hits[-1].retry_after == 15
+        
+        now[0] += 15
+        assert not limiter.hit(RateLimitAlgorithm.GCRA, "k", 4, 60).limited
+        assert limiter.hit(RateLimitAlgorithm.GCRA, "k", 4, 60).limited
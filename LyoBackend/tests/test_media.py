@@ -0,0 +1,267 @@
+# Test Media Module
+import hashlib
+import importlib
+import io
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from fastapi import UploadFile
+from PIL import Image
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.datastructures import Headers
+
+from src.auth.principal import Principal
+from src.core.exceptions import BusinessLogicError
+from src.media.derivatives import derivative_path, pick_derivative, render_derivatives
+from src.media.models import MediaBlob
+from src.media.service import MediaService
+from src.media.storage import LocalStorage, MemoryStorage
+from src.media.upload import UploadStream, sniff_content_type
+
+# src.media re-exports its APIRouter as `router`, shadowing the module
+media_router = importlib.import_module("src.media.router")
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 100
+
+
+class _CountingFile(io.BytesIO):
+    """BytesIO that records the largest single read"""
+    largest_read = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.largest_read = max(self.largest_read, len(chunk))
+        return chunk
+
+
+@pytest.mark.asyncio
+class TestUploadStream:
+    """Test chunked upload reading"""
+
+    async def test_reads_in_chunks_and_hashes(self):
+        """Test content is read chunk by chunk, hashed and replayed from the sniffed head"""
+        content = PNG + bytes(range(256)) * 40
+        raw = _CountingFile(content)
+        stream = UploadStream(UploadFile(raw, filename="a.png"), max_size=len(content), chunk_size=1000)
+
+        assert sniff_content_type(await stream.head()) == "image/png"
+        received = b"".join([chunk async for chunk in stream])
+
+        assert received == content
+        assert stream.size == len(content)
+        assert stream.sha256 == hashlib.sha256(content).hexdigest()
+        assert raw.largest_read == 1000
+
+    async def test_rejects_oversized_upload_early(self):
+        """Test the limit trips after one chunk past it, without reading the rest"""
+        raw = _CountingFile(b"x" * 10_000)
+        stream = UploadStream(UploadFile(raw), max_size=2500, chunk_size=1000)
+
+        with pytest.raises(BusinessLogicError):
+            async for _ in stream:
+                pass
+        assert raw.tell() == 3000
+
+        # A size known up front is rejected before any read
+        stream = UploadStream(UploadFile(io.BytesIO(b"x" * 10), size=10_000), max_size=2500)
+        with pytest.raises(BusinessLogicError):
+            await stream.head()
+
+
+def _upload(content: bytes, content_type: str, filename: str = "upload.png") -> UploadFile:
+    return UploadFile(io.BytesIO(content), filename=filename, headers=Headers({"content-type": content_type}))
+
+
+@pytest.mark.asyncio
+class TestStorageBackends:
+    """Test media storage through the backend interface"""
+
+    async def test_upload_to_memory_storage(self):
+        """Test an upload lands in storage with its sniffed type and hash"""
+        storage = MemoryStorage()
+        service = MediaService(storage)
+
+        media = await service.upload_file(_upload(PNG, "image/png"), uuid4(), "avatar")
+
+        content, content_type, is_public = storage.objects[media.storage_path]
+        assert (content, content_type, is_public) == (PNG, "image/png", True)
+        assert media.content_hash == hashlib.sha256(PNG).hexdigest()
+        assert media.public_url == f"memory://{media.storage_path}"
+        assert b"".join([chunk async for chunk in storage.read(media.storage_path, chunk_size=7)]) == PNG
+
+        with pytest.raises(BusinessLogicError):
+            await service.upload_file(_upload(b"%PDF-1.4 ...", "image/png"), uuid4(), "avatar")
+        assert len(storage.objects) == 1
+
+    async def test_local_storage_removes_partial_files(self, tmp_path):
+        """Test an upload rejected mid-stream leaves nothing on disk"""
+        service = MediaService(LocalStorage(str(tmp_path)))
+        oversized = PNG + b"\x00" * (11 * 1024 * 1024)
+
+        with pytest.raises(BusinessLogicError):
+            await service.upload_file(_upload(oversized, "image/png"), uuid4(), "avatar")
+        assert not [path for path in tmp_path.rglob("*") if path.is_file()]
+
+        media = await service.upload_file(_upload(PNG, "image/png"), uuid4(), "avatar")
+        assert (tmp_path / media.storage_path).read_bytes() == PNG
+        await service.storage.delete(media.storage_path)
+        await service.storage.delete(media.storage_path)
+        assert not (tmp_path / media.storage_path).exists()
+
+
+@pytest.mark.asyncio
+class TestContentAddressedStorage:
+    """Test uploads of identical bytes sharing one stored blob"""
+
+    async def test_reupload_is_metadata_only(self, db_session: AsyncSession):
+        """Test a re-upload adds a row but no object, and the last delete removes the blob"""
+        storage = MemoryStorage()
+        service = MediaService(storage)
+        user_id = uuid4()
+
+        first = await service.upload_file(_upload(PNG, "image/png"), user_id, "avatar", is_public=False, db=db_session)
+        second = await service.upload_file(_upload(PNG, "image/png"), user_id, "post_image", db=db_session)
+
+        assert first.id != second.id
+        assert first.storage_path == second.storage_path
+        assert storage.objects_written == 1
+        # The shared object is public while any upload of it is
+        assert storage.objects[first.storage_path][2] is True
+        blob = await db_session.get(MediaBlob, first.content_hash)
+        assert (blob.ref_count, blob.public_ref_count) == (2, 1)
+
+        await service.delete_media(second.id, user_id, db_session)
+        assert storage.objects[first.storage_path][2] is False
+
+        await service.delete_media(first.id, user_id, db_session)
+        assert storage.objects == {}
+        assert (await db_session.execute(select(MediaBlob))).first() is None
+
+
+@pytest.mark.asyncio
+class TestUserMedia:
+    """Test listing a user's media"""
+
+    async def test_keyset_pages_and_privacy(self, db_session: AsyncSession):
+        """Test pages are newest first, filtered, and hide private uploads from others"""
+        service = MediaService(MemoryStorage())
+        owner_id = uuid4()
+        uploads = []
+        for i in range(5):
+            content = PNG + bytes([i])
+            uploads.append(await service.upload_file(
+                _upload(content, "image/png"), owner_id, "avatar" if i % 2 else "post_image",
+                is_public=i != 4, db=db_session,
+            ))
+        # Two share a timestamp, so the id breaks the tie
+        for i, media in enumerate(uploads):
+            media.created_at = datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=min(i, 3))
+        await db_session.commit()
+        newest_first = sorted(uploads, key=lambda media: (media.created_at, media.id), reverse=True)
+
+        page, cursor = await service.get_user_media(owner_id, owner_id, None, 3, db=db_session)
+        rest, last_cursor = await service.get_user_media(owner_id, owner_id, cursor, 3, db=db_session)
+        assert [media.id for media in page + rest] == [media.id for media in newest_first]
+        assert last_cursor is None
+
+        visible, _ = await service.get_user_media(owner_id, uuid4(), None, 10, db=db_session)
+        assert len(visible) == 4 and all(media.is_public for media in visible)
+
+        avatars, _ = await service.get_user_media(
+            owner_id, owner_id, None, 10, usage_type="avatar", db=db_session
+        )
+        assert {media.id for media in avatars} == {uploads[1].id, uploads[3].id}
+
+        with pytest.raises(ValueError):
+            await service.get_user_media(owner_id, owner_id, "not-a-cursor", 10, db=db_session)
+
+    async def _list(self, owner_id, viewer_id, db, if_none_match=None):
+        return await media_router.get_user_media(
+            owner_id, cursor=None, limit=20, usage_type=None, media_type=None,
+            width=None, accept=None, if_none_match=if_none_match,
+            current_user=Principal(id=viewer_id, role="student", is_active=True, is_verified=True),
+            db=db,
+        )
+
+    async def test_etag_revalidation(self, db_session: AsyncSession, monkeypatch):
+        """Test If-None-Match gets a 304 until an upload or visibility change alters the page"""
+        service = MediaService(MemoryStorage())
+        monkeypatch.setattr(media_router, "media_service", service)
+        owner_id, viewer_id = uuid4(), uuid4()
+        first = await service.upload_file(_upload(PNG, "image/png"), owner_id, "avatar", db=db_session)
+
+        response = await self._list(owner_id, viewer_id, db_session)
+        etag = response.headers["ETag"]
+        assert response.status_code == 200
+        assert response.headers["Cache-Control"] == "private, no-cache"
+
+        for header in (etag, f"W/{etag}", f'"stale", {etag}', "*"):
+            cached = await self._list(owner_id, viewer_id, db_session, if_none_match=header)
+            assert cached.status_code == 304
+            assert cached.body == b""
+            assert cached.headers["ETag"] == etag
+            assert cached.headers["Cache-Control"] == "private, no-cache"
+
+        await service.upload_file(_upload(PNG + b"\x01", "image/png"), owner_id, "avatar", db=db_session)
+        response = await self._list(owner_id, viewer_id, db_session, if_none_match=etag)
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+        etag = response.headers["ETag"]
+
+        await service.update_media(first.id, owner_id, is_public=False, db=db_session)
+        response = await self._list(owner_id, viewer_id, db_session, if_none_match=etag)
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+        # The owner still sees the private upload, so their page differs
+        owner_view = await self._list(owner_id, owner_id, db_session)
+        assert owner_view.headers["ETag"] != response.headers["ETag"]
+
+
+def test_sniff_content_type():
+    """Test common upload formats are identified from their leading bytes"""
+    assert sniff_content_type(b"\xff\xd8\xff\xe0\x00\x10JFIF") == "image/jpeg"
+    assert sniff_content_type(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "image/webp"
+    assert sniff_content_type(b"\x00\x00\x00\x18ftypmp42\x00\x00") == "video/mp4"
+    assert sniff_content_type(b"\x00\x00\x00\x14ftypqt  \x00\x00") == "video/quicktime"
+    assert sniff_content_type(b"%PDF-1.7\n") == "application/pdf"
+    assert sniff_content_type(b"plain text") is None
+
+
+def _encode_image(mode: str, size, fmt: str) -> bytes:
+    buffer = io.BytesIO()
+    Image.new(mode, size, "red").save(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+class TestDerivatives:
+    """Test image derivative rendering and selection"""
+
+    def test_render_sizes_and_formats(self):
+        """Test each width below the original is rendered in every format plus a fallback"""
+        photo = _encode_image("RGB", (2000, 1000), "JPEG")
+        rendered = render_derivatives(photo, (160, 640, 4000), ("webp",))
+
+        assert [(width, height, fmt) for width, height, fmt, _ in rendered] == [
+            (640, 320, "jpeg"), (640, 320, "webp"), (160, 80, "jpeg"), (160, 80, "webp"),
+        ]
+        with Image.open(io.BytesIO(rendered[1][3])) as image:
+            assert (image.format, image.size) == ("WEBP", (640, 320))
+
+        # Transparent images fall back to PNG and are never upscaled
+        logo = _encode_image("RGBA", (100, 50), "PNG")
+        assert [(width, fmt) for width, _, fmt, _ in render_derivatives(logo, (160,), ())] == [(100, "png")]
+        assert derivative_path("uploads/u/avatar/a.png", 160, "jpeg") == "uploads/u/avatar/a_160w.jpg"
+
+    def test_pick_best_fit(self):
+        """Test the smallest size covering the width in the best accepted format"""
+        derivatives = [
+            {"width": width, "format": fmt}
+            for width in (160, 640) for fmt in ("jpeg", "webp", "avif")
+        ]
+        assert pick_derivative(derivatives, 200) == {"width": 640, "format": "jpeg"}
+        assert pick_derivative(derivatives, 100, "image/webp,*/*") == {"width": 160, "format": "webp"}
+        assert pick_derivative(derivatives, 900, "image/avif,image/webp") == {"width": 640, "format": "avif"}
+        assert pick_derivative(None, 100) is None
+
@@ -1,10 +1,26 @@
 # Test Profile Module
+import json
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import event, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+import src.auth.router as auth_router
+import src.profiles.service as profile_service
 from src.auth.models import User
-from src.profiles.models import Interest, UserProfile
+from src.auth.schemas import UserUpdate
+from src.core.utils import etag_matches
+from src.profiles.autocomplete import PrefixIndex, ProfileAutocomplete
+from src.profiles.catalog import InterestCatalog
+from src.profiles.models import Follow, Interest, UserInterest, UserProfile, XPEvent
+from src.profiles.counters import FollowCounters, follow_counters
+from src.profiles.leaderboards import Leaderboards, leaderboards
+from src.profiles.schemas import InterestRequest
+from src.profiles.service import ProfileService
+from src.profiles.xp import XPEngine
 from tests.conftest import TestData
 
 
@@ -179,8 +195,8 @@ class TestProfileRoutes:
         
         assert response.status_code == 200
         data = response.json()
-        assert len(data) >= 1
-        found_user = next((u for u in data if u["username"] == "johndoe"), None)
+        assert len(data["items"]) >= 1
+        found_user = next((u for u in data["items"] if u["username"] == "johndoe"), None)
         assert found_user is not None
 
     async def test_get_interests(self, client: AsyncClient):
@@ -280,3 +296,683 @@ class TestProfileRoutes:
         
         assert response.status_code == 403
         assert "private" in response.json()["detail"]
+
+
+async def capture_queries(db: AsyncSession, coroutine) -> tuple:
+    """Run coroutine and collect the SQL statements it executes on db's engine"""
+    statements = []
+    engine = db.bind.sync_engine
+    
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+    
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        result = await coroutine
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return result, statements
+
+
+@pytest.mark.asyncio
+class TestProfileService:
+    """Test profile service queries"""
+
+    async def _create_followers(self, db: AsyncSession, count: int) -> User:
+        """Create a user followed by `count` others, half of whom the viewer follows back"""
+        viewer = User(email="viewer@example.com", hashed_password="x", role="student")
+        db.add(viewer)
+        users = [
+            User(email=f"follower{i}@example.com", hashed_password="x", role="student")
+            for i in range(count)
+        ]
+        db.add_all(users)
+        await db.flush()
+        
+        db.add(UserProfile(user_id=viewer.id))
+        db.add_all(UserProfile(user_id=user.id) for user in users)
+        await db.flush()
+        
+        for i, user in enumerate(users):
+            db.add(Follow(follower_id=user.id, following_id=viewer.id, is_approved=True))
+            if i % 2 == 0:
+                db.add(Follow(follower_id=viewer.id, following_id=user.id, is_approved=True))
+        await db.commit()
+        return viewer
+
+    async def _count_queries(self, db: AsyncSession, coroutine) -> tuple:
+        """Run coroutine and count the SQL statements it executes on db's engine"""
+        result, statements = await capture_queries(db, coroutine)
+        return result, len(statements)
+
+    async def test_followers_query_count_is_constant(self, db_session: AsyncSession):
+        """Test relationship statuses for a follower page are resolved in one query"""
+        viewer = await self._create_followers(db_session, 30)
+        
+        (small_page, _), small_queries = await self._count_queries(
+            db_session,
+            ProfileService.get_followers(viewer.id, viewer.id, None, 5, db_session)
+        )
+        (large_page, _), large_queries = await self._count_queries(
+            db_session,
+            ProfileService.get_followers(viewer.id, viewer.id, None, 30, db_session)
+        )
+        
+        assert len(small_page) == 5
+        assert len(large_page) == 30
+        # Page, users, and one relationship lookup for the whole page
+        assert small_queries == large_queries == 3
+        
+        statuses = [profile.relationship_status for profile in large_page]
+        assert all(status["is_followed_by"] for status in statuses)
+        assert sum(status["is_following"] for status in statuses) == 15
+
+    async def test_relationship_status_single_query_and_memoized(self, db_session: AsyncSession):
+        """Test single relationship lookup runs one query and is memoized per session"""
+        viewer = await self._create_followers(db_session, 2)
+        followers, _ = await ProfileService.get_followers(viewer.id, None, None, 2, db_session)
+        target_id = followers[0].user_id
+        
+        status, first_queries = await self._count_queries(
+            db_session,
+            ProfileService._get_relationship_status(viewer.id, target_id, db_session)
+        )
+        _, second_queries = await self._count_queries(
+            db_session,
+            ProfileService._get_relationship_status(viewer.id, target_id, db_session)
+        )
+        
+        assert first_queries == 1
+        assert second_queries == 0
+        assert status["is_followed_by"] is True
+        
+        # Statuses resolved for a follower page are reused by single lookups
+        await ProfileService.get_followers(viewer.id, viewer.id, None, 2, db_session)
+        _, page_memo_queries = await self._count_queries(
+            db_session,
+            ProfileService._get_relationship_status(viewer.id, followers[1].user_id, db_session)
+        )
+        assert page_memo_queries == 0
+        
+        # The memo lives on the session, so another request starts cold
+        async with AsyncSession(db_session.bind) as other_session:
+            _, fresh_queries = await self._count_queries(
+                other_session,
+                ProfileService._get_relationship_status(viewer.id, target_id, other_session)
+            )
+        assert fresh_queries == 1
+
+    async def test_followers_cursor_pagination(self, db_session: AsyncSession):
+        """Test walking followers with keyset cursors returns every follower once"""
+        viewer = await self._create_followers(db_session, 7)
+        
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = await ProfileService.get_followers(
+                viewer.id, None, cursor, 3, db_session
+            )
+            seen.extend(profile.user_id for profile in page)
+            if cursor is None:
+                break
+        
+        assert len(seen) == 7
+        assert len(set(seen)) == 7
+
+    async def test_follow_counters_track_follow_changes(self, db_session: AsyncSession):
+        """Test counters follow approve/unfollow and reconciliation repairs drift"""
+        alice = User(email="alice@example.com", hashed_password="x", role="student")
+        bob = User(email="bob@example.com", hashed_password="x", role="student")
+        db_session.add_all([alice, bob])
+        await db_session.flush()
+        alice_profile = UserProfile(user_id=alice.id)
+        bob_profile = UserProfile(user_id=bob.id)
+        db_session.add_all([alice_profile, bob_profile])
+        db_session.add(Follow(follower_id=alice.id, following_id=bob.id, is_approved=False))
+        await db_session.commit()
+        
+        await ProfileService.approve_follow_request(bob.id, alice.id, db_session)
+        await db_session.refresh(alice_profile)
+        await db_session.refresh(bob_profile)
+        assert (alice_profile.following_count, bob_profile.followers_count) == (1, 1)
+        
+        await ProfileService.unfollow_user(alice.id, bob.id, db_session)
+        await db_session.refresh(alice_profile)
+        await db_session.refresh(bob_profile)
+        assert (alice_profile.following_count, bob_profile.followers_count) == (0, 0)
+        
+        # Drift: a follow written without touching counters
+        db_session.add(Follow(follower_id=bob.id, following_id=alice.id, is_approved=True))
+        bob_profile.followers_count = 5
+        await db_session.commit()
+        
+        repaired = await follow_counters.reconcile(db_session)
+        await db_session.refresh(alice_profile)
+        await db_session.refresh(bob_profile)
+        assert repaired == 3
+        assert (alice_profile.followers_count, alice_profile.following_count) == (1, 0)
+        assert (bob_profile.followers_count, bob_profile.following_count) == (0, 1)
+
+    async def test_follow_counters_defer_hot_accounts(
+        self, db_session: AsyncSession, background_sessions, fake_redis, monkeypatch
+    ):
+        """Test follows to a hot account are buffered in Redis and applied on flush"""
+        users = [User(email=f"user{i}@example.com", hashed_password="x", role="student") for i in range(5)]
+        db_session.add_all(users)
+        await db_session.flush()
+        profiles = [UserProfile(user_id=user.id) for user in users]
+        db_session.add_all(profiles)
+        star, fans, star_profile = users[0], users[1:], profiles[0]
+        db_session.add_all([Follow(follower_id=fan.id, following_id=star.id, is_approved=False) for fan in fans])
+        await db_session.commit()
+        
+        counters = FollowCounters(hot_threshold=2, shards=2)
+        monkeypatch.setattr(profile_service, "follow_counters", counters)
+        for fan in fans:
+            await ProfileService.approve_follow_request(star.id, fan.id, db_session)
+        await ProfileService.unfollow_user(fans[0].id, star.id, db_session)
+        
+        # The second follow crossed the threshold; later changes go to Redis
+        assert await fake_redis.sismember(counters.hot_key, str(star.id))
+        assert counters.deferred == 3
+        await db_session.refresh(star_profile)
+        assert star_profile.followers_count == 2
+        await fake_redis.hincrby(f"{counters.key_prefix}0", f"{star.id}:bogus_count", 1)
+        await fake_redis.hincrby(f"{counters.key_prefix}0", "not-a-uuid:followers_count", 1)
+        
+        assert await counters.flush() == 1
+        assert counters.discarded == 2
+        assert await fake_redis.keys(f"{counters.key_prefix}[0-9]*") == []
+        await db_session.refresh(star_profile)
+        assert star_profile.followers_count == 3
+        assert await counters.reconcile(db_session) == 0
+
+    async def test_search_profiles_ranks_prefix_matches_first(self, db_session: AsyncSession):
+        """Test search matches usernames and names, with prefix matches ranked first"""
+        names = [("maria", "Ana", "Smith"), ("anabel", None, None), ("diana", None, None), ("bob", "Ana", "Lee")]
+        for username, first_name, last_name in names:
+            user = User(
+                email=f"{username}@example.com",
+                hashed_password="x",
+                role="student",
+                first_name=first_name,
+                last_name=last_name,
+            )
+            db_session.add(user)
+            await db_session.flush()
+            db_session.add(UserProfile(user_id=user.id, username=username))
+        await db_session.commit()
+        
+        profiles, next_cursor = await ProfileService.search_profiles(
+            "ana", None, None, 3, db_session
+        )
+        rest, last_cursor = await ProfileService.search_profiles(
+            "ana", None, next_cursor, 3, db_session
+        )
+        
+        usernames = [profile.username for profile in profiles + rest]
+        assert usernames[0] == "anabel"
+        assert set(usernames) == {"maria", "anabel", "diana", "bob"}
+        assert usernames[-1] == "diana"
+        assert last_cursor is None
+
+    async def test_display_name_change_reaches_typeahead(
+        self, db_session: AsyncSession, fake_redis, monkeypatch
+    ):
+        """Test renaming through PUT /auth/me updates the typeahead index right away"""
+        user = User(email="typist@example.com", hashed_password="x", role="student", display_name="Old Name")
+        db_session.add(user)
+        await db_session.flush()
+        db_session.add(UserProfile(user_id=user.id, username="typist"))
+        await db_session.commit()
+        
+        autocomplete = ProfileAutocomplete()
+        autocomplete.index.load([(user.id, "typist", "Old Name")])
+        autocomplete.index.seal()
+        monkeypatch.setattr(auth_router, "profile_autocomplete", autocomplete)
+        
+        await auth_router.update_current_user(UserUpdate(display_name="Zora Quill"), db_session, user)
+        assert [match.user_id for match in autocomplete.search("zora")] == [user.id]
+        assert autocomplete.search("old") == []
+        
+        # Other fields don't touch the index
+        await auth_router.update_current_user(UserUpdate(first_name="Z"), db_session, user)
+        assert autocomplete.updates == 1
+
+    async def test_search_pages_follow_rank_past_the_first_page(self, db_session: AsyncSession):
+        """Test candidates are chosen by rank, so later pages and alphabetically late best matches are reachable"""
+        usernames = ["zana"] + [f"ana{i:02d}" for i in range(12)] + ["ana"]
+        for username in usernames:
+            user = User(email=f"{username}@example.com", hashed_password="x", role="student")
+            db_session.add(user)
+            await db_session.flush()
+            db_session.add(UserProfile(user_id=user.id, username=username))
+        await db_session.commit()
+        
+        seen = []
+        cursor = None
+        while True:
+            page, cursor = await ProfileService.search_profiles("ana", None, cursor, 4, db_session)
+            seen.extend(profile.username for profile in page)
+            if cursor is None:
+                break
+        
+        # Exact match, then prefix matches, then the substring match
+        assert seen[0] == "ana"
+        assert seen[-1] == "zana"
+        assert sorted(seen) == sorted(usernames)
+
+    async def test_interest_catalog_snapshot_and_etag(self, db_session: AsyncSession):
+        """Test the catalog is served pre-encoded with an ETag that tracks content"""
+        for name, category in [("Swift", "Programming"), ("Algebra", "Math"), ("Python", "Programming")]:
+            db_session.add(Interest(name=name, category=category))
+        await db_session.commit()
+        
+        catalog = InterestCatalog()
+        snapshot = await catalog.get(db_session)
+        body, etag = snapshot.render()
+        
+        assert [item["name"] for item in json.loads(body)] == ["Algebra", "Python", "Swift"]
+        assert snapshot.categories == ("Math", "Programming")
+        assert snapshot.render() == (body, etag)
+        
+        page, page_etag = snapshot.render("Programming", skip=1, limit=1)
+        assert [item["name"] for item in json.loads(page)] == ["Swift"]
+        assert page_etag != etag
+        
+        assert etag_matches(etag, etag)
+        assert etag_matches(f'"other", W/{etag}', etag)
+        assert not etag_matches(page_etag, etag)
+        
+        db_session.add(Interest(name="Biology", category="Science"))
+        await db_session.commit()
+        assert (await catalog.get(db_session)) is snapshot
+        
+        await catalog.reload(db_session, snapshot.version + 1)
+        assert catalog.snapshot.render()[1] != etag
+        assert len(catalog.snapshot) == 4
+
+    async def test_bulk_interests_use_one_query_per_step(self, db_session: AsyncSession):
+        """Test bulk add validates and inserts in two queries, bulk remove in one"""
+        user = User(email="learner@example.com", hashed_password="x", role="student")
+        interests = [Interest(name=f"Topic {i}", category="Programming") for i in range(3)]
+        db_session.add(user)
+        db_session.add_all(interests)
+        await db_session.commit()
+        db_session.add(UserInterest(user_id=user.id, interest_id=interests[0].id))
+        await db_session.commit()
+        
+        unknown = uuid4()
+        requests = [
+            InterestRequest(interest_id=interest_id, proficiency_level="advanced")
+            for interest_id in (interests[0].id, interests[1].id, unknown, interests[2].id, interests[1].id)
+        ]
+        results, queries = await self._count_queries(
+            db_session,
+            ProfileService.add_interests(user.id, requests, db_session)
+        )
+        
+        assert queries == 2
+        assert [(result.interest_id, result.status) for result in results] == [
+            (interests[0].id, "already_added"),
+            (interests[1].id, "added"),
+            (unknown, "not_found"),
+            (interests[2].id, "added"),
+        ]
+        
+        results, queries = await self._count_queries(
+            db_session,
+            ProfileService.remove_interests(user.id, [interests[1].id, unknown], db_session)
+        )
+        assert queries == 1
+        assert [result.status for result in results] == ["removed", "not_found"]
+        
+        remaining = await db_session.execute(
+            select(UserInterest.interest_id).where(UserInterest.user_id == user.id)
+        )
+        assert set(remaining.scalars().all()) == {interests[0].id, interests[2].id}
+        
+        # The count doesn't grow with the batch, and unknown ids never reach the insert
+        more = [Interest(name=f"Extra {i}", category="Math") for i in range(20)]
+        db_session.add_all(more)
+        await db_session.commit()
+        _, queries = await self._count_queries(
+            db_session,
+            ProfileService.add_interests(
+                user.id, [InterestRequest(interest_id=interest.id) for interest in more], db_session
+            )
+        )
+        assert queries == 2
+        _, queries = await self._count_queries(
+            db_session,
+            ProfileService.add_interests(user.id, [InterestRequest(interest_id=uuid4())], db_session)
+        )
+        assert queries == 1
+
+    async def test_get_or_create_profile_is_race_safe(self, db_session: AsyncSession):
+        """Test profile creation tolerates an existing row instead of failing"""
+        user = User(email="newcomer@example.com", hashed_password="x", role="student")
+        db_session.add(user)
+        await db_session.flush()
+        
+        assert await ProfileService.create_default_profile(user.id, db_session)
+        # A second creator (e.g. a concurrent first request) is a no-op
+        assert not await ProfileService.create_default_profile(user.id, db_session)
+        await db_session.commit()
+        
+        profile = await ProfileService.get_or_create_profile(user.id, db_session)
+        again = await ProfileService.get_or_create_profile(user.id, db_session)
+        assert profile.id == again.id
+        assert profile.difficulty_preference == "intermediate"
+        
+        count = await db_session.scalar(
+            select(func.count()).select_from(UserProfile).where(UserProfile.user_id == user.id)
+        )
+        assert count == 1
+
+    async def test_update_xp_without_loading_profile(self, db_session: AsyncSession):
+        """Test XP updates are one UPDATE ... RETURNING plus the ledger insert, creating the profile if missing"""
+        user = User(email="grinder@example.com", hashed_password="x", role="student")
+        db_session.add(user)
+        await db_session.commit()
+        
+        profile = await ProfileService.update_xp_and_level(user.id, 150, db_session)
+        assert (profile.xp_points, profile.level) == (150, 2)
+        
+        profile, statements = await capture_queries(
+            db_session,
+            ProfileService.update_xp_and_level(user.id, 100, db_session)
+        )
+        # No SELECT of the profile ahead of the write
+        assert [statement.split()[0] for statement in statements] == ["UPDATE", "INSERT"]
+        assert "RETURNING" in statements[0]
+        assert (profile.xp_points, profile.level) == (250, 2)
+
+    async def test_xp_level_computed_in_sql_with_ledger(self, db_session: AsyncSession):
+        """Test level is recomputed by the XP update itself, never drops, and every grant is ledgered"""
+        user = User(email="scholar@example.com", hashed_password="x", role="student")
+        db_session.add(user)
+        await db_session.commit()
+        
+        await ProfileService.update_xp_and_level(user.id, 150, db_session, "lesson_completed")
+        profile = await ProfileService.update_xp_and_level(user.id, 850, db_session, "quiz_passed")
+        assert (profile.xp_points, profile.level) == (1000, 4)
+        
+        profile = await ProfileService.update_xp_and_level(user.id, -900, db_session, "correction")
+        assert (profile.xp_points, profile.level) == (100, 4)
+        
+        ledger = await db_session.execute(
+            select(XPEvent.amount, XPEvent.reason)
+            .where(XPEvent.user_id == user.id)
+            .order_by(XPEvent.created_at)
+        )
+        assert ledger.all() == [(150, "lesson_completed"), (850, "quiz_passed"), (-900, "correction")]
+
+    async def test_buffered_xp_flush(self, db_session: AsyncSession, background_sessions, fake_redis):
+        """Test buffered grants are summed per (user, reason), create missing profiles and skip bad fields"""
+        regular = User(email="regular@example.com", hashed_password="x", role="student")
+        newcomer = User(email="newcomer@example.com", hashed_password="x", role="student")
+        db_session.add_all([regular, newcomer])
+        await db_session.flush()
+        db_session.add(UserProfile(user_id=regular.id))
+        await db_session.commit()
+        
+        engine = XPEngine(shards=2)
+        for _ in range(3):
+            assert await engine.grant_buffered(regular.id, 10, "lesson_completed")
+        assert await engine.grant_buffered(newcomer.id, 150, "quiz_passed")
+        assert not await engine.grant_buffered(regular.id, 5, "quiz|passed")
+        # A field that can't be parsed, and a grant for a user who no longer exists
+        await fake_redis.hincrby(f"{engine.key_prefix}0", f"{regular.id}|a|b|xp", 5)
+        await fake_redis.hincrby(f"{engine.key_prefix}0", f"{uuid4()}|manual|xp", 5)
+        
+        assert await engine.flush() == 2
+        assert engine.discarded == 2
+        assert await fake_redis.keys(f"{engine.key_prefix}*") == []
+        
+        profiles = await db_session.execute(select(UserProfile.user_id, UserProfile.xp_points, UserProfile.level))
+        assert set(profiles.all()) == {(regular.id, 30, 1), (newcomer.id, 150, 2)}
+        ledger = await db_session.execute(select(XPEvent.user_id, XPEvent.reason, XPEvent.amount, XPEvent.grants))
+        assert set(ledger.all()) == {
+            (regular.id, "lesson_completed", 30, 3),
+            (newcomer.id, "quiz_passed", 150, 1),
+        }
+        
+        # Nothing was requeued to fail the next flush
+        assert await engine.flush() == 0
+
+    async def test_streak_follows_calendar_days(self, db_session: AsyncSession):
+        """Test streaks extend once per day and restart after a missed day"""
+        user = User(email="daily@example.com", hashed_password="x", role="student")
+        db_session.add(user)
+        await db_session.commit()
+        
+        profile = await ProfileService.update_streak(user.id, db_session)
+        assert profile.streak_days == 1
+        profile = await ProfileService.update_streak(user.id, db_session)
+        assert profile.streak_days == 1
+        
+        profile.streak_updated = datetime.now(timezone.utc) - timedelta(days=1)
+        await db_session.commit()
+        profile = await ProfileService.update_streak(user.id, db_session)
+        assert profile.streak_days == 2
+        
+        profile.streak_updated = datetime.now(timezone.utc) - timedelta(days=3)
+        await db_session.commit()
+        profile = await ProfileService.update_streak(user.id, db_session)
+        assert profile.streak_days == 1
+
+
+@pytest.mark.asyncio
+class TestLeaderboards:
+    """Test XP leaderboards in Redis"""
+
+    async def _create_learners(self, db: AsyncSession, count: int) -> list:
+        users = [
+            User(email=f"learner{i}@example.com", hashed_password="x", role="student")
+            for i in range(count)
+        ]
+        db.add_all(users)
+        await db.commit()
+        return users
+
+    async def test_boards_follow_grants_and_interests(self, db_session: AsyncSession, fake_redis):
+        """Test grants and interest changes reach the global and interest boards"""
+        ana, bob, cy = await self._create_learners(db_session, 3)
+        python = Interest(name="Python", category="Programming")
+        db_session.add(python)
+        await db_session.commit()
+        await ProfileService.add_interest(ana.id, InterestRequest(interest_id=python.id), db_session)
+        
+        await ProfileService.update_xp_and_level(ana.id, 300, db_session)
+        await ProfileService.update_xp_and_level(bob.id, 500, db_session)
+        await ProfileService.update_xp_and_level(cy.id, 100, db_session)
+        await ProfileService.update_xp_and_level(ana.id, 50, db_session)
+        
+        global_key = leaderboards.global_key()
+        assert await leaderboards.page(global_key, 0, 10) == [(bob.id, 500, 0), (ana.id, 350, 1), (cy.id, 100, 2)]
+        assert await leaderboards.page(global_key, 1, 1) == [(ana.id, 350, 1)]
+        assert await leaderboards.rank(global_key, cy.id) == (cy.id, 100, 2)
+        assert await leaderboards.rank(global_key, uuid4()) is None
+        
+        python_key = leaderboards.interest_key(python.id)
+        assert await leaderboards.page(python_key, 0, 10) == [(ana.id, 350, 0)]
+        
+        await ProfileService.add_interests(bob.id, [InterestRequest(interest_id=python.id)], db_session)
+        assert await leaderboards.page(python_key, 0, 10) == [(bob.id, 500, 0), (ana.id, 350, 1)]
+        
+        await ProfileService.remove_interest(bob.id, python.id, db_session)
+        assert await leaderboards.rank(python_key, bob.id) is None
+        await ProfileService.remove_interests(ana.id, [python.id], db_session)
+        assert await fake_redis.exists(python_key) == 0
+
+    async def test_friends_board_ranks_followed_users(self, db_session: AsyncSession, fake_redis):
+        """Test the friends board covers the user and approved follows only"""
+        me, friend, pending, stranger, idle = await self._create_learners(db_session, 5)
+        db_session.add_all([
+            Follow(follower_id=me.id, following_id=friend.id, is_approved=True),
+            Follow(follower_id=me.id, following_id=pending.id, is_approved=False),
+            Follow(follower_id=me.id, following_id=idle.id, is_approved=True),
+        ])
+        await db_session.commit()
+        for user, xp in ((me, 200), (friend, 400), (pending, 900), (stranger, 800)):
+            await ProfileService.update_xp_and_level(user.id, xp, db_session)
+        
+        ranked, mine = await leaderboards.friends(db_session, me.id, 0, 10)
+        # Users with no XP aren't on the global board
+        assert ranked == [(friend.id, 400, 0), (me.id, 200, 1)]
+        assert mine == (me.id, 200, 1)
+        
+        ranked, mine = await leaderboards.friends(db_session, me.id, 0, 1)
+        assert ranked == [(friend.id, 400, 0)]
+        assert mine == (me.id, 200, 1)
+
+    async def test_rebuild_swaps_boards_and_drops_stale_ones(
+        self, db_session: AsyncSession, background_sessions, fake_redis
+    ):
+        """Test a rebuild restores lost boards from Postgres and removes boards with no members"""
+        ana, bob = await self._create_learners(db_session, 2)
+        python = Interest(name="Python", category="Programming")
+        db_session.add(python)
+        await db_session.commit()
+        db_session.add_all([
+            UserProfile(user_id=ana.id, xp_points=300),
+            UserProfile(user_id=bob.id, xp_points=0),
+            UserInterest(user_id=ana.id, interest_id=python.id),
+        ])
+        await db_session.commit()
+        
+        stale_key = leaderboards.interest_key(uuid4())
+        await fake_redis.zadd(stale_key, {str(bob.id): 10})
+        await fake_redis.zadd(leaderboards.global_key(), {str(bob.id): 999})
+        
+        board = Leaderboards(batch_size=1)
+        assert await board.rebuild_if_missing()
+        assert not await board.rebuild_if_missing()
+        
+        assert await board.page(board.global_key(), 0, 10) == [(ana.id, 300, 0)]
+        assert await board.page(board.interest_key(python.id), 0, 10) == [(ana.id, 300, 0)]
+        assert await fake_redis.exists(stale_key) == 0
+        assert await fake_redis.exists(board.built_key) == 1
+        assert await fake_redis.keys("*:build:*") == []
+        assert await fake_redis.exists(board.rebuild_lock_key, board.rebuild_active_key) == 0
+        assert board.stats()["last_rebuild_entries"] == 2
+
+    async def test_rebuild_keeps_updates_made_while_it_runs(
+        self, db_session: AsyncSession, fake_redis, monkeypatch
+    ):
+        """Test grants and interest removals between the snapshot and the rename survive the swap"""
+        ana, bob = await self._create_learners(db_session, 2)
+        python = Interest(name="Python", category="Programming")
+        db_session.add(python)
+        await db_session.commit()
+        db_session.add_all([
+            UserProfile(user_id=ana.id, xp_points=300),
+            UserProfile(user_id=bob.id, xp_points=200),
+            UserInterest(user_id=ana.id, interest_id=python.id),
+            UserInterest(user_id=bob.id, interest_id=python.id),
+        ])
+        await db_session.commit()
+        
+        stale_boards = leaderboards._stale_boards
+        
+        async def update_mid_rebuild(redis_client, staged):
+            # The boards are staged but not yet renamed over the live keys
+            await ProfileService.update_xp_and_level(bob.id, 500, db_session)
+            await ProfileService.remove_interest(ana.id, python.id, db_session)
+            return await stale_boards(redis_client, staged)
+        
+        monkeypatch.setattr(leaderboards, "_stale_boards", update_mid_rebuild)
+        await leaderboards.rebuild(db_session)
+        
+        assert await leaderboards.page(leaderboards.global_key(), 0, 10) == [(bob.id, 700, 0), (ana.id, 300, 1)]
+        assert await leaderboards.page(leaderboards.interest_key(python.id), 0, 10) == [(bob.id, 700, 0)]
+        assert await fake_redis.exists(leaderboards.rebuild_active_key, leaderboards.rebuild_touched_key) == 0
+        
+        # Outside a rebuild nothing is recorded
+        await ProfileService.update_xp_and_level(ana.id, 10, db_session)
+        assert await fake_redis.exists(leaderboards.rebuild_touched_key) == 0
+
+    async def test_leaderboard_pages_are_cached_outside_the_request(
+        self, db_session: AsyncSession, background_sessions, fake_redis
+    ):
+        """Test shared pages are hydrated on their own session and the caller's rank stays live"""
+        ana, bob, cy = await self._create_learners(db_session, 3)
+        for user, xp in ((ana, 300), (bob, 500), (cy, 100)):
+            await ProfileService.update_xp_and_level(user.id, xp, db_session)
+        
+        request_queries = []
+        
+        def on_request_session(state):
+            request_queries.append(state.statement)
+        
+        event.listen(db_session.sync_session, "do_orm_execute", on_request_session)
+        page, statements = await capture_queries(
+            db_session,
+            ProfileService.get_leaderboard(ana.id, "global", 0, 2, db_session)
+        )
+        event.remove(db_session.sync_session, "do_orm_execute", on_request_session)
+        # Hydrated on a session of its own; the caller is on the page, so needs no lookup
+        assert len(statements) == 1
+        assert request_queries == []
+        assert [(entry.user_id, entry.rank, entry.xp_points) for entry in page.entries] == [
+            (bob.id, 1, 500), (ana.id, 2, 300)
+        ]
+        assert (page.me.user_id, page.me.rank) == (ana.id, 2)
+        
+        await ProfileService.update_xp_and_level(cy.id, 1000, db_session)
+        page = await ProfileService.get_leaderboard(cy.id, "global", 0, 2, db_session)
+        # The page is served from cache until it expires; the caller's own rank is live
+        assert [entry.user_id for entry in page.entries] == [bob.id, ana.id]
+        assert (page.me.user_id, page.me.rank, page.me.xp_points) == (cy.id, 1, 1100)
+        
+        ranked, _ = await leaderboards.friends(db_session, cy.id, 0, 10)
+        page = await ProfileService.get_leaderboard(cy.id, "friends", 0, 10, db_session)
+        assert [entry.user_id for entry in page.entries] == [cy.id]
+        assert page.me.rank == 1
+
+
+class TestPrefixIndex:
+    """Test the in-process typeahead index"""
+
+    def test_matches_usernames_and_display_names(self):
+        """Test prefix lookup is case-insensitive and returns each profile once"""
+        ana, anabel, bob = uuid4(), uuid4(), uuid4()
+        index = PrefixIndex()
+        index.load([
+            (ana, "ana", "Ana Smith"),
+            (anabel, "anabel", None),
+            (bob, "bob", "Anatoly B"),
+        ])
+        index.seal()
+        
+        matches = index.search("AN", limit=10)
+        assert [match.user_id for match in matches] == [ana, anabel, bob]
+        assert matches[0].display_name == "Ana Smith"
+        assert index.search("an", limit=2)[-1].username == "anabel"
+        assert index.search("zz") == []
+
+    def test_updates_survive_compaction(self):
+        """Test renames and removals before and after overlay compaction"""
+        users = [uuid4() for _ in range(20)]
+        index = PrefixIndex(min_compact=8)
+        index.load((user_id, f"user{i:02d}", None) for i, user_id in enumerate(users))
+        index.seal()
+        
+        index.upsert(users[0], "zed", "Zed Zero")
+        index.remove(users[1])
+        index.upsert(uuid4(), "user99", None)
+        assert index.overlay_size > 0
+        assert [match.username for match in index.search("z")] == ["zed"]
+        assert len(index.search("user", limit=50)) == 19
+        
+        for i in range(2, 12):
+            index.upsert(users[i], f"renamed{i:02d}", None)
+        assert index.needs_compaction
+        
+        index.compact()
+        assert index.overlay_size == 0
+        assert len(index) == 20
+        assert len(index.search("renamed", limit=50)) == 10
+        assert len(index.search("user", limit=50)) == 9
+        assert index.search("user00") == []